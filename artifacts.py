@@ -1,8 +1,13 @@
 from permanentsbase import Permanent
+from gamelog import log
 
 # Artifacts
 
 class Artifact(Permanent):
+    __slots__ = ()
+    type = "Artifact"
+    battlefield_zone = "artifacts"
+
     def resolve(self):
         """Artifacts resolve and enter the battlefield."""
-        print(f"{self.name} (Artifact) enters the battlefield with special effects.")
\ No newline at end of file
+        log.emit("enters_battlefield", "{card} (Artifact) enters the battlefield with special effects.", card=self.name)
\ No newline at end of file
@@ -0,0 +1,408 @@
+import asyncio
+import base64
+import itertools
+
+from decisions import DeferredDecisionProvider, describe_request, sanitize_answer
+from gameLogic import Game, create_player
+from matchmaking import MatchmakingQueue, match_key
+from persistence import GameStore
+from protocol import MAX_MESSAGE_SIZE, ProtocolError, decode_message, encode_message
+from replay import GameRecording
+from sharding import ShardedGameRunner
+from spectate import Broadcast
+from sync import SPECTATOR, GameSync, SyncMirror
+
+# Single threaded asyncio server. Every player keeps one connection open for
+# the whole game; questions and answers travel as newline delimited JSON, and
+# board state as {"type": "state", "frame": base64 sync.py frame} messages: a
+# full frame at the start, deltas after every action. A client that missed a
+# frame answers its next question with {"type": "resync"} to get a full one.
+# Spectators join with {"spectate": player name}, get {"type": "spectating"} and
+# then the public view as the length prefixed binary frames of spectate.py.
+# Games are stepped on the event loop and suspend whenever they wait on a player,
+# or, in sharded mode, run in worker processes while this loop relays messages.
+#
+# With a store, games unfinished at startup are recovered suspended on their
+# next question. A player who joins under the name they played with takes their
+# seat back instead of being matched (their new deck is ignored), and the game
+# resumes once every player is back. Games not resumed within rejoin_timeout
+# seconds are closed in the store.
+
+
+def state_message(frame):
+    return {"type": "state", "frame": base64.b64encode(frame).decode("ascii")}
+
+
+class PlayerSession:
+    def __init__(self, reader, writer, player_info):
+        self.reader = reader
+        self.writer = writer
+        self.player_info = player_info
+        self.name = player_info["name"]
+        self.decisions = DeferredDecisionProvider()
+        self.finished = asyncio.get_running_loop().create_future()  # Set when the game ends
+
+
+class AsyncGameListener:
+    def __init__(self, host="0.0.0.0", port=5001, max_connections=10000, join_timeout=30,
+                 decision_timeout=60, write_timeout=10, max_turns=None, match_interval=1.0, shards=0,
+                 action_log=None, store=None, rejoin_timeout=300):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.join_timeout = join_timeout  # Seconds a new connection has to send its join request
+        self.decision_timeout = decision_timeout  # Seconds a player has to answer, then they pass
+        self.write_timeout = write_timeout  # Seconds a client may leave our writes unread
+        self.max_turns = max_turns
+        self.match_interval = match_interval  # Seconds between sweeps that pair long waiting players
+        self.matchmaker = MatchmakingQueue()
+        self.connections = 0
+        self.games = set()
+        self.server = None
+        self.shards = shards  # Worker processes to run games in, 0 runs them on this loop
+        self.runner = None
+        self.game_ids = itertools.count()
+        self.inboxes = {}  # game_id -> asyncio.Queue of worker messages
+        self.action_log = open(action_log, "ab") if action_log else None  # Binary log of games played on this loop
+        self.store = GameStore(store) if store else None  # Write-ahead log that in-process games survive a crash in
+        self.recovered = {}  # game id -> (game rebuilt from the store at startup, sessions back in each seat)
+        self.rejoin_timeout = rejoin_timeout  # Seconds recovered games wait for their players
+        self.broadcasts = {}  # player name -> (Broadcast, future set when the game ends, player names)
+
+    async def read(self, reader, timeout):
+        """Reads one framed message, raising ConnectionError when the client went away."""
+        try:
+            line = await asyncio.wait_for(reader.readline(), timeout)
+        except (ValueError, asyncio.LimitOverrunError):
+            raise ProtocolError("Message too large.")
+        if not line:
+            raise ConnectionError("Client disconnected.")
+        return decode_message(line)
+
+    async def send(self, writer, message):
+        """Writes one framed message, waiting while the client's buffer is full."""
+        writer.write(encode_message(message))
+        await asyncio.wait_for(writer.drain(), self.write_timeout)
+
+    async def handle_client(self, reader, writer):
+        addr = writer.get_extra_info("peername")
+        if self.connections >= self.max_connections:
+            writer.write(encode_message({"type": "error", "message": "Server is full."}))
+            writer.close()
+            return
+
+        self.connections += 1
+        session = None
+        try:
+            player_info = await self.read(reader, self.join_timeout)
+            if "spectate" in player_info:
+                await self.spectate(reader, writer, player_info["spectate"])
+                return
+            if not isinstance(player_info.get("name"), str) or not isinstance(player_info.get("deck"), list):
+                raise ProtocolError("Join requests need a name and a deck.")
+            session = PlayerSession(reader, writer, player_info)
+            await self.send(writer, {"type": "waiting"})
+
+            if not self.rejoin(session):
+                rating, tier = match_key(player_info)
+                match = self.matchmaker.enqueue(session, rating, tier)
+                if match:
+                    self.start_game(*match)
+            await session.finished  # Keep the connection open until the game is over
+        except (ProtocolError, ConnectionError, asyncio.TimeoutError) as e:
+            print(f"Error handling client {addr}: {e!r}")
+            try:
+                await self.send(writer, {"type": "error", "message": str(e)})
+            except (ConnectionError, asyncio.TimeoutError):
+                pass
+        finally:
+            self.connections -= 1
+            if session:
+                self.matchmaker.remove(session)  # No-op once matched
+            writer.close()
+
+    async def spectate(self, reader, writer, name):
+        """Streams the game the named player is in until it ends or the spectator leaves."""
+        if name not in self.broadcasts:
+            raise ProtocolError("That player is not in a game that can be watched.")
+        broadcast, over, names = self.broadcasts[name]
+        await self.send(writer, {"type": "spectating", "players": names})
+        spectator = broadcast.add(writer.transport)
+        left = asyncio.ensure_future(reader.read())  # Spectators only listen, so any read ends with them leaving
+        try:
+            await asyncio.wait((left, over), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            left.cancel()
+            broadcast.remove(spectator)
+
+    def start_game(self, *sessions):
+        print(f"Starting game between {sessions[0].name} and {sessions[1].name}")
+        run = self.run_sharded_game if self.runner else self.run_game
+        self.spawn(run(list(sessions)))
+
+    def spawn(self, coroutine):
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.games.add(task)
+        task.add_done_callback(self.games.discard)
+
+    def rejoin(self, session):
+        """Seats a player in the recovered game they were playing under the same
+        name, resuming it once all its players are back. False if there is none."""
+        for game_id, (game, seats) in self.recovered.items():
+            for seat, player in enumerate(game.players):
+                if player.name == session.name and seats[seat] is None:
+                    seats[seat] = session
+                    session.decisions = player.decisions.inner  # The store's recording provider wraps it
+                    if all(seats):
+                        del self.recovered[game_id]
+                        print(f"Resuming game {game_id} between {seats[0].name} and {seats[1].name}")
+                        self.spawn(self.play(seats, game, game_id))
+                    return True
+        return False
+
+    async def expire_recovered(self):
+        """Closes the recovered games whose players did not all come back in time."""
+        await asyncio.sleep(self.rejoin_timeout)
+        expired, self.recovered = self.recovered, {}
+        if expired:
+            print(f"Closing {len(expired)} recovered games nobody came back to.")
+        for game_id, (game, seats) in expired.items():
+            self.store.finish(game_id)
+            for session in seats:
+                if session:
+                    await self.finish(session, {"type": "error", "message": "Your opponent did not come back."})
+
+    async def run_game(self, sessions):
+        """Sets up a Game for the matched players and plays it on the event loop."""
+        try:
+            players = [create_player(session.player_info, session.decisions) for session in sessions]
+        except ProtocolError as e:
+            for session in sessions:
+                await self.finish(session, {"type": "error", "message": str(e)})
+            return
+
+        game_id = None
+        try:
+            game = Game(players, max_turns=self.max_turns)
+            recording = GameRecording(game) if self.action_log else None
+            game_id = self.store.open_game(game) if self.store else None
+            game.setup()
+        except Exception as e:
+            print(f"Game between {sessions[0].name} and {sessions[1].name} failed to start: {e!r}")
+            if game_id is not None:
+                self.store.finish(game_id)
+            for session in sessions:
+                await self.finish(session, {"type": "error", "message": "The game was stopped by a server error."})
+            return
+        await self.play(sessions, game, game_id, recording)
+
+    async def play(self, sessions, game, game_id=None, recording=None):
+        """Plays a set up or recovered Game on the event loop, asking each remote
+        player when it suspends. sessions are in seat order."""
+        players = game.players
+        result = {"type": "error", "message": "The game was stopped by a server error."}
+        over = asyncio.get_running_loop().create_future()
+        broadcast = None
+        try:
+            sync = GameSync(game)
+            broadcast = self.open_broadcast(sessions, sync, over)
+            for seat, (session, player) in enumerate(zip(sessions, players)):
+                opponent = next(p for p in players if p is not player)
+                await self.send_safely(session, {"type": "game_start", "opponent": opponent.name})
+                await self.send_safely(session, state_message(sync.snapshot(seat)))
+
+            while not game.over:
+                game.run()
+                await self.send_state(sessions, sync, broadcast)
+                if not game.suspended:
+                    continue
+                if self.store:
+                    self.store.checkpoint(game_id)
+                seat, session, player = next((i, s, p) for i, (s, p) in enumerate(zip(sessions, players))
+                                             if s.decisions.pending)
+                kind, options = session.decisions.pending
+                try:
+                    await self.send(session.writer, describe_request(kind, options))
+                    reply = await self.read(session.reader, self.decision_timeout)
+                    while reply.get("type") == "resync":
+                        await self.send(session.writer, state_message(sync.snapshot(seat)))
+                        reply = await self.read(session.reader, self.decision_timeout)
+                    choice = reply.get("choice")
+                except asyncio.TimeoutError:
+                    choice = None  # Slow players pass
+                except (ProtocolError, ConnectionError):
+                    print(f"{player.name} disconnected and forfeits.")
+                    player.health = 0
+                    game.check_winner()
+                    break
+                session.decisions.answer(sanitize_answer(kind, options, choice))
+                game.resume()
+                await asyncio.sleep(0)  # Let other games and connections progress
+
+            await self.send_state(sessions, sync, broadcast)
+            if recording:
+                recording.write(self.action_log)
+                self.action_log.flush()
+            result = {"type": "game_over", "winner": game.winner.name if game.winner else None}
+        except Exception as e:
+            print(f"Game between {sessions[0].name} and {sessions[1].name} failed: {e!r}")
+        finally:
+            over.set_result(True)
+            if broadcast:
+                self.close_broadcast(sessions, broadcast)
+            if game_id is not None:
+                self.store.finish(game_id)  # A game that failed would fail again on recovery
+            for session in sessions:
+                await self.finish(session, result)
+
+    def open_broadcast(self, sessions, sync, over):
+        """Makes the game watchable under each of its players' names."""
+        broadcast = Broadcast(sync)
+        names = [session.name for session in sessions]
+        for name in names:
+            self.broadcasts[name] = (broadcast, over, names)
+        return broadcast
+
+    def close_broadcast(self, sessions, broadcast):
+        for session in sessions:
+            if self.broadcasts.get(session.name, (None,))[0] is broadcast:
+                del self.broadcasts[session.name]
+        if broadcast.frames:
+            print(f"Spectators: {broadcast.stats()}")
+
+    async def send_state(self, sessions, sync, broadcast):
+        """Sends every seat, and the spectators, the delta for the actions resolved
+        since the last call."""
+        frames = sync.publish()
+        if SPECTATOR in frames:
+            broadcast.publish(frames.pop(SPECTATOR))  # Never waits on a spectator
+        for seat, frame in frames.items():
+            await self.send_safely(sessions[seat], state_message(frame))
+
+    async def run_sharded_game(self, sessions):
+        """Starts the game on its worker and relays questions and answers until it ends."""
+        game_id = next(self.game_ids)
+        inbox = self.inboxes[game_id] = asyncio.Queue()
+        result = {"type": "error", "message": "The game was stopped by a server error."}
+        over = asyncio.get_running_loop().create_future()
+        sync = SyncMirror(lambda seat: self.runner.watch(game_id, seat))  # Spectators' seat starts on first watch
+        broadcast = None
+        try:
+            self.runner.start_game(game_id, [session.player_info for session in sessions], self.max_turns)
+            broadcast = self.open_broadcast(sessions, sync, over)
+            for session, other in zip(sessions, reversed(sessions)):
+                await self.send_safely(session, {"type": "game_start", "opponent": other.name})
+            while True:
+                message = await inbox.get()
+                if message[0] == "over":
+                    result = {"type": "game_over", "winner": message[2]}
+                    break
+                if message[0] == "error":
+                    result = {"type": "error", "message": message[2]}
+                    break
+                if message[0] == "state":
+                    _, _, seat, frame = message
+                    sync.apply(seat, frame)
+                    if seat == SPECTATOR:
+                        broadcast.publish(frame)
+                    else:
+                        await self.send_safely(sessions[seat], state_message(frame))
+                    continue
+                _, _, index, request = message
+                session = sessions[index]
+                try:
+                    await self.send(session.writer, request)
+                    reply = await self.read(session.reader, self.decision_timeout)
+                    while reply.get("type") == "resync":  # The worker's frames up to this prompt are all applied
+                        await self.send(session.writer, state_message(sync.snapshot(index)))
+                        reply = await self.read(session.reader, self.decision_timeout)
+                    self.runner.answer(game_id, index, reply.get("choice"))
+                except asyncio.TimeoutError:
+                    self.runner.answer(game_id, index, None)  # Slow players pass
+                except (ProtocolError, ConnectionError):
+                    print(f"{session.name} disconnected and forfeits.")
+                    self.runner.forfeit(game_id, index)
+        except Exception as e:
+            print(f"Sharded game between {sessions[0].name} and {sessions[1].name} failed: {e!r}")
+        finally:
+            del self.inboxes[game_id]
+            over.set_result(True)
+            if broadcast:
+                self.close_broadcast(sessions, broadcast)
+            for session in sessions:
+                await self.finish(session, result)
+
+    def dispatch_worker_messages(self, conn):
+        """Routes messages arriving from a worker pipe to the game waiting on them."""
+        while True:
+            try:
+                if not conn.poll():
+                    return
+                message = conn.recv()
+            except (EOFError, OSError):
+                print("Lost connection to a game shard.")
+                asyncio.get_running_loop().remove_reader(conn.fileno())
+                for game_id, inbox in self.inboxes.items():
+                    if self.runner.shard_for(game_id) is conn:  # Its games are gone with it
+                        inbox.put_nowait(("error", game_id, "The game's server process stopped."))
+                return
+            inbox = self.inboxes.get(message[1])
+            if inbox:
+                inbox.put_nowait(message)
+
+    async def send_safely(self, session, message):
+        try:
+            await self.send(session.writer, message)
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+
+    async def finish(self, session, message):
+        await self.send_safely(session, message)
+        if not session.finished.done():
+            session.finished.set_result(True)
+
+    async def match_waiting_players(self):
+        """Periodically pairs players whose rating window widened while they waited."""
+        while True:
+            await asyncio.sleep(self.match_interval)
+            for match in self.matchmaker.pop_matches():
+                self.start_game(*match)
+
+    async def serve(self):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port,
+                                                 limit=MAX_MESSAGE_SIZE + 1, backlog=1024)
+        print(f"Async TCP server listening on {self.host}:{self.port}")
+        loop = asyncio.get_running_loop()
+        expiry = None
+        if self.store:
+            self.recovered = {game_id: (game, [None] * len(game.players))
+                              for game_id, game in self.store.recover().items() if not game.over}
+            print(f"Recovered {len(self.recovered)} unfinished games.")
+            self.store.start()
+            expiry = loop.create_task(self.expire_recovered())
+        if self.shards:
+            self.runner = ShardedGameRunner(self.shards)
+            for conn in self.runner.connections:
+                loop.add_reader(conn.fileno(), self.dispatch_worker_messages, conn)
+        matcher = asyncio.get_running_loop().create_task(self.match_waiting_players())
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            matcher.cancel()
+            if expiry:
+                expiry.cancel()
+            if self.runner:
+                for conn in self.runner.connections:
+                    loop.remove_reader(conn.fileno())
+                self.runner.stop()
+            if self.store:
+                self.store.close()
+
+    def start_listener(self):
+        asyncio.run(self.serve())
+
+
+if __name__ == "__main__":
+    listener = AsyncGameListener()
+    listener.start_listener()
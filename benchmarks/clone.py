@@ -0,0 +1,70 @@
+import argparse
+import copy
+import random
+import time
+
+from decisions import DeferredDecisionProvider, RandomDecisionProvider
+from gameLogic import Game, Player
+from gamelog import log, NullSink
+import simulate
+
+# Cost of branching a mid-game position, the inner loop of any search AI:
+# copy.deepcopy of the whole game, Game.clone(), and an apply()/undo() pair
+# on the journal.
+
+
+def midgame(seed=1, turn=8):
+    """Plays random moves up to the given turn, then leaves the game waiting on a decision."""
+    rng = random.Random(seed)
+    players = []
+    for i in range(2):
+        player = Player(f"Player {i + 1}", [], RandomDecisionProvider(rng.randrange(2**32)))
+        player.deck = simulate.build_random_deck(player, rng)
+        players.append(player)
+    game = Game(players, seed=rng.randrange(2**32))
+    game.setup()
+    game.run_until(lambda event: game.turn_number >= turn)
+    for player in players:
+        player.decisions = DeferredDecisionProvider()
+    game.run()
+    return game
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def run(repeat=2000, seed=1, turn=8):
+    previous_sink = log.set_sink(NullSink())
+    try:
+        game = midgame(seed, turn)
+        choice = game.legal_actions()[0]
+
+        def apply_undo():
+            game.apply(choice)
+            game.undo()
+
+        deepcopy = timed(lambda: copy.deepcopy(game), max(repeat // 10, 1))
+        clone = timed(game.clone, repeat)
+        journal = timed(apply_undo, repeat)
+    finally:
+        log.set_sink(previous_sink)
+    return {"turn": game.turn_number, "deepcopy_seconds": deepcopy, "clone_seconds": clone,
+            "apply_undo_seconds": journal}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cost of copying and undoing game states.")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--turn", type=int, default=8)
+    args = parser.parse_args()
+
+    report = run(args.repeat, turn=args.turn)
+    print(f"Position at turn {report['turn']}")
+    print(f"copy.deepcopy: {report['deepcopy_seconds'] * 1e6:.0f} us")
+    print(f"Game.clone:    {report['clone_seconds'] * 1e6:.0f} us "
+          f"({report['deepcopy_seconds'] / report['clone_seconds']:.1f}x faster)")
+    print(f"apply + undo:  {report['apply_undo_seconds'] * 1e6:.0f} us")
@@ -0,0 +1,177 @@
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+from corebase import Stack
+from creature import Creature
+from decisions import ScriptedDecisionProvider
+from gameLogic import GameListener, Player
+from protocol import encode_message
+import simulate
+
+# Seeded workloads for the engine's hot paths. Every benchmark returns
+# operations per second, the best of `repeat` timed runs; setup between runs
+# is not timed. Run them through benchmarks.suite.
+
+
+def best_rate(setup, action, operations, repeat):
+    """Operations per second of the fastest run. setup() builds fresh state for each run."""
+    best = 0.0
+    for _ in range(repeat):
+        state = setup()
+        started = time.perf_counter()
+        action(state)
+        elapsed = time.perf_counter() - started
+        best = max(best, operations / elapsed if elapsed else 0.0)
+    return best
+
+
+def new_player(name="Bench"):
+    return Player(name, [], ScriptedDecisionProvider([]))
+
+
+def stack_resolution(repeat=5, depth=2000):
+    """Stack.add then resolve_all with a deep stack."""
+    def setup():
+        player = new_player()
+        return [simulate.registry.create("Ember Whelp", player) for _ in range(depth)]
+
+    def action(cards):
+        stack = Stack()
+        for card in cards:
+            stack.add(card)
+        stack.resolve_all()
+
+    return best_rate(setup, action, depth, repeat)
+
+
+def combat_damage(repeat=5, blockers=200, fights=20):
+    """Creature.assign_combat_damage for a trampling attacker against many blockers."""
+    attacker_player, defender = new_player("Attacker"), new_player("Defender")
+
+    def setup():
+        fighters = []
+        for i in range(fights):
+            attacker = Creature("Bench Colossus", {}, blockers * 3, blockers * 5, attacker_player, {"Trample"})
+            wall = [simulate.registry.create("Grove Sentinel", defender) for _ in range(blockers)]
+            for creature in [attacker] + wall:
+                creature.zone = "battlefield"
+            fighters.append((attacker, wall))
+        return fighters
+
+    def action(fighters):
+        for attacker, wall in fighters:
+            attacker.assign_combat_damage(wall)
+
+    return best_rate(setup, action, fights * blockers, repeat)
+
+
+def creature_damage(repeat=5, creatures=5000):
+    """Creature.take_damage on a large board, none of it lethal."""
+    def setup():
+        player = new_player()
+        board = [simulate.registry.create("Vault Warden", player) for _ in range(creatures)]
+        for creature in board:
+            creature.zone = "battlefield"
+        return board
+
+    def action(board):
+        for creature in board:
+            creature.take_damage(1)
+
+    return best_rate(setup, action, creatures, repeat)
+
+
+def card_payment(repeat=5, cards=200):
+    """Player.play_card paying for creatures from the pool and untapped priests."""
+    def setup():
+        rng = random.Random(1)
+        player = new_player()
+        player.priests = [simulate.registry.create(f"{m} Priest", player) for m in simulate.MATERIALS for _ in range(cards)]
+        for priest in player.priests:
+            priest.zone = "battlefield"
+        player.hand = [simulate.registry.create(rng.choice(simulate.CREATURE_POOL)[0], player) for _ in range(cards)]
+        return player
+
+    def action(player):
+        stack = Stack()
+        for card in list(player.hand):
+            player.play_card(card, stack)
+
+    return best_rate(setup, action, cards, repeat)
+
+
+def untap_board(repeat=5, permanents=2000):
+    """Player.untap_all with a large tapped board."""
+    def setup():
+        player = new_player()
+        player.creatures = [simulate.registry.create("Blood Courier", player) for _ in range(permanents // 2)]
+        player.priests = [simulate.registry.create("W Priest", player) for _ in range(permanents // 2)]
+        for permanent in player.permanents():
+            permanent.tapped = True
+        return player
+
+    def action(player):
+        player.untap_all()
+
+    return best_rate(setup, action, permanents, repeat)
+
+
+def simulated_games(repeat=3, games=100):
+    """Full random-vs-random games per second."""
+    return best_rate(lambda: None, lambda _: simulate.run_batch(games, seed=0), games, repeat)
+
+
+def _serve_listener(conn):
+    """Listener process for listener_accepts, with its per-connection prints silenced."""
+    sys.stdout = open(os.devnull, "w")
+    listener = GameListener(host="127.0.0.1", port=0)
+    listener.server.listen(128)
+    conn.send(listener.server.getsockname()[1])
+    listener.start_listener()
+
+
+def listener_accepts(repeat=3, clients=300, concurrency=16):
+    """GameListener joins handled per second from a local client swarm. Each client
+    waits until the server has read its join request and closed the connection.
+    Every client joins its own tier so no games start."""
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=_serve_listener, args=(child,), daemon=True)
+    server.start()
+    port = parent.recv()
+    run_ids = iter(range(repeat))
+    per_thread = clients // concurrency
+
+    def client(run, first):
+        for i in range(first, first + per_thread):
+            with socket.create_connection(("127.0.0.1", port)) as conn:
+                conn.sendall(encode_message({"name": f"bench-{run}-{i}", "deck": [], "tier": f"bench-{run}-{i}"}))
+                conn.recv(1)  # Returns once the server has handled the join and hung up
+
+    def action(run):
+        threads = [threading.Thread(target=client, args=(run, t * per_thread)) for t in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    try:
+        return best_rate(lambda: next(run_ids), action, per_thread * concurrency, repeat)
+    finally:
+        server.terminate()
+        server.join()
+
+
+BENCHMARKS = {
+    "stack_resolution": stack_resolution,
+    "combat_damage": combat_damage,
+    "creature_damage": creature_damage,
+    "card_payment": card_payment,
+    "untap_board": untap_board,
+    "simulated_games": simulated_games,
+    "listener_accepts": listener_accepts,
+}
@@ -0,0 +1,96 @@
+import argparse
+import random
+import tracemalloc
+
+from decisions import ScriptedDecisionProvider
+from gameLogic import Game, Player
+from gamelog import log, NullSink
+import simulate
+
+# Bytes held per in-play game, with cards as slotted instances sharing their
+# CardDefinition ("after") and with the old layout where every card carried
+# its own dicts and copies of the static data ("before").
+
+
+class LegacyCard:
+    """Reproduces the attribute layout cards had before definitions were shared.
+    It keeps a reference to its definition as well, since the hand's legal move
+    index files cards by definition.cost_key."""
+
+    def __init__(self, definition, owner):
+        self.definition = definition
+        self.name = definition.name
+        self.material_cost = dict(definition.material_cost)
+        self.owner = owner
+        self.controller = owner
+        self.abilities = {}
+        self.type = definition.card_class.type
+        self.tapped = False
+        self.keywords = set()
+        self.zone = "battlefield"
+        self.activated_abilities = {}
+        if definition.power is not None:
+            self.power = definition.power
+            self.toughness = definition.toughness
+            self.base_toughness = definition.toughness
+            self.summoning_sick = True
+        if definition.primary_material:
+            self.primary_material = definition.primary_material
+            self.secondary_material = definition.secondary_material
+            self.abilities["on_tap"] = self.add_materials
+
+    def add_materials(self):
+        pass
+
+
+def build_games(count, legacy):
+    games = []
+    for seed in range(count):
+        rng = random.Random(seed)
+        players = []
+        for i in range(2):
+            player = Player(f"Player {i + 1}", [], ScriptedDecisionProvider([]))
+            deck = simulate.build_random_deck(player, rng)
+            if legacy:
+                deck = [LegacyCard(card.definition, player) for card in deck]
+            player.deck = deck
+            players.append(player)
+        game = Game(players, seed=seed)
+        game.setup()
+        games.append(game)
+    return games
+
+
+def measure(count, legacy):
+    """Average bytes allocated per set up game."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    games = build_games(count, legacy)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    assert len(games) == count
+    return total / count
+
+
+def run(count=200):
+    previous_sink = log.set_sink(NullSink())
+    try:
+        build_games(1, False)  # Warm up imports and caches before measuring
+        legacy = measure(count, True)
+        shared = measure(count, False)
+    finally:
+        log.set_sink(previous_sink)
+    return {"games": count, "legacy_bytes_per_game": legacy, "bytes_per_game": shared,
+            "saving": 1 - shared / legacy}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure memory held per in-play game.")
+    parser.add_argument("--games", type=int, default=200)
+    args = parser.parse_args()
+
+    report = run(args.games)
+    print(f"Per-instance card data: {report['legacy_bytes_per_game']:.0f} bytes/game")
+    print(f"Shared definitions + __slots__: {report['bytes_per_game']:.0f} bytes/game "
+          f"({report['saving']:.0%} less)")
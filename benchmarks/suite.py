@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from gamelog import log, NullSink
+from benchmarks.hotpaths import BENCHMARKS
+
+# Runs the hot path benchmarks, writes a JSON report and compares it with the
+# checked-in baseline:
+#
+#     python -m benchmarks.suite --report report.json
+#     python -m benchmarks.suite --update-baseline
+#
+# Each benchmark runs `repeats` times. Noise on a busy machine only ever makes
+# a run slower, so the result is the best rate, and every run's rate is kept in
+# samples. The baseline's samples give the spread its machine showed: a result
+# more than `tolerance` below the slowest baseline sample is flagged as a
+# regression. Regressions are reported, and only fail the run with --strict.
+# Baselines are only comparable on similar hardware, so the report records the
+# machine and a comparison against a baseline from a different one says so.
+# Refresh baseline.json from the machine that runs the comparison.
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def cpu_model():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def machine_info():
+    """What a rate depends on besides the code: the interpreter and the hardware."""
+    return {
+        "python": f"{platform.python_implementation()} {platform.python_version()}",
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu": cpu_model(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run(names=None, repeats=5):
+    """Runs the selected benchmarks (all by default) `repeats` times each with
+    logging off. Results are best rates; every run's rate is kept in samples."""
+    previous_sink = log.set_sink(NullSink())
+    try:
+        samples = {}
+        for name in names or BENCHMARKS:
+            samples[name] = [BENCHMARKS[name]() for _ in range(repeats)]
+    finally:
+        log.set_sink(previous_sink)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeats": repeats,
+        "environment": machine_info(),
+        "results": {name: max(rates) for name, rates in samples.items()},
+        "samples": samples,
+    }
+
+
+def compare(report, baseline, tolerance=0.1):
+    """Per benchmark (name, rate, baseline rate, change, regressed) rows. The
+    change is against the baseline's best; regressed compares with its slowest sample."""
+    rows = []
+    for name, rate in report["results"].items():
+        reference = baseline["results"].get(name) if baseline else None
+        change = rate / reference - 1 if reference else None
+        slowest = min(baseline.get("samples", {}).get(name) or [reference]) if reference else None
+        rows.append((name, rate, reference, change, slowest is not None and rate < slowest * (1 - tolerance)))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark engine hot paths against the stored baseline.")
+    parser.add_argument("names", nargs="*", help="Benchmarks to run, all by default: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--report", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per benchmark; the best is compared")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Slowdown below the slowest baseline sample that is a regression, 0.1 is 10%%")
+    parser.add_argument("--strict", action="store_true", help="Exit with status 1 when anything regressed")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark {', '.join(unknown)} (choose from {', '.join(BENCHMARKS)})")
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+
+    report = run(args.names, args.repeats)
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != report["environment"]:
+            print(f"Baseline was recorded on a different machine ({baseline.get('environment')}); "
+                  f"rates may not be comparable", file=sys.stderr)
+    rows = compare(report, baseline, args.tolerance)
+    report["comparison"] = {name: {"rate": rate, "baseline": reference, "change": change, "regressed": regressed}
+                            for name, rate, reference, change, regressed in rows}
+
+    for name, rate, reference, change, regressed in rows:
+        against = f"{change:+.1%} vs {reference:,.0f}" if reference else "no baseline"
+        print(f"{name:<18} {rate:>14,.0f} ops/s  {against}{'  REGRESSION' if regressed else ''}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({key: value for key, value in report.items() if key != "comparison"}, f, indent=2)
+            f.write("\n")
+    sys.exit(1 if args.strict and any(row[4] for row in rows) and not args.update_baseline else 0)
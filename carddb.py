@@ -0,0 +1,223 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+from artifacts import Artifact
+from cardregistry import registry
+from creature import Creature
+from enchantments import Enchantment
+from keywords import to_flags, to_names
+from locations import Location
+from preists import Priest
+
+# Precompiled card database. A JSON card list is compiled once into a flat
+# binary file that is memory mapped at startup; cards are then known by their
+# index in that file, so a client's deck is just a list of card ids:
+#
+#     python carddb.py compile cards.json cards.db
+#     {"name": "Alice", "deck": [3, 3, 7, 12, ...]}
+#
+# File layout (little endian):
+#   header   magic, version, card count, sha256 of the source JSON,
+#            offsets of the cost and string sections
+#   records  one fixed size RECORD per card id
+#   costs    COST entries; a record points at its run with (start, count)
+#   strings  count, count + 1 offsets, then the UTF-8 bytes of every name and material
+# Records are only decoded (and their definitions interned) the first time a
+# deck uses them. Validated decklists are cached by a digest of their ids, so a
+# returning deck costs one hash and one list of object allocations.
+
+MAGIC = b"CARD"
+VERSION = 1
+HEADER = struct.Struct("<4sHI32sII")
+RECORD = struct.Struct("<BIhhhIIIIH")  # type, name, power, toughness, loyalty, keywords, primary, secondary, cost start, cost count
+COST = struct.Struct("<IH")  # material string, amount
+NONE = -32768  # Stored for missing power, toughness and loyalty
+
+CARD_TYPES = [Creature, Priest, Artifact, Enchantment, Location]  # Record type codes are indices into this list
+TYPE_CODES = {card_class.type: code for code, card_class in enumerate(CARD_TYPES)}
+
+DEFAULT_PATH = os.environ.get("CARD_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cards.db"))
+MAX_CACHED_DECKS = 4096
+
+
+def describe(definition):
+    """A card definition as a source entry, the form compile_cards reads."""
+    entry = {"type": definition.card_class.type, "name": definition.name}
+    if definition.material_cost:
+        entry["cost"] = dict(definition.material_cost)
+    for field in ("power", "toughness", "loyalty"):
+        if getattr(definition, field) is not None:
+            entry[field] = getattr(definition, field)
+    if definition.keyword_flags:
+        entry["keywords"] = sorted(to_names(definition.keyword_flags))
+    if definition.primary_material:
+        entry["material"] = definition.primary_material
+    if definition.secondary_material:
+        entry["secondary_material"] = definition.secondary_material
+    return entry
+
+
+def compile_cards(entries, path):
+    """Writes the card database for a list of source entries. A card's id is its
+    position in the list, so append new cards rather than reordering."""
+    strings = {}  # text -> string index
+
+    def intern(text):
+        return strings.setdefault(text, len(strings))
+
+    def number(entry, field):
+        value = entry.get(field)
+        return NONE if value is None else int(value)
+
+    records, costs, names = bytearray(), bytearray(), set()
+    cost_count = 0
+    for card_id, entry in enumerate(entries):
+        try:
+            if entry["name"] in names:
+                raise ValueError("duplicate name")
+            names.add(entry["name"])
+            cost = sorted(entry.get("cost", {}).items())
+            for material, amount in cost:
+                costs += COST.pack(intern(material), int(amount))
+            records += RECORD.pack(TYPE_CODES[entry["type"]], intern(entry["name"]), number(entry, "power"),
+                                   number(entry, "toughness"), number(entry, "loyalty"),
+                                   to_flags(entry.get("keywords")),
+                                   intern(entry["material"]) + 1 if entry.get("material") else 0,
+                                   intern(entry["secondary_material"]) + 1 if entry.get("secondary_material") else 0,
+                                   cost_count, len(cost))
+            cost_count += len(cost)
+        except (KeyError, TypeError, ValueError, struct.error) as e:
+            raise ValueError(f"Invalid card {card_id} {entry!r}: {e!r}")
+
+    encoded = [text.encode("utf-8") for text in strings]
+    offsets, position = [], 0
+    for text in encoded:
+        offsets.append(position)
+        position += len(text)
+    offsets.append(position)
+    string_section = struct.pack(f"<I{len(offsets)}I", len(encoded), *offsets) + b"".join(encoded)
+
+    source_hash = hashlib.sha256(json.dumps(entries, sort_keys=True).encode("utf-8")).digest()
+    costs_offset = HEADER.size + len(records)
+    strings_offset = costs_offset + len(costs)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(entries), source_hash, costs_offset, strings_offset))
+        f.write(records)
+        f.write(costs)
+        f.write(string_section)
+
+
+class CardDatabase:
+    """Memory mapped view of a compiled card database, opened on first use."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.data = None
+        self.decks = {}  # Digest of a validated decklist -> tuple of its definitions
+
+    def open(self):
+        with open(self.path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.source_hash, self.costs_offset, self.strings_offset = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} card database.")
+        self.string_count = struct.unpack_from("<I", data, self.strings_offset)[0]
+        self.definitions = [None] * self.count  # Decoded lazily by definition()
+        self.by_name = None
+        self.decks.clear()
+        self.data = data
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+
+    def __len__(self):
+        if self.data is None:
+            self.open()
+        return self.count
+
+    def string(self, index):
+        start, end = struct.unpack_from("<II", self.data, self.strings_offset + 4 + index * 4)
+        base = self.strings_offset + 4 + (self.string_count + 1) * 4
+        return self.data[base + start:base + end].decode("utf-8")
+
+    def definition(self, card_id):
+        """The shared CardDefinition of a card id."""
+        if self.data is None:
+            self.open()
+        definition = self.definitions[card_id]
+        if definition is None:
+            (type_code, name, power, toughness, loyalty, keyword_flags, primary, secondary,
+             cost_start, cost_count) = RECORD.unpack_from(self.data, HEADER.size + card_id * RECORD.size)
+            cost = {}
+            for i in range(cost_start, cost_start + cost_count):
+                material, amount = COST.unpack_from(self.data, self.costs_offset + i * COST.size)
+                cost[self.string(material)] = amount
+            definition = self.definitions[card_id] = registry.intern(
+                CARD_TYPES[type_code], self.string(name), cost,
+                power=None if power == NONE else power,
+                toughness=None if toughness == NONE else toughness,
+                keywords=keyword_flags,
+                primary_material=self.string(primary - 1) if primary else None,
+                secondary_material=self.string(secondary - 1) if secondary else None,
+                loyalty=None if loyalty == NONE else loyalty)
+        return definition
+
+    def card_id(self, name):
+        """The id of the card with this name."""
+        if self.by_name is None:
+            self.by_name = {self.definition(card_id).name: card_id for card_id in range(len(self))}
+        return self.by_name[name]
+
+    def validate(self, card_ids):
+        """The definitions for a decklist of card ids. Raises ValueError for anything
+        that is not a known id; accepted decklists are remembered by digest."""
+        if self.data is None:
+            self.open()
+        try:
+            digest = hashlib.blake2b(struct.pack(f"<{len(card_ids)}I", *card_ids), digest_size=16).digest()
+        except (struct.error, TypeError):
+            raise ValueError("Decks must be lists of card ids.")
+        deck = self.decks.get(digest)
+        if deck is None:
+            for card_id in card_ids:
+                if type(card_id) is not int or card_id >= self.count:
+                    raise ValueError(f"Unknown card id {card_id!r}.")
+            deck = tuple(self.definition(card_id) for card_id in card_ids)
+            if len(self.decks) >= MAX_CACHED_DECKS:
+                del self.decks[next(iter(self.decks))]  # Drop the oldest decklist
+            self.decks[digest] = deck
+        return deck
+
+    def instantiate(self, card_ids, owner):
+        """Builds every card of a decklist for the given owner in one pass."""
+        return [definition.card_class.from_definition(definition, owner) for definition in self.validate(card_ids)]
+
+
+database = CardDatabase()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile a JSON card list into a card database.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    compile_parser = subcommands.add_parser("compile", help="Compile SOURCE (a JSON list of cards) into OUTPUT")
+    compile_parser.add_argument("source")
+    compile_parser.add_argument("output", nargs="?", default=DEFAULT_PATH)
+    list_parser = subcommands.add_parser("list", help="Print the id and name of every card in a database")
+    list_parser.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        with open(args.source, encoding="utf-8") as f:
+            entries = json.load(f)
+        compile_cards(entries, args.output)
+        print(f"Compiled {len(entries)} cards into {args.output}")
+    else:
+        listed = CardDatabase(args.path)
+        for card_id in range(len(listed)):
+            print(f"{card_id:5d}  {listed.definition(card_id).name}")
@@ -0,0 +1,76 @@
+from types import MappingProxyType
+
+from keywords import to_flags
+from payment import as_key
+
+# Flyweight card data. A CardDefinition holds everything that is the same for
+# every copy of a card (name, cost, base stats, keywords) and is shared by all
+# its instances; card objects only keep their mutable, in-game state.
+
+
+class CardDefinition:
+    __slots__ = ("card_class", "name", "material_cost", "cost_key", "power", "toughness", "keyword_flags",
+                 "primary_material", "secondary_material", "loyalty")
+
+    def __init__(self, card_class, name, material_cost, power=None, toughness=None, keyword_flags=0,
+                 primary_material=None, secondary_material=None, loyalty=None):
+        for field, value in (("card_class", card_class), ("name", name),
+                             ("material_cost", MappingProxyType(dict(material_cost or {}))),
+                             ("power", power), ("toughness", toughness), ("keyword_flags", keyword_flags),
+                             ("primary_material", primary_material), ("secondary_material", secondary_material),
+                             ("loyalty", loyalty)):
+            object.__setattr__(self, field, value)
+        object.__setattr__(self, "cost_key", as_key(self.material_cost))  # Sorted cost tuple for the payment solver
+
+    def __setattr__(self, field, value):
+        raise AttributeError("Card definitions are shared and cannot be changed.")
+
+    def key(self):
+        return (self.card_class, self.name, self.cost_key, self.power,
+                self.toughness, self.keyword_flags, self.primary_material, self.secondary_material, self.loyalty)
+
+    def __reduce__(self):
+        # Unpickled or copied definitions are interned again so they stay shared
+        return (_intern, (self.card_class, self.name, dict(self.material_cost), self.power, self.toughness,
+                          self.keyword_flags, self.primary_material, self.secondary_material, self.loyalty))
+
+    def __repr__(self):
+        return f"CardDefinition({self.card_class.__name__}, {self.name!r})"
+
+
+class CardRegistry:
+    def __init__(self):
+        self.definitions = {}  # name -> definition registered with define()
+        self.interned = {}  # key() -> definition, for cards built straight from constructors
+
+    def intern(self, card_class, name, material_cost, power=None, toughness=None, keywords=None,
+               primary_material=None, secondary_material=None, loyalty=None):
+        """Returns the shared definition for these card stats, creating it the first time."""
+        definition = CardDefinition(card_class, name, material_cost, power, toughness, to_flags(keywords),
+                                    primary_material, secondary_material, loyalty)
+        return self.interned.setdefault(definition.key(), definition)
+
+    def define(self, card_class, name, material_cost=None, **stats):
+        """Registers a named card so decks can be built from names with create()."""
+        definition = self.intern(card_class, name, material_cost, **stats)
+        existing = self.definitions.setdefault(name, definition)
+        if existing is not definition:
+            raise ValueError(f"A different card named {name!r} is already registered.")
+        return definition
+
+    def get(self, name):
+        return self.definitions[name]
+
+    def create(self, name, owner):
+        """Instantiates a registered card for the given owner."""
+        definition = self.definitions[name]
+        return definition.card_class.from_definition(definition, owner)
+
+
+registry = CardRegistry()
+
+
+def _intern(card_class, name, material_cost, power, toughness, keyword_flags, primary_material,
+            secondary_material, loyalty):
+    return registry.intern(card_class, name, material_cost, power, toughness, keyword_flags,
+                           primary_material, secondary_material, loyalty)
@@ -0,0 +1,111 @@
+from gamelog import log
+from keywords import DEATHTOUCH, DOUBLE_STRIKE, FIRST_STRIKE, LIFELINK, MENACE, STRIKES_FIRST, TRAMPLE
+
+# Combat resolver: evaluates a whole declared attack (attackers plus the
+# ordered blockers of each) in one pass, with a first strike damage step
+# only when someone in the fight strikes first.
+
+
+class CombatResult:
+    def __init__(self):
+        self.player_damage = 0  # Damage dealt to the defending player
+        self.destroyed = []  # Creatures that died during combat
+        self.life_gained = 0  # Life gained through Lifelink
+
+
+def remove_illegal_blocks(blocks):
+    """Menace attackers blocked by a single creature count as unblocked."""
+    for attacker, blockers in list(blocks.items()):
+        if attacker.keyword_flags & MENACE and len(blockers) == 1:
+            log.emit("block_menace", "{attacker} has Menace and must be blocked by at least two creatures.",
+                     card=blockers[0].name, attacker=attacker.name)
+            del blocks[attacker]
+
+
+def on_battlefield(creature):
+    return creature.zone == "battlefield"
+
+
+def strikes_in_step(creature, first_step):
+    """First and Double Strike creatures deal damage in the first step, everything
+    without First Strike (Double Strike included) in the regular step."""
+    flags = creature.keyword_flags
+    if first_step:
+        return flags & STRIKES_FIRST
+    return flags & DOUBLE_STRIKE or not flags & FIRST_STRIKE
+
+
+def split_damage(attacker, blockers):
+    """Assigns an attacker's damage to its living blockers in order, lethal damage
+    first. Returns the assignments and the excess that tramples over."""
+    living = [blocker for blocker in blockers if on_battlefield(blocker)]
+    flags = attacker.keyword_flags
+    remaining = attacker.power
+    assignments = []
+    for i, blocker in enumerate(living):
+        if remaining <= 0:
+            break
+        lethal = 1 if flags & DEATHTOUCH else max(blocker.toughness, 0)
+        if i == len(living) - 1 and not flags & TRAMPLE:
+            amount = remaining  # The last blocker takes whatever is left
+        else:
+            amount = min(remaining, lethal)
+        assignments.append((blocker, amount))
+        remaining -= amount
+    return assignments, remaining if flags & TRAMPLE else 0
+
+
+def damage_step(attackers, blocks, defending_player, first_step, result):
+    """Works out every creature's damage for one step, then deals it simultaneously."""
+    creature_damage = []  # (source, target, amount)
+    player_damage = []  # (source, amount)
+    for attacker in attackers:
+        if not on_battlefield(attacker):
+            continue
+        blockers = blocks.get(attacker)
+        if strikes_in_step(attacker, first_step) and attacker.power > 0:
+            if blockers is None:
+                player_damage.append((attacker, attacker.power))
+            else:
+                assignments, excess = split_damage(attacker, blockers)
+                creature_damage.extend((attacker, blocker, amount) for blocker, amount in assignments)
+                if excess > 0:
+                    player_damage.append((attacker, excess))
+        for blocker in blockers or ():
+            if on_battlefield(blocker) and strikes_in_step(blocker, first_step) and blocker.power > 0:
+                creature_damage.append((blocker, attacker, blocker.power))
+
+    for source, target, amount in creature_damage:
+        if source.keyword_flags & LIFELINK:
+            source.controller.gain_life(amount)
+            result.life_gained += amount
+        if not on_battlefield(target):
+            continue
+        target.take_damage(amount)
+        if source.keyword_flags & DEATHTOUCH and on_battlefield(target):
+            target.destroy()
+        if not on_battlefield(target):
+            result.destroyed.append(target)
+
+    for source, amount in player_damage:
+        if source.keyword_flags & LIFELINK:
+            source.controller.gain_life(amount)
+            result.life_gained += amount
+        result.player_damage += amount
+        if defending_player is not None:
+            log.emit("unblocked_damage", "{card} deals {damage} damage to {player}!",
+                     card=source.name, player=defending_player.name, damage=amount)
+            defending_player.take_damage(amount)
+
+
+def resolve_combat(attackers, blocks, defending_player=None):
+    """Resolves a declared attack. blocks maps each blocked attacker to its ordered
+    blockers. Damage to the player is only dealt when defending_player is given."""
+    result = CombatResult()
+    participants = list(attackers)
+    for blockers in blocks.values():
+        participants.extend(blockers)
+    if any(creature.keyword_flags & STRIKES_FIRST for creature in participants):
+        damage_step(attackers, blocks, defending_player, True, result)
+    damage_step(attackers, blocks, defending_player, False, result)
+    return result
@@ -0,0 +1,263 @@
+import argparse
+import itertools
+import random
+import time
+
+import numpy as np
+
+from keywords import (BLOCKS_FLYING, DEATHTOUCH, DOUBLE_STRIKE, FIRST_STRIKE, FLYING, INDESTRUCTIBLE, LIFELINK,
+                      MENACE, STRIKES_FIRST, TRAMPLE)
+
+# Batched combat evaluation for block planning. Every way the defender could
+# assign its blockers is one row; attackers and blockers are columns holding
+# power, toughness and keyword bits. Both damage steps run as array operations
+# over all rows at once, with the same rules as combat.resolve_combat:
+# Menace, First and Double Strike, Trample, Deathtouch, Indestructible and
+# Lifelink. differential_check() plays the same fights through the Creature
+# objects and compares the results.
+
+
+class BlockOutcomes:
+    """Results of every block assignment, one row each."""
+
+    def __init__(self, assignments, attacker_alive, blocker_alive, attacker_toughness, blocker_toughness,
+                 player_damage, attacker_life_gained, defender_life_gained):
+        self.assignments = assignments  # (rows, blockers) attacker index per blocker, -1 for no block
+        self.attacker_alive = attacker_alive
+        self.blocker_alive = blocker_alive
+        self.attacker_toughness = attacker_toughness
+        self.blocker_toughness = blocker_toughness
+        self.player_damage = player_damage
+        self.attacker_life_gained = attacker_life_gained
+        self.defender_life_gained = defender_life_gained
+
+
+def legal_blocks(attackers, blockers):
+    """(blockers, attackers) bool matrix of which blocker may block which attacker."""
+    allowed = np.ones((len(blockers), len(attackers)), dtype=bool)
+    for b, blocker in enumerate(blockers):
+        for a, attacker in enumerate(attackers):
+            if attacker.keyword_flags & FLYING and not blocker.keyword_flags & BLOCKS_FLYING:
+                allowed[b, a] = False
+    return allowed
+
+
+def enumerate_assignments(attackers, blockers, limit=200000):
+    """Every legal block assignment as an int array of shape (rows, blockers)."""
+    allowed = legal_blocks(attackers, blockers)
+    choices = [[-1] + [int(a) for a in np.flatnonzero(allowed[b])] for b in range(len(blockers))]
+    count = 1
+    for options in choices:
+        count *= len(options)
+    if count > limit:
+        raise ValueError(f"{count} block assignments is more than the limit of {limit}.")
+    if not blockers:
+        return np.zeros((1, 0), dtype=np.int16)
+    return np.array(list(itertools.product(*choices)), dtype=np.int16).reshape(count, len(blockers))
+
+
+def _strikes(flags, first_step):
+    if first_step:
+        return (flags & STRIKES_FIRST) != 0
+    return ((flags & DOUBLE_STRIKE) != 0) | ((flags & FIRST_STRIKE) == 0)
+
+
+def evaluate_blocks(attackers, blockers, assignments):
+    """Resolves every assignment row and returns BlockOutcomes."""
+    rows, attacker_count = len(assignments), len(attackers)
+    a_power = np.array([c.power for c in attackers], dtype=np.int32)
+    a_flags = np.array([int(c.keyword_flags) for c in attackers], dtype=np.int64)
+    b_power = np.array([c.power for c in blockers], dtype=np.int32)
+    b_flags = np.array([int(c.keyword_flags) for c in blockers], dtype=np.int64)
+
+    # Menace attackers blocked by a single creature count as unblocked
+    blocks = assignments.astype(np.int16, copy=True)
+    counts = np.stack([(blocks == a).sum(axis=1) for a in range(attacker_count)], axis=1) \
+        if attacker_count else np.zeros((rows, 0), dtype=np.int64)
+    menace = (a_flags & MENACE) != 0
+    for a in np.flatnonzero(menace):
+        single = counts[:, a] == 1
+        blocks[single[:, None] & (blocks == a)] = -1
+        counts[single, a] = 0
+    blocked = counts > 0
+
+    a_tough = np.tile(np.array([c.toughness for c in attackers], dtype=np.int32), (rows, 1))
+    b_tough = np.tile(np.array([c.toughness for c in blockers], dtype=np.int32), (rows, 1))
+    a_alive = np.ones((rows, attacker_count), dtype=bool)
+    b_alive = np.ones((rows, len(blockers)), dtype=bool)
+    player_damage = np.zeros(rows, dtype=np.int32)
+    attacker_gain = np.zeros(rows, dtype=np.int32)
+    defender_gain = np.zeros(rows, dtype=np.int32)
+
+    # A first strike step only happens in fights where someone strikes first
+    has_first = np.full(rows, bool((a_flags & STRIKES_FIRST).any()))
+    if len(blockers):
+        has_first |= ((blocks >= 0) & ((b_flags & STRIKES_FIRST) != 0)).any(axis=1)
+
+    for first_step in (True, False):
+        active = has_first if first_step else np.ones(rows, dtype=bool)
+        a_strikes = _strikes(a_flags, first_step)
+        b_strikes = _strikes(b_flags, first_step)
+        a_damage = np.zeros_like(a_tough)
+        b_damage = np.zeros_like(b_tough)
+        a_deathtouched = np.zeros_like(a_alive)
+        b_deathtouched = np.zeros_like(b_alive)
+
+        for a in range(attacker_count):
+            fighting = active & a_alive[:, a]
+            lifelink = a_flags[a] & LIFELINK
+            if a_strikes[a] and a_power[a] > 0:
+                unblocked = fighting & ~blocked[:, a]
+                player_damage += np.where(unblocked, a_power[a], 0)
+                if lifelink:
+                    attacker_gain += np.where(unblocked, a_power[a], 0)
+
+                # Damage goes to the living blockers in order, lethal damage first
+                living = (blocks == a) & b_alive & (fighting & blocked[:, a])[:, None]
+                last = np.where(living.any(axis=1), len(blockers) - 1 - np.argmax(living[:, ::-1], axis=1), -1) \
+                    if len(blockers) else np.full(rows, -1)
+                remaining = np.where(fighting & blocked[:, a], a_power[a], 0)
+                trample = bool(a_flags[a] & TRAMPLE)
+                for b in range(len(blockers)):
+                    takes = living[:, b] & (remaining > 0)
+                    lethal = 1 if a_flags[a] & DEATHTOUCH else np.maximum(b_tough[:, b], 0)
+                    amount = np.minimum(remaining, lethal)
+                    if not trample:
+                        amount = np.where(last == b, remaining, amount)
+                    amount = np.where(takes, amount, 0)
+                    b_damage[:, b] += amount
+                    if a_flags[a] & DEATHTOUCH:
+                        b_deathtouched[:, b] |= amount > 0
+                    if lifelink:
+                        attacker_gain += amount
+                    remaining -= amount
+                if trample:
+                    excess = np.where(blocked[:, a] & fighting, remaining, 0)
+                    player_damage += excess
+                    if lifelink:
+                        attacker_gain += excess
+
+            for b in range(len(blockers)):
+                if b_strikes[b] and b_power[b] > 0:
+                    hits = fighting & (blocks[:, b] == a) & b_alive[:, b]
+                    a_damage[:, a] += np.where(hits, b_power[b], 0)
+                    if b_flags[b] & DEATHTOUCH:
+                        a_deathtouched[:, a] |= hits
+                    if b_flags[b] & LIFELINK:
+                        defender_gain += np.where(hits, b_power[b], 0)
+
+        # All damage of the step is dealt at once
+        for tough, alive, damage, deathtouched, flags in ((a_tough, a_alive, a_damage, a_deathtouched, a_flags),
+                                                           (b_tough, b_alive, b_damage, b_deathtouched, b_flags)):
+            mortal = (flags & INDESTRUCTIBLE) == 0
+            hit = alive & (damage > 0) & mortal
+            tough -= np.where(hit, damage, 0)
+            alive &= ~(hit & ((tough <= 0) | deathtouched))
+
+    return BlockOutcomes(assignments, a_alive, b_alive, a_tough, b_tough, player_damage, attacker_gain, defender_gain)
+
+
+def creature_value(creature):
+    return creature.power + creature.base_toughness
+
+
+def score_outcomes(attackers, blockers, outcomes, life_weight=1.0):
+    """Defender's view of each row: creature value traded plus life swing."""
+    a_value = np.array([creature_value(c) for c in attackers], dtype=np.float64)
+    b_value = np.array([creature_value(c) for c in blockers], dtype=np.float64)
+    killed = (~outcomes.attacker_alive).astype(np.float64) @ a_value if len(attackers) else 0.0
+    lost = (~outcomes.blocker_alive).astype(np.float64) @ b_value if len(blockers) else 0.0
+    life = outcomes.defender_life_gained - outcomes.player_damage - outcomes.attacker_life_gained
+    return killed - lost + life_weight * life
+
+
+def best_blocks(attackers, blockers, top=1, life_weight=1.0):
+    """The top block assignments for the defender, best first, as
+    (score, {attacker: [blockers in order]}) pairs."""
+    assignments = enumerate_assignments(attackers, blockers)
+    outcomes = evaluate_blocks(attackers, blockers, assignments)
+    scores = score_outcomes(attackers, blockers, outcomes, life_weight)
+    best = []
+    for row in np.argsort(-scores, kind="stable")[:top]:
+        blocks = {}
+        for b, a in enumerate(assignments[row]):
+            if a >= 0:
+                blocks.setdefault(attackers[a], []).append(blockers[b])
+        best.append((float(scores[row]), blocks))
+    return best
+
+
+def differential_check(trials=200, seed=0, max_attackers=3, max_blockers=3):
+    """Fights random creatures through both paths and raises AssertionError on any
+    difference. Returns the number of assignments compared."""
+    from combat import remove_illegal_blocks, resolve_combat
+    from creature import Creature
+    from gameLogic import Player
+    from gamelog import log, NullSink
+    from keywords import KEYWORD_NAMES
+
+    keywords = ["Flying", "Reach", "Menace", "Deathtouch", "Trample", "First Strike", "Double Strike",
+                "Indestructible", "Lifelink"]
+    assert all(name in KEYWORD_NAMES for name in keywords)
+    rng = random.Random(seed)
+    previous_sink = log.set_sink(NullSink())
+    compared = 0
+    try:
+        for trial in range(trials):
+            attacker_side, defender_side = Player("Attacker", []), Player("Defender", [])
+
+            def random_creature(owner, index):
+                chosen = [name for name in keywords if rng.random() < 0.2]
+                creature = Creature(f"Test {trial}.{index}", {}, rng.randint(0, 5), rng.randint(1, 5), owner, chosen)
+                creature.zone = "battlefield"
+                return creature
+
+            attackers = [random_creature(attacker_side, i) for i in range(rng.randint(1, max_attackers))]
+            blockers = [random_creature(defender_side, 10 + i) for i in range(rng.randint(0, max_blockers))]
+            assignments = enumerate_assignments(attackers, blockers)
+            outcomes = evaluate_blocks(attackers, blockers, assignments)
+
+            for row, assignment in enumerate(assignments):
+                memo = {id(attacker_side): Player("Attacker", []), id(defender_side): Player("Defender", [])}
+                copies_a = [creature.clone(memo) for creature in attackers]
+                copies_b = [creature.clone(memo) for creature in blockers]
+                for copy in copies_a + copies_b:
+                    copy.owner.creatures.append(copy)
+                blocks = {}
+                for b, a in enumerate(assignment):
+                    if a >= 0 and copies_b[b].block(copies_a[a]):
+                        blocks.setdefault(copies_a[a], []).append(copies_b[b])
+                remove_illegal_blocks(blocks)
+                defender = memo[id(defender_side)]
+                result = resolve_combat(copies_a, blocks, defender)
+
+                expected = (
+                    [c.zone == "battlefield" for c in copies_a], [c.zone == "battlefield" for c in copies_b],
+                    defender.health - 20, memo[id(attacker_side)].health - 20,
+                )
+                got = (
+                    outcomes.attacker_alive[row].tolist(), outcomes.blocker_alive[row].tolist(),
+                    int(outcomes.defender_life_gained[row] - outcomes.player_damage[row]),
+                    int(outcomes.attacker_life_gained[row]),
+                )
+                assert expected == got, (trial, assignment.tolist(), expected, got)
+                for copy, alive, tough in zip(copies_a + copies_b,
+                                              got[0] + got[1],
+                                              outcomes.attacker_toughness[row].tolist() + outcomes.blocker_toughness[row].tolist()):
+                    assert not alive or copy.toughness == tough, (trial, assignment.tolist(), copy.name)
+                assert result.player_damage == outcomes.player_damage[row]
+                compared += 1
+    finally:
+        log.set_sink(previous_sink)
+    return compared
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the batched combat evaluator against the Creature path.")
+    parser.add_argument("--trials", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    compared = differential_check(args.trials, args.seed)
+    print(f"{compared} block assignments agree ({time.perf_counter() - started:.1f}s)")
@@ -1,4 +1,9 @@
 from abc import ABC, abstractmethod
+from time import perf_counter
+
+from gamelog import log
+from cardregistry import registry
+from metrics import metrics
 
 # Stack to handle spell and ability resolution
 class Stack:
@@ -7,31 +12,113 @@ class Stack:
 
     def add(self, item):
         """Add an item to the stack (spells, abilities, permanents entering)."""
-        print(f"Added {item.name} to the stack.")
+        log.emit("stack_add", "Added {card} to the stack.", card=item.name, depth=len(self.stack) + 1)
         self.stack.append(item)
+        if metrics.enabled:
+            metrics.high_water("stack_depth", len(self.stack))
 
     def resolve_top(self):
         """Resolve the top item of the stack (Last In, First Out)."""
         if self.stack:
             item = self.stack.pop()
-            print(f"Resolving {item.name}...")
-            item.resolve()
+            log.emit("stack_resolve", "Resolving {card}...", card=item.name, depth=len(self.stack))
+            if metrics.enabled:
+                started = perf_counter()
+                item.resolve()
+                metrics.observe("stack_resolve_seconds", perf_counter() - started, item.type)
+            else:
+                item.resolve()
         else:
-            print("The stack is empty.")
+            log.emit("stack_empty", "The stack is empty.")
 
     def resolve_all(self):
         """Resolve everything on the stack in order."""
         while self.stack:
             self.resolve_top()
 
+def slot_names(cls):
+    """Every slot declared along a class's MRO, cached on the class."""
+    names = cls.__dict__.get("_slot_names")
+    if names is None:
+        names = tuple(slot for klass in reversed(cls.__mro__) for slot in klass.__dict__.get("__slots__", ()))
+        cls._slot_names = names
+    return names
+
+
 # Base Card Class
 class Card(ABC):
+    # Static card data lives in the shared CardDefinition; instances only hold game state
+    __slots__ = ("definition", "owner", "controller", "_abilities")
+    type = None  # Card type name used to decide when it can be cast
+    battlefield_zone = None  # The Player zone it occupies once played, None for cards that go on the stack
+    triggers = {}  # Built-in triggered abilities of the class, event -> method name
+
     def __init__(self, name, material_cost, owner):
-        self.name = name
-        self.material_cost = material_cost
+        self.setup(registry.intern(type(self), name, material_cost), owner)
+
+    def setup(self, definition, owner):
+        """Initialises the mutable state of a new card."""
+        self.definition = definition
         self.owner = owner  # The player who owns the card
         self.controller = owner  # The player currently controlling the card
-        self.abilities = {}  # Dictionary for triggered abilities
+        self._abilities = None  # Per-card triggered abilities, only created when needed
+
+    @classmethod
+    def from_definition(cls, definition, owner):
+        """Creates a card straight from a shared definition."""
+        card = cls.__new__(cls)
+        card.setup(definition, owner)
+        return card
+
+    def clone(self, memo):
+        """Copies this card's state for a cloned game. The definition stays shared and
+        owner/controller are mapped to the cloned players already in memo."""
+        copied = memo.get(id(self))
+        if copied is not None:
+            return copied
+        cls = type(self)
+        copied = cls.__new__(cls)
+        memo[id(self)] = copied
+        for slot in slot_names(cls):
+            try:
+                setattr(copied, slot, getattr(self, slot))
+            except AttributeError:
+                pass
+        copied.owner = memo.get(id(self.owner), self.owner)
+        copied.controller = memo.get(id(self.controller), self.controller)
+        if self._abilities is not None:
+            copied._abilities = {
+                event: getattr(copied, handler.__name__) if getattr(handler, "__self__", None) is self else handler
+                for event, handler in self._abilities.items()
+            }
+        return copied
+
+    @property
+    def name(self):
+        return self.definition.name
+
+    @property
+    def material_cost(self):
+        return self.definition.material_cost
+
+    @property
+    def abilities(self):
+        """Dictionary for triggered abilities, seeded with the class's built-in triggers."""
+        if self._abilities is None:
+            self._abilities = dict(self.iter_abilities())
+        return self._abilities
+
+    def iter_abilities(self):
+        """(event, handler) pairs without creating the per-card dictionary."""
+        if self._abilities is not None:
+            return iter(list(self._abilities.items()))
+        return ((event, getattr(self, method)) for event, method in self.triggers.items())
+
+    def get_ability(self, event):
+        if self._abilities is not None:
+            return self._abilities.get(event)
+        method = self.triggers.get(event)
+        return getattr(self, method) if method else None
 
     @abstractmethod
     def play(self, game_stack):
@@ -40,7 +127,14 @@ class Card(ABC):
 
     def trigger_ability(self, event, *args):
         """Triggers an ability based on an event."""
-        if event in self.abilities:
-            self.abilities[event](*args)
+        if metrics.enabled:
+            metrics.inc("triggers", event)
+        events = getattr(self.controller, "events", None)
+        if events is not None:
+            events.dispatch(self, event, *args)  # Lets the game's event bus count it
+        else:
+            ability = self.get_ability(event)
+            if ability:
+                ability(*args)
 
 # Player Class
@@ -1,99 +1,168 @@
 from permanentsbase import Permanent
+from cardregistry import registry
+from gamelog import log
+from keywords import BLOCKS_FLYING, DEFENDER, FLYING, HASTE, INDESTRUCTIBLE, VIGILANCE
+from combat import resolve_combat
 
 # Creatures
 class Creature(Permanent):
+    __slots__ = ("damage", "summoning_sick", "_modifiers", "_stats")
+    type = "Creature"
+    battlefield_zone = "creatures"
+
     def __init__(self, name, mana_cost, power, toughness, owner, keywords=None):
-        super().__init__(name, mana_cost)
-        self.power = power
-        self.toughness = toughness
-        self.base_toughness = toughness  # Store the original toughness
-        self.keywords = keywords if keywords else set()
+        self.setup(registry.intern(type(self), name, mana_cost, power=power, toughness=toughness, keywords=keywords), owner)
+
+    def setup(self, definition, owner):
+        super().setup(definition, owner)
+        self.damage = 0  # Damage marked this turn
         self.summoning_sick = True  # Prevents attacking the turn it enters unless it has Haste
+        self._modifiers = ()  # (power, toughness, until end of turn) on this creature, see effects.py
+        self._stats = (definition.power, definition.toughness)  # Cached with every layer applied, None when dirty
+
+    def stats(self):
+        """(power, toughness) after static effects and modifiers, before damage."""
+        stats = self._stats
+        if stats is None:
+            power, toughness = self.definition.power, self.definition.toughness
+            effects = getattr(self.controller, "effects", None)
+            if effects is not None and effects.sources and self.zone == "battlefield":
+                power, toughness = effects.apply(self, power, toughness)
+            for modifier_power, modifier_toughness, _ in self._modifiers:
+                power += modifier_power
+                toughness += modifier_toughness
+            stats = self._stats = (power, toughness)
+        return stats
+
+    def stats_changed(self):
+        """Dirties the cached stats."""
+        self._stats = None
+
+    @property
+    def power(self):
+        stats = self._stats
+        return (stats or self.stats())[0]
+
+    @property
+    def toughness(self):
+        """Toughness left this turn: the derived toughness minus damage."""
+        stats = self._stats
+        return (stats or self.stats())[1] - self.damage
+
+    @property
+    def base_toughness(self):
+        """The original toughness"""
+        return self.definition.toughness
+
+    def modify(self, power, toughness, until_end_of_turn=True):
+        """Adds a modifier to the creature's stats, such as a pump spell's +2/+2."""
+        self._modifiers += ((power, toughness, until_end_of_turn),)
+        self._stats = None
+        self.touch()
+        if self.zone == "battlefield":
+            self.check_toughness()
+
+    def check_toughness(self):
+        """Destroys the creature once its toughness is at or below the damage marked on it."""
+        if (self._stats or self.stats())[1] <= self.damage:
+            self.destroy()
+
+    def touch(self):
+        """Has end of turn cleanup visit this creature."""
+        effects = getattr(self.controller, "effects", None)
+        if effects is not None:
+            effects.touch(self)
 
     def resolve(self):
         """Handles entering the battlefield"""
         self.summoning_sick = True
         self.trigger_ability("on_enter")
 
+    def can_attack(self):
+        """Whether attack() would succeed, without announcing anything."""
+        flags = self.keyword_flags
+        return not flags & DEFENDER and not self.tapped and (not self.summoning_sick or flags & HASTE)
+
     def attack(self, player):
         """Declares this creature as an attacker"""
-        if "Defender" in self.keywords:
-            print(f"{self.name} has Defender and cannot attack!")
-            return
+        flags = self.keyword_flags
+        if flags & DEFENDER:
+            log.emit("attack_defender", "{card} has Defender and cannot attack!", card=self.name)
+            return False
         
-        if self.summoning_sick and "Haste" not in self.keywords:
-            print(f"{self.name} is summoning sick and cannot attack!")
-            return
+        if self.summoning_sick and not flags & HASTE:
+            log.emit("attack_summoning_sick", "{card} is summoning sick and cannot attack!", card=self.name)
+            return False
+
+        if self.tapped:
+            log.emit("attack_tapped", "{card} is tapped and cannot attack!", card=self.name)
+            return False
 
-        print(f"{self.name} is attacking {player.name}.")
+        log.emit("attacking", "{card} is attacking {player}.", card=self.name, player=player.name)
         self.trigger_ability("on_attack")
-        if "Vigilance" not in self.keywords:
+        if not flags & VIGILANCE:
             self.tap()  # Does not tap if it has Vigilance
+        return True
 
     def block(self, attacker):
-        """Blocks an attacking creature"""
-        if "Flying" in attacker.keywords and "Flying" not in self.keywords and "Reach" not in self.keywords:
-            print(f"{self.name} cannot block {attacker.name} because it has Flying.")
-            return
+        """Blocks an attacking creature. Menace is checked once all blocks are declared."""
+        if attacker.keyword_flags & FLYING and not self.keyword_flags & BLOCKS_FLYING:
+            log.emit("block_flying", "{card} cannot block {attacker} because it has Flying.", card=self.name, attacker=attacker.name)
+            return False
 
-        if "Menace" in attacker.keywords:
-            print(f"{attacker.name} has Menace and must be blocked by at least two creatures.")
-            return
-
-        print(f"{self.name} is blocking {attacker.name}.")
+        log.emit("blocking", "{card} is blocking {attacker}.", card=self.name, attacker=attacker.name)
         self.trigger_ability("on_block", attacker)
+        return True
 
     def assign_combat_damage(self, blockers):
-        """Handles combat damage assignment, including First Strike, Double Strike, Trample, and Deathtouch"""
-        total_block_power = sum(b.power for b in blockers)
-
-        # First Strike / Double Strike Damage Step
-        if "First Strike" in self.keywords or "Double Strike" in self.keywords:
-            for blocker in blockers:
-                if "Deathtouch" in self.keywords:
-                    blocker.destroy()
-                else:
-                    blocker.take_damage(self.power)
-                if blocker.toughness <= 0:
-                    blockers.remove(blocker)
-
-        # Regular Damage Step
-        if "Double Strike" in self.keywords or "First Strike" not in self.keywords:
-            for blocker in blockers:
-                if "Deathtouch" in self.keywords:
-                    blocker.destroy()
-                else:
-                    blocker.take_damage(self.power)
-
-        # Trample Damage
-        if "Trample" in self.keywords and total_block_power < self.power:
-            trample_damage = self.power - total_block_power
-            return trample_damage  # Excess damage to player
-        return 0
+        """Fights this attacker against its ordered blockers, including First Strike, Double Strike,
+        Trample, Deathtouch and Lifelink. Returns the excess damage that tramples over to the player."""
+        return resolve_combat([self], {self: list(blockers)}).player_damage
 
     def take_damage(self, damage):
-        """Creature takes damage, considering Indestructible, Lifelink, and Deathtouch"""
-        if "Indestructible" in self.keywords:
-            print(f"{self.name} is Indestructible and takes no lethal damage!")
+        """Creature takes damage, considering Indestructible"""
+        if self.keyword_flags & INDESTRUCTIBLE:
+            log.emit("indestructible", "{card} is Indestructible and takes no lethal damage!", card=self.name)
             return
 
-        self.toughness -= damage
+        self.damage += damage
+        self.touch()
+        self.check_toughness()
 
-        if "Lifelink" in self.keywords:
-            print(f"{self.name} has Lifelink! Controller gains {damage} life.")
+    def destroy(self):
+        """Destroys the creature unless it is Indestructible."""
+        if self.keyword_flags & INDESTRUCTIBLE:
+            log.emit("indestructible", "{card} is Indestructible and takes no lethal damage!", card=self.name)
+            return
+        self.trigger_ability("on_destroy")
+        log.emit("destroyed", "{card} is destroyed!", card=self.name)
+        self.move_to_graveyard()
+
+    def leave_battlefield(self):
+        """Damage and modifiers only last while the creature is in play, so they go
+        with it and cleanup stops visiting it."""
+        super().leave_battlefield()
+        self.damage = 0
+        if self._modifiers:
+            self._modifiers = ()
+            self._stats = None
+        effects = getattr(self.controller, "effects", None)
+        if effects is not None:
+            effects.touched.pop(self, None)
+
+    def end_turn_modifiers(self):
+        """Drops the modifiers that last until end of turn. Losing a pump can leave
+        the creature with lethal damage, or with no toughness at all."""
+        if any(until_end_of_turn for _, _, until_end_of_turn in self._modifiers):
+            self._modifiers = tuple(modifier for modifier in self._modifiers if not modifier[2])
+            self._stats = None
+            self.check_toughness()
+        effects = getattr(self.controller, "effects", None)
+        if effects is not None and not self.damage and not self._modifiers:
+            effects.touched.pop(self, None)
 
-        if self.toughness <= 0:
-            self.trigger_ability("on_destroy")
-            print(f"{self.name} is destroyed!")
-            self.owner.creatures.remove(self)
-            self.move_to_graveyard()
     def reset_toughness(self):
-        """Resets toughness at the end of the turn"""
-        self.toughness = self.base_toughness
-        print(f"{self.name}'s toughness is restored to {self.base_toughness}.")
-
-
-    
-
-
-
+        """Clears damage and end of turn modifiers at the end of the turn"""
+        self.damage = 0
+        self.end_turn_modifiers()
+        log.emit("toughness_reset", "{card}'s toughness is restored to {toughness}.", card=self.name, toughness=self.toughness)
@@ -0,0 +1,320 @@
+import random
+import time
+
+from metrics import metrics
+from protocol import encode_message, read_message
+
+# Decision providers answer every choice the Game needs from a player.
+# The Game never calls input() itself; it asks the provider attached to
+# the player who has to decide.
+
+class DecisionProvider:
+    def choose_action(self, game, player, phase, options):
+        """Pick one of the (key, label) options offered in a phase menu and return its key."""
+        raise NotImplementedError
+
+    def choose_card(self, game, player, cards):
+        """Pick a card to cast from the given list, or None to cancel."""
+        raise NotImplementedError
+
+    def choose_attackers(self, game, player, creatures):
+        """Return the creatures that should attack (possibly empty)."""
+        raise NotImplementedError
+
+    def choose_blockers(self, game, player, attacker, available):
+        """Return the creatures that should block the given attacker (possibly empty)."""
+        raise NotImplementedError
+
+    def choose_defender(self, game, player, opponents):
+        """Pick which opponent the attack is aimed at."""
+        raise NotImplementedError
+
+    def clone(self):
+        """Provider for a cloned game. Stateless providers are shared."""
+        return self
+
+    def save_state(self):
+        """Whatever an undo needs to put the provider back as it was."""
+        return None
+
+    def load_state(self, state):
+        pass
+
+
+def _select_indices(raw, items):
+    """Turns a string of space separated indices into the matching items."""
+    selected = []
+    for index in raw.split():
+        if index.isdigit():
+            index = int(index)
+            if 0 <= index < len(items) and items[index] not in selected:
+                selected.append(items[index])
+    return selected
+
+
+# Terminal player, the original behaviour of the game
+class ConsoleDecisionProvider(DecisionProvider):
+    def choose_action(self, game, player, phase, options):
+        while True:
+            print(f"\n{phase}: Choose an action:")
+            for i, (_, label) in enumerate(options, start=1):
+                print(f"{i}. {label}")
+            choice = input("Enter your choice: ")
+            if choice.isdigit() and 1 <= int(choice) <= len(options):
+                return options[int(choice) - 1][0]
+            print("Invalid choice. Try again.")
+
+    def choose_card(self, game, player, cards):
+        print("\nYour Hand:")
+        for i, card in enumerate(cards):
+            print(f"{i}: {card.name} - Type: {card.type}, Cost: {dict(card.material_cost)}")
+
+        choice = input("Enter the number of the card to cast, or press Enter to cancel: ")
+        if choice.isdigit():
+            index = int(choice)
+            if 0 <= index < len(cards):
+                return cards[index]
+            print("Invalid selection.")
+            return None
+        print("Cancelled spell casting.")
+        return None
+
+    def choose_attackers(self, game, player, creatures):
+        print("Choose attackers (enter indices separated by space, or press enter to skip):")
+        for i, creature in enumerate(creatures):
+            print(f"{i}: {creature.name} ({creature.power}/{creature.toughness})")
+        return _select_indices(input(), creatures)
+
+    def choose_blockers(self, game, player, attacker, available):
+        print(f"{attacker.name} is attacking.")
+        print("Choose blockers (enter indices separated by space, or press enter to skip):")
+        for i, creature in enumerate(available):
+            print(f"{i}: {creature.name} ({creature.power}/{creature.toughness})")
+        return _select_indices(input(), available)
+
+    def choose_defender(self, game, player, opponents):
+        if len(opponents) == 1:
+            return opponents[0]
+        print("Choose the player to attack:")
+        for i, opponent in enumerate(opponents):
+            print(f"{i}: {opponent.name} ({opponent.health} health)")
+        while True:
+            choice = input("Enter your choice: ")
+            if choice.isdigit() and 0 <= int(choice) < len(opponents):
+                return opponents[int(choice)]
+            print("Invalid choice. Try again.")
+
+
+# Plays uniformly random legal choices, used for headless simulations
+class RandomDecisionProvider(DecisionProvider):
+    def __init__(self, seed=None, rng=None):
+        self.rng = rng if rng else random.Random(seed)
+
+    def clone(self):
+        copied = RandomDecisionProvider()
+        copied.rng.setstate(self.rng.getstate())
+        return copied
+
+    def save_state(self):
+        return self.rng.getstate()
+
+    def load_state(self, state):
+        self.rng.setstate(state)
+
+    def choose_action(self, game, player, phase, options):
+        return self.rng.choice(options)[0]
+
+    def choose_card(self, game, player, cards):
+        return self.rng.choice(cards) if cards else None
+
+    def choose_attackers(self, game, player, creatures):
+        return [creature for creature in creatures if self.rng.random() < 0.5]
+
+    def choose_blockers(self, game, player, attacker, available):
+        if available and self.rng.random() < 0.5:
+            return [self.rng.choice(available)]
+        return []
+
+    def choose_defender(self, game, player, opponents):
+        return self.rng.choice(opponents)
+
+
+# Replays a fixed list of answers, falling back to another provider once exhausted
+class ScriptedDecisionProvider(DecisionProvider):
+    """Answers are consumed in order. Actions are option keys, cards and
+    creatures are given as indices into the offered list (None to decline)."""
+
+    def __init__(self, answers, fallback=None):
+        self.answers = list(answers)
+        self.position = 0
+        self.fallback = fallback
+
+    def clone(self):
+        copied = ScriptedDecisionProvider(self.answers, self.fallback.clone() if self.fallback else None)
+        copied.position = self.position
+        return copied
+
+    def save_state(self):
+        return (list(self.answers), self.position, self.fallback.save_state() if self.fallback else None)
+
+    def load_state(self, state):
+        answers, self.position, fallback_state = state
+        self.answers[:] = answers
+        if self.fallback:
+            self.fallback.load_state(fallback_state)
+
+    def _next(self, kind, options):
+        if self.position < len(self.answers):
+            answer = self.answers[self.position]
+            self.position += 1
+            return True, answer
+        return False, None
+
+    def choose_action(self, game, player, phase, options):
+        found, answer = self._next("choose_action", options)
+        if not found:
+            if self.fallback:
+                return self.fallback.choose_action(game, player, phase, options)
+            return options[-1][0]  # The last option always passes
+        return answer
+
+    def choose_card(self, game, player, cards):
+        found, answer = self._next("choose_card", cards)
+        if not found:
+            return self.fallback.choose_card(game, player, cards) if self.fallback else None
+        return cards[answer] if answer is not None and 0 <= answer < len(cards) else None
+
+    def choose_attackers(self, game, player, creatures):
+        found, answer = self._next("choose_attackers", creatures)
+        if not found:
+            return self.fallback.choose_attackers(game, player, creatures) if self.fallback else []
+        return [creatures[i] for i in answer or [] if 0 <= i < len(creatures)]
+
+    def choose_blockers(self, game, player, attacker, available):
+        found, answer = self._next("choose_blockers", available)
+        if not found:
+            return self.fallback.choose_blockers(game, player, attacker, available) if self.fallback else []
+        return [available[i] for i in answer or [] if 0 <= i < len(available)]
+
+    def choose_defender(self, game, player, opponents):
+        found, answer = self._next("choose_defender", opponents)
+        if not found:
+            return self.fallback.choose_defender(game, player, opponents) if self.fallback else opponents[0]
+        return opponents[answer if answer is not None and 0 <= answer < len(opponents) else 0]
+
+
+class DecisionPending(Exception):
+    """Raised by a provider that has no answer yet. The game suspends and
+    re-runs the same step once it is resumed."""
+
+
+# Answers are supplied from outside the game loop (a server, a UI) as they arrive
+class DeferredDecisionProvider(ScriptedDecisionProvider):
+    """Uses the same answer encoding as ScriptedDecisionProvider. When asked a
+    question with no answer queued, the question is kept in `pending` and
+    DecisionPending is raised."""
+
+    def __init__(self):
+        super().__init__([])
+        self.pending = None  # (kind, options) of the unanswered question
+        self.asked_at = None  # perf_counter() when the pending question was raised
+
+    def answer(self, choice):
+        """Queues the answer to the pending question."""
+        if metrics.enabled and self.pending is not None and self.asked_at is not None:
+            metrics.observe("decision_wait_seconds", time.perf_counter() - self.asked_at, self.pending[0])
+        self.answers.append(choice)
+        self.pending = None
+
+    def clone(self):
+        # The pending question refers to the original game's cards; the cloned
+        # game asks it again when its suspended step is re-run.
+        copied = DeferredDecisionProvider()
+        copied.answers = self.answers[self.position:]
+        return copied
+
+    def save_state(self):
+        return (list(self.answers), self.position, self.pending)
+
+    def load_state(self, state):
+        answers, self.position, self.pending = state
+        self.answers[:] = answers
+
+    def _next(self, kind, options):
+        found, answer = super()._next(kind, options)
+        if not found:
+            if self.pending is None or self.pending[0] != kind:
+                self.asked_at = time.perf_counter()  # Re-asking after a resume keeps the first time
+            self.pending = (kind, options)
+            raise DecisionPending(kind)
+        return found, answer
+
+
+def candidate_answers(kind, options):
+    """Answers worth trying for a question, in the scripted encoding. Attacks and
+    blocks are limited to none, each creature alone, and (for attacks) everything."""
+    if kind == "choose_action":
+        return [key for key, _ in options]
+    if kind == "choose_card":
+        return list(range(len(options))) + [None]
+    if kind == "choose_defender":
+        return list(range(len(options)))
+    answers = [[]] + [[i] for i in range(len(options))]
+    if kind == "choose_attackers" and len(options) > 1:
+        answers.append(list(range(len(options))))
+    return answers
+
+
+def describe_request(kind, options):
+    """Turns a question into a JSON friendly request for remote players."""
+    if kind == "choose_action":
+        described = [list(option) for option in options]
+    elif kind == "choose_card":
+        described = [{"name": card.name, "type": card.type, "cost": dict(card.material_cost)} for card in options]
+    elif kind == "choose_defender":
+        described = [{"name": p.name, "health": p.health} for p in options]
+    else:
+        described = [{"name": c.name, "power": c.power, "toughness": c.toughness} for c in options]
+    return {"type": kind, "options": described}
+
+
+def sanitize_answer(kind, options, choice):
+    """Coerces a remote answer into the ScriptedDecisionProvider encoding, declining anything invalid."""
+    if kind == "choose_action":
+        keys = [key for key, _ in options]
+        return choice if choice in keys else keys[-1]
+    if kind in ("choose_attackers", "choose_blockers"):
+        if not isinstance(choice, list):
+            return []
+        return [i for i in choice if isinstance(i, int) and 0 <= i < len(options)]
+    if isinstance(choice, int) and 0 <= choice < len(options):
+        return choice
+    return 0 if kind == "choose_defender" else None
+
+
+# Remote player reached over a blocking socket, one JSON object per line each way
+class NetworkDecisionProvider(ScriptedDecisionProvider):
+    """Sends a request such as {"type": "choose_card", "options": [...]} and
+    expects a reply line {"choice": ...} holding an option key or indices."""
+
+    def __init__(self, conn):
+        super().__init__([])
+        self.conn = conn
+        self.stream = conn.makefile("rwb")
+
+    def clone(self):
+        return self  # There is only one remote player to ask
+
+    def save_state(self):
+        return None
+
+    def load_state(self, state):
+        pass
+
+    def _next(self, kind, options):
+        self.stream.write(encode_message(describe_request(kind, options)))
+        self.stream.flush()
+        reply = read_message(self.stream)
+        if reply is None:
+            raise ConnectionError("Player disconnected while a decision was pending.")
+        return True, sanitize_answer(kind, options, reply.get("choice"))
@@ -0,0 +1,108 @@
+# Continuous effects on creature stats, applied in layers:
+#   base       power and toughness from the card's definition
+#   static     effects of permanents on the battlefield (anthems from enchantments
+#              and artifacts), registered here while their source is in play
+#   modifiers  pumps and shrinks on the creature itself, most until end of turn
+# Damage is not a layer: it is counted separately and subtracted last, so a
+# creature's toughness is what it has left this turn. When a static effect
+# enters or leaves, every creature whose toughness fell to its damage or below
+# is destroyed, as take_damage() and modify() do for their own changes.
+#
+# A creature caches its derived (power, toughness) until a dirty flag clears the
+# cache: its own modifiers changing, it changing zones, or any static effect
+# entering or leaving, which dirties every creature on the battlefield. Stat
+# reads are O(1) however many static effects there are; only the next read
+# after a change pays for walking them. Creatures that took damage or got a
+# modifier are remembered, so end of turn cleanup only visits those; leaving the
+# battlefield clears both and forgets the creature. At the end of every turn
+# until end of turn modifiers end on all creatures, while damage is only cleared
+# from the active player's.
+
+
+def controlled_by_source(source, creature):
+    """Default scope of a static effect: the creatures its source's controller controls."""
+    return creature.controller is source.controller
+
+
+class EffectLayer:
+    """The static effects on one game's battlefield, shared by its players like the EventBus."""
+
+    def __init__(self, players):
+        self.players = players
+        self.sources = {}  # permanent -> its static effects, (power, toughness, applies) tuples
+        self.touched = {}  # Creatures with damage or modifiers, in the order they got them
+
+    def add(self, source):
+        """Registers the static effects of a permanent entering the battlefield.
+        Call again after changing them."""
+        self.sources[source] = source._static_effects
+        self.changed()
+        if any(toughness < 0 for _, toughness, _ in source._static_effects):
+            self.destroy_lethal()
+
+    def remove(self, source):
+        effects = self.sources.pop(source, None)
+        if effects is not None:
+            self.changed()
+            if any(toughness > 0 for _, toughness, _ in effects):  # Only losing a bonus can kill
+                self.destroy_lethal()
+
+    def changed(self):
+        """Dirties every creature on the battlefield. Call when something a static
+        effect's `applies` test reads (keywords, control) changes."""
+        for player in self.players:
+            for creature in player.creatures:
+                creature._stats = None
+
+    def destroy_lethal(self):
+        """State-based check after the static effects changed: destroys the
+        creatures on the battlefield left with toughness at or below their damage."""
+        for player in self.players:
+            for creature in list(player.creatures):
+                if creature.zone == "battlefield":  # A destroy may have taken others with it
+                    creature.check_toughness()
+
+    def apply(self, creature, power, toughness):
+        """Adds every static effect that applies to the creature."""
+        for source, effects in self.sources.items():
+            for effect_power, effect_toughness, applies in effects:
+                if (applies or controlled_by_source)(source, creature):
+                    power += effect_power
+                    toughness += effect_toughness
+        return power, toughness
+
+    def touch(self, creature):
+        self.touched[creature] = None
+
+    def cleanup(self, player):
+        """End of turn: ends every creature's end of turn modifiers, whoever
+        controls it, and clears damage from the creatures the player controls."""
+        for creature in list(self.touched):
+            if creature not in self.touched:
+                continue  # Destroyed when a pump listed earlier ended
+            if creature.controller is player:
+                creature.reset_toughness()
+            else:
+                creature.end_turn_modifiers()
+
+    def clone(self, players, memo):
+        """A copy for a cloned game whose cards are already in memo. Cached stats
+        carried over by Card.clone stay valid, since the board is the same."""
+        copied = EffectLayer(players)
+        copied.sources = {source.clone(memo): effects for source, effects in self.sources.items()}
+        copied.touched = {creature.clone(memo): None for creature in self.touched}
+        return copied
+
+    def rebuild(self, cards):
+        """Recomputes the registered sources and touched creatures from every card,
+        for a game restored by journal.restore_state()."""
+        self.sources = {}
+        self.touched = {}
+        for player in self.players:
+            for permanent in player.permanents():
+                if permanent._static_effects:
+                    self.sources[permanent] = permanent._static_effects
+        for card in cards:
+            if getattr(card, "damage", 0) or getattr(card, "_modifiers", None):
+                self.touched[card] = None
+        self.changed()
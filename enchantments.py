@@ -1,7 +1,12 @@
 from permanentsbase import Permanent
+from gamelog import log
 
 # Enchantments
 class Enchantment(Permanent):
+    __slots__ = ()
+    type = "Enchantment"
+    battlefield_zone = "enchantments"
+
     def resolve(self):
         """Enchantments resolve and enter the battlefield."""
-        print(f"{self.name} (Enchantment) enters the battlefield and affects the game.")
\ No newline at end of file
+        log.emit("enters_battlefield", "{card} (Enchantment) enters the battlefield and affects the game.", card=self.name)
\ No newline at end of file
@@ -0,0 +1,73 @@
+import time
+
+from metrics import metrics
+
+# Game-wide event dispatcher. Cards subscribe with their abilities when they
+# enter a zone and unsubscribe when they leave, so firing an event only calls
+# the cards that actually listen for it.
+
+
+class EventBus:
+    def __init__(self, profile=False):
+        self.subscribers = {}  # event -> {card: handler}, in subscription order
+        self.profile = profile  # Time every dispatch, off by default since it costs a clock read
+        self.dispatches = {}  # event -> times fired or triggered
+        self.handler_calls = {}  # event -> handlers actually run
+        self.seconds = {}  # event -> time spent in handlers, only while profiling
+
+    def subscribe(self, card):
+        """Indexes the card's current abilities. Call again after changing them."""
+        for event, handler in card.iter_abilities():
+            self.subscribers.setdefault(event, {})[card] = handler
+
+    def unsubscribe(self, card):
+        for event, _ in card.iter_abilities():
+            listeners = self.subscribers.get(event)
+            if listeners:
+                listeners.pop(card, None)
+
+    def listener_count(self, event):
+        return len(self.subscribers.get(event, ()))
+
+    def _run(self, event, handlers, args):
+        self.dispatches[event] = self.dispatches.get(event, 0) + 1
+        if not handlers:
+            return
+        self.handler_calls[event] = self.handler_calls.get(event, 0) + len(handlers)
+        if self.profile:
+            started = time.perf_counter()
+            for handler in handlers:
+                handler(*args)
+            self.seconds[event] = self.seconds.get(event, 0.0) + time.perf_counter() - started
+        else:
+            for handler in handlers:
+                handler(*args)
+
+    def fire(self, event, *args):
+        """Broadcasts an event to every card listening for it."""
+        if metrics.enabled:
+            metrics.inc("triggers", event)
+        listeners = self.subscribers.get(event)
+        self._run(event, list(listeners.values()) if listeners else (), args)
+
+    def dispatch(self, card, event, *args):
+        """Triggers one card's ability. Cards outside any zone (on the stack, in hand)
+        are not subscribed, so their own abilities are used directly."""
+        listeners = self.subscribers.get(event)
+        handler = listeners.get(card) if listeners else None
+        if handler is None:
+            handler = card.get_ability(event)
+        self._run(event, (handler,) if handler else (), args)
+
+    def stats(self):
+        """Per event dispatch counts, handler calls, subscribers and time (when profiling)."""
+        events = set(self.dispatches) | set(self.subscribers)
+        return {
+            event: {
+                "subscribers": self.listener_count(event),
+                "dispatches": self.dispatches.get(event, 0),
+                "handler_calls": self.handler_calls.get(event, 0),
+                "seconds": self.seconds.get(event, 0.0),
+            }
+            for event in sorted(events)
+        }
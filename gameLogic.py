@@ -1,325 +1,633 @@
-from creature import Creature
-from preists import Priest
-from enchantments import Enchantment
-from artifacts import Artifact  
+from combat import resolve_combat, remove_illegal_blocks
 from corebase import Stack
+from decisions import ConsoleDecisionProvider, DecisionPending, candidate_answers
+from effects import EffectLayer
+from events import EventBus
+from gamelog import log
+from journal import capture_state, restore_state
+from legalmoves import Hand, LegalMoves, MaterialPool
+from zones import BattlefieldZone, ZoneAttribute
+from payment import as_key, can_pay, pay
 import random
 import socket 
 import threading
-import json
+import time
+from matchmaking import MatchmakingQueue, GamePool, match_key
+from metrics import metrics
+from time import perf_counter
+from protocol import read_message, deck_from_json
 
 
 class Player:
-    def __init__(self, name, deck):
+    ZONES = ("deck", "hand", "creatures", "priests", "enchantments", "artifacts", "graveyard", "exile")
+    BATTLEFIELD = ("creatures", "priests", "enchantments", "artifacts")
+
+    # Battlefield zones by card type, each with an `untapped` view
+    creatures = ZoneAttribute(BattlefieldZone)
+    priests = ZoneAttribute(BattlefieldZone)
+    enchantments = ZoneAttribute(BattlefieldZone)
+    artifacts = ZoneAttribute(BattlefieldZone)
+    graveyard = ZoneAttribute()
+    exile = ZoneAttribute()
+
+    def __init__(self, name, deck, decisions=None):
         self.name = name
         self.deck = deck
+        self.moves = LegalMoves(self)  # Playable cards, kept current as the hand and pool change
         self.hand = []
-        self.creatures = []  # List of creatures
-        self.priests = []    # List of priest-type cards
-        self.enchantments = []  # List of enchantments
-        self.artifacts = []   # List of artifacts
-        self.graveyard = []
+        self.creatures = ()
+        self.priests = ()
+        self.enchantments = ()
+        self.artifacts = ()
+        self.graveyard = ()
+        self.exile = ()
         self.material_pool = {"W": 0, "F": 0, "B": 0, "G": 0}  # Wood, Fire, Blood, Gold
         self.health = 20
+        self.stops = set()  # Phases where the player is always asked, even with nothing to do
+        self.events = None  # The game's EventBus, set when the game starts
+        self.effects = None  # The game's EffectLayer, set when the game starts
+        self.decisions = decisions if decisions else ConsoleDecisionProvider()  # Who makes this player's choices
+
+    def clone(self, memo):
+        """Copies the player for a cloned game. Zones are filled in by Game.clone once
+        every player is in memo, since cards point back at their owner."""
+        copied = Player.__new__(Player)
+        memo[id(self)] = copied
+        copied.__dict__.update(self.__dict__)
+        copied.moves = LegalMoves(copied)
+        copied.material_pool = dict(self.material_pool)
+        copied.decisions = self.decisions.clone()
+        copied.events = None
+        copied.effects = None
+        return copied
+
+    @property
+    def hand(self):
+        return self._hand
+
+    @hand.setter
+    def hand(self, cards):
+        self._hand = Hand(cards, self.moves)
+        self.moves.reset(self._hand)
+
+    @property
+    def material_pool(self):
+        return self._material_pool
+
+    @material_pool.setter
+    def material_pool(self, materials):
+        self._material_pool = MaterialPool(materials, self.moves)
+        self.moves.materials_changed()
+
+    def permanents(self):
+        """Every permanent the player has on the battlefield."""
+        for zone in self.BATTLEFIELD:
+            yield from getattr(self, zone)
+
+    def move(self, card, destination):
+        """Moves one of the player's cards to "battlefield" (the zone for its type),
+        "graveyard" or "exile". Every zone change goes through here, and each step
+        is O(1) apart from taking the card out of the hand."""
+        if card in self.moves.cards:
+            self.hand.remove(card)
+        else:
+            if card.battlefield_zone is not None:
+                getattr(self, card.battlefield_zone).discard(card)
+            self.graveyard.discard(card)
+            self.exile.discard(card)
+        if destination == "battlefield":
+            getattr(self, card.battlefield_zone).add(card)
+            if self.events is not None:
+                self.events.subscribe(card)  # Its abilities now listen for game events
+            if self.effects is not None and card._static_effects:
+                self.effects.add(card)
+            if card.battlefield_zone == "priests":
+                self.moves.materials_changed()  # Another priest that can be tapped for casting
+        else:
+            getattr(self, destination).add(card)
+        card.zone = destination
+        if card.battlefield_zone == "creatures":
+            card.stats_changed()  # Static effects only apply on the battlefield
+
+    def draw_card(self):
+        """Draw the top card of the deck into the hand."""
+        if not self.deck:
+            log.emit("deck_empty", "{player} has no cards left to draw.", player=self.name)
+            return None
+        card = self.deck.pop()
+        self.hand.append(card)
+        return card
+
+    def gain_material(self, material, amount):
+        """Add materials to the pool."""
+        self.material_pool[material] = self.material_pool.get(material, 0) + amount
+
+    def can_pay(self, material_cost, pool=None):
+        """Checks whether a pool (the material pool by default) covers a cost."""
+        pool = self.material_pool if pool is None else pool
+        return can_pay(as_key(pool), as_key(material_cost))
+
+    def tap_priests_for(self, card):
+        """Taps untapped priests one at a time until the card's cost is covered."""
+        cost = card.definition.cost_key
+        for priest in tuple(self.priests.untapped):  # Tapping one takes it out of the view
+            if can_pay(as_key(self.material_pool), cost):
+                return
+            priest.produce_material()
 
     def play_card(self, card, game_stack):
         """Play a card from hand onto the battlefield or stack."""
-        generic_cost = card.material_cost.get("X", 0)  # Generic cost
-        available_generic = sum(self.material_pool.values())  # Sum of all available materials
-        
-        if card in self.hand and all(self.material_pool.get(mat, 0) >= cost for mat, cost in card.material_cost.items() if mat != "X") and available_generic >= generic_cost:
-            for mat, cost in card.material_cost.items():
-                if mat != "X":
-                    self.material_pool[mat] -= cost
-
-            remaining_generic = generic_cost
-            for mat in self.material_pool:
-                if remaining_generic > 0:
-                    deduction = min(self.material_pool[mat], remaining_generic)
-                    self.material_pool[mat] -= deduction
-                    remaining_generic -= deduction
-
-            self.hand.remove(card)
-
-            # Place the card in the correct board section
-            if isinstance(card, Creature):
-                self.creatures.append(card)
-            elif isinstance(card, Priest):  
-                self.priests.append(card)
-            elif isinstance(card, Enchantment):
-                self.enchantments.append(card)
-            elif isinstance(card, Artifact):
-                self.artifacts.append(card)
-            else:
+        playable = self.moves.can_play(card)
+        if playable and not can_pay(as_key(self.material_pool), card.definition.cost_key):
+            self.tap_priests_for(card)
+
+        if playable:
+            # Pay so the rest of the hand keeps the materials it needs
+            residual = pay(as_key(self.material_pool), card.definition.cost_key, self.moves.demand(card))
+            for mat, amount in residual:
+                if self.material_pool[mat] != amount:
+                    self.material_pool[mat] = amount
+
+            if card.battlefield_zone is None:
+                self.hand.remove(card)
                 game_stack.add(card)  # If it's a spell, put it on the stack
+            else:
+                self.move(card, "battlefield")
 
-            print(f"{self.name} plays {card.name}.")
+            log.emit("card_played", "{player} plays {card}.", card=card.name, player=self.name)
+            return True
         else:
-            print(f"{self.name} cannot play {card.name} due to insufficient materials.")
+            log.emit("card_unaffordable", "{player} cannot play {card} due to insufficient materials.", card=card.name, player=self.name)
+            return False
 
     def untap_all(self):
         """Untap all permanents on the battlefield."""
-        for permanent in self.creatures + self.priests + self.enchantments + self.artifacts:
-            permanent.untap()
-        print(f"{self.name} untaps all their permanents.")
+        for zone in self.BATTLEFIELD:
+            for permanent in tuple(getattr(self, zone)):
+                permanent.untap()
+        log.emit("untap_all", "{player} untaps all their permanents.", player=self.name)
+
+    def gain_life(self, amount):
+        """Increase player health."""
+        self.health += amount
+        log.emit("life_gained", "{player} gains {amount} life. Health: {health}", player=self.name, amount=amount, health=self.health)
 
     def take_damage(self, damage):
         """Reduce player health."""
         self.health -= damage
-        print(f"{self.name} takes {damage} damage! Remaining health: {self.health}")
+        log.emit("player_damaged", "{player} takes {damage} damage! Remaining health: {health}", player=self.name, damage=damage, health=self.health)
         if self.health <= 0:
-            print(f"{self.name} has lost the game!")
+            log.emit("player_lost", "{player} has lost the game!", player=self.name)
 
 
 class Game:
-    def __init__(self, players):
+    # Turn structure, in order. Each phase is driven by the method named here.
+    PHASES = ("untap", "upkeep", "draw", "main1", "combat", "main2", "end")
+    PHASE_METHODS = {
+        "untap": "untap_phase",
+        "upkeep": "upkeep_phase",
+        "draw": "draw_phase",
+        "main1": "main_phase",
+        "combat": "combat_phase",
+        "main2": "main_phase",
+        "end": "end_step",
+    }
+
+    def __init__(self, players, seed=None, max_turns=None):
         self.players = players
         self.stack = Stack()
+        self.events = EventBus()
+        self.effects = EffectLayer(players)
+        for player in players:
+            player.events = self.events
+            player.effects = self.effects
         self.turn = 0  # Index of the active player
+        self.turn_number = 0  # Turns taken so far
+        self.max_turns = max_turns  # Games reaching this many turns end in a draw
+        self.seed = seed if seed is not None else random.getrandbits(63)  # Kept so the game can be replayed
+        self.rng = random.Random(self.seed)  # Per-game RNG so seeded games are reproducible
+        self.winner = None
+        self.over = False
+
+        # Turn state machine, advanced one priority point at a time by step()
+        self.phase = None
+        self.phase_entered = False  # Phase entry actions (draws, messages) already done
+        self.pending_cast = None  # Spell types the active player chose to cast from
+        self.suspended = False
+        self.reset_combat()
+        self.journal = []  # Captured states for undo(), one per apply()
+        self.prompts = 0  # Priority menus actually shown to players
+        self.prompts_saved = 0  # Priority menus skipped because passing was the only legal action
+
+    @property
+    def active_player(self):
+        return self.players[self.turn]
 
     def start_game(self):
         """Start the game by shuffling decks and drawing starting hands."""
+        self.setup()
+        self.run()
+
+    def setup(self):
+        """Shuffle decks, draw starting hands and begin the first turn without playing it."""
         for player in self.players:
-            random.shuffle(player.deck)
+            self.rng.shuffle(player.deck)
             for _ in range(7):
                 player.draw_card()
-        print("Game has started!")
+        log.emit("game_started", "Game has started!")
         self.start_turn()
 
     def start_turn(self):
         """Handles the beginning of a player's turn."""
         active_player = self.players[self.turn]
-        print(f"It is now {active_player.name}'s turn.")
-        
-        self.untap_phase()
-        self.upkeep_phase()
-        self.draw_phase()
-        self.main_phase()
-        self.combat_phase()
-        self.main_phase()
-        self.end_step()
-        
-        if not self.check_winner():
-            self.next_turn()
+        self.turn_number += 1
+        log.emit("turn_started", "It is now {player}'s turn.", player=active_player.name, turn=self.turn_number)
+        self.enter_phase(self.PHASES[0])
+
+    def enter_phase(self, phase):
+        self.phase = phase
+        self.phase_entered = False
+
+    def step(self):
+        """Runs the game up to and including its next priority point.
+
+        Returns the phase that was stepped, "suspended" if a decision is not
+        available yet (state is left untouched, so the same step runs again
+        after resume()), or "game_over"."""
+        if self.over:
+            return "game_over"
+        if self.suspended:
+            return "suspended"
+
+        phase = self.phase
+        started = perf_counter() if metrics.enabled else None
+        try:
+            if self.pending_cast is not None:
+                self.cast_spell_phase(self.active_player, self.pending_cast)
+                self.pending_cast = None
+                done = False
+            else:
+                done = getattr(self, self.PHASE_METHODS[phase])()
+        except DecisionPending:
+            self.suspended = True
+            return "suspended"
+        finally:
+            if started is not None:
+                metrics.observe("phase_seconds", perf_counter() - started, phase)
+
+        if self.check_winner():
+            return "game_over"
+        if done:
+            index = self.PHASES.index(phase) + 1
+            if index < len(self.PHASES):
+                self.enter_phase(self.PHASES[index])
+            else:
+                self.next_turn()
+        return phase
+
+    def run(self):
+        """Steps the game until it ends or is suspended."""
+        while not self.over and not self.suspended:
+            self.step()
+
+    def run_until(self, event):
+        """Steps until the given event is reached (a phase name or a predicate
+        taking the event), the game ends or it is suspended. Returns the last event."""
+        matches = event if callable(event) else (lambda reached: reached == event)
+        while True:
+            reached = self.step()
+            if reached in ("game_over", "suspended") or matches(reached):
+                return reached
+
+    def suspend(self):
+        """Pauses the game at the next priority point."""
+        self.suspended = True
+
+    def resume(self):
+        """Allows a suspended game to continue stepping."""
+        self.suspended = False
+
+    def clone(self, memo=None):
+        """Fast copy for lookahead. Cards are copied slot by slot and keep sharing their
+        definitions, and providers are cloned so the copy can be played on independently.
+        memo collects id(original) -> copy for every player and card copied."""
+        memo = {} if memo is None else memo
+        game = Game.__new__(Game)
+        game.__dict__.update(self.__dict__)
+        game.players = [player.clone(memo) for player in self.players]
+        game.events = EventBus()
+        for original, player in zip(self.players, game.players):
+            for zone in Player.ZONES:
+                setattr(player, zone, [card.clone(memo) for card in getattr(original, zone)])
+            player.events = game.events
+            for permanent in player.permanents():
+                game.events.subscribe(permanent)
+        game.stack = Stack()
+        game.stack.stack = [item.clone(memo) for item in self.stack.stack]
+        game.rng = random.Random()
+        game.rng.setstate(self.rng.getstate())
+        game.winner = memo.get(id(self.winner)) if self.winner else None
+        game.pending_cast = list(self.pending_cast) if self.pending_cast is not None else None
+        game.attackers = [creature.clone(memo) for creature in self.attackers]
+        game.blockers = {attacker.clone(memo): [blocker.clone(memo) for blocker in blockers]
+                         for attacker, blockers in self.blockers.items()}
+        game.blocking = {blocker.clone(memo) for blocker in self.blocking}
+        game.block_queue = [(memo[id(defender)], attacker.clone(memo)) for defender, attacker in self.block_queue]
+        game.defending_player = memo.get(id(self.defending_player)) if self.defending_player else None
+        for original, player in zip(self.players, game.players):
+            pending = getattr(original.decisions, "pending", None)
+            if pending and player.decisions is not original.decisions:
+                # Carry the open question over so the copy can be answered straight away
+                kind, options = pending
+                if kind != "choose_action":
+                    options = [memo[id(option)] if id(option) in memo else option.clone(memo) for option in options]
+                player.decisions.pending = (kind, options)
+        game.effects = self.effects.clone(game.players, memo)
+        for player in game.players:
+            player.effects = game.effects
+        game.journal = []
+        return game
+
+    def all_cards(self):
+        """Every card in any zone, on the stack or in the current combat."""
+        for player in self.players:
+            for zone in Player.ZONES:
+                yield from getattr(player, zone)
+        yield from self.stack.stack
+        yield from self.attackers
+        for blockers in self.blockers.values():
+            yield from blockers
+
+    def pending_decision(self):
+        """(player, provider) of the decision a suspended game is waiting on, or None."""
+        for player in self.players:
+            if getattr(player.decisions, "pending", None):
+                return player, player.decisions
+        return None
+
+    def legal_actions(self):
+        """Answers that can be given to the pending decision, in the scripted encoding."""
+        pending = self.pending_decision()
+        if pending is None:
+            return []
+        return candidate_answers(*pending[1].pending)
+
+    def apply(self, choice):
+        """Answers the pending decision and plays on to the next one. undo() reverts it."""
+        pending = self.pending_decision()
+        if pending is None:
+            raise ValueError("No decision is pending.")
+        self.journal.append(capture_state(self))
+        pending[1].answer(choice)
+        self.resume()
+        self.run()
+
+    def undo(self):
+        """Puts the game back as it was before the last apply()."""
+        restore_state(self, self.journal.pop())
 
     def untap_phase(self):
         """Untap all permanents of the active player."""
         active_player = self.players[self.turn]
         active_player.untap_all()
-        print(f"{active_player.name} untaps their permanents.")
+        for creature in active_player.creatures:
+            creature.summoning_sick = False  # Creatures controlled since the start of the turn can attack
+        log.emit("untap_phase", "{player} untaps their permanents.", player=active_player.name)
+        return True
+
+    def decide(self, player, kind, *args):
+        """Asks the player's provider, timing the answer when metrics are on."""
+        if not metrics.enabled:
+            return getattr(player.decisions, kind)(self, player, *args)
+        started = perf_counter()
+        answer = getattr(player.decisions, kind)(self, player, *args)
+        metrics.observe("decision_seconds", perf_counter() - started, kind)
+        return answer
+
+    def has_legal_action(self, player, key, allowed_types):
+        """Whether a menu option could do anything right now. Passing always can."""
+        if key == "cast":
+            return bool(player.moves.playable(allowed_types))
+        if key == "attack":
+            return any(creature.can_attack() for creature in player.creatures.untapped)
+        return True
+
+    def priority(self, player, phase, options, allowed_types):
+        """One priority point: the player either passes or picks spells to cast next step.
+        Only legal options are offered, and when passing is the only one the player is
+        not asked at all unless they set a stop on this phase."""
+        options = [option for option in options if self.has_legal_action(player, option[0], allowed_types)]
+        if len(options) == 1 and self.phase not in player.stops:
+            self.prompts_saved += 1
+            log.emit("auto_pass", "{player} has nothing to do in the {phase} and passes.", player=player.name, phase=phase)
+            return options[0][0]
+        choice = self.decide(player, "choose_action", phase, options)
+        self.prompts += 1  # Counted once answered; a suspended step asks again when re-run
+        if choice == "cast":
+            self.pending_cast = allowed_types
+            return False
+        return choice
 
     def upkeep_phase(self):
         """Handle upkeep triggers and allow only instants or flash spells."""
         active_player = self.players[self.turn]
-        print(f"{active_player.name} is in their upkeep phase.")
+        if not self.phase_entered:
+            log.emit("upkeep_phase", "{player} is in their upkeep phase.", player=active_player.name)
+            self.phase_entered = True
+            self.events.fire("on_upkeep", active_player)
 
-        while True:
-            print("\nUpkeep Phase: Choose an action:")
-            print("1. Cast an instant or flash spell")
-            print("2. Pass to Draw Phase")
-            choice = input("Enter your choice: ")
-
-            if choice == "1":
-                self.cast_spell_phase(active_player, allowed_types=["Instant", "Flash"])
-            elif choice == "2":
-                break
-            else:
-                print("Invalid choice. Try again.")
+        return self.priority(active_player, "Upkeep Phase", [
+            ("cast", "Cast an instant or flash spell"),
+            ("pass", "Pass to Draw Phase"),
+        ], ["Instant", "Flash"]) is not False
 
     def draw_phase(self):
         """Active player draws a card and can cast instants or flash spells."""
         active_player = self.players[self.turn]
-        active_player.draw_card()
-        print(f"{active_player.name} draws a card.")
+        if not self.phase_entered:
+            active_player.draw_card()
+            log.emit("draw_phase", "{player} draws a card.", player=active_player.name)
+            self.phase_entered = True
 
-        while True:
-            print("\nDraw Phase: Choose an action:")
-            print("1. Cast an instant or flash spell")
-            print("2. Pass to Main Phase")
-            choice = input("Enter your choice: ")
-
-            if choice == "1":
-                self.cast_spell_phase(active_player, allowed_types=["Instant", "Flash"])
-            elif choice == "2":
-                break
-            else:
-                print("Invalid choice. Try again.")
+        return self.priority(active_player, "Draw Phase", [
+            ("cast", "Cast an instant or flash spell"),
+            ("pass", "Pass to Main Phase"),
+        ], ["Instant", "Flash"]) is not False
 
     def main_phase(self):
         """Handles the active player's main phase where they can cast all spells."""
         active_player = self.players[self.turn]
-        print(f"{active_player.name} is in their main phase.")
+        if not self.phase_entered:
+            log.emit("main_phase", "{player} is in their main phase.", player=active_player.name)
+            self.phase_entered = True
 
-        while True:
-            print("\nMain Phase: Choose an action:")
-            print("1. Cast a spell")
-            print("2. Pass to Combat Phase")
-            choice = input("Enter your choice: ")
-
-            if choice == "1":
-                self.cast_spell_phase(active_player, allowed_types=["Instant", "Sorcery", "Creature", "Enchantment", "Artifact", "Planeswalker"])
-            elif choice == "2":
-                break
-            else:
-                print("Invalid choice. Try again.")
+        return self.priority(active_player, "Main Phase", [
+            ("cast", "Cast a spell"),
+            ("pass", "Pass to Combat Phase"),
+        ], ["Instant", "Sorcery", "Creature", "Priest", "Enchantment", "Artifact", "Location"]) is not False
 
     def end_step(self):
         """Handles the end step, allowing only instants or flash spells."""
         active_player = self.players[self.turn]
-        print(f"{active_player.name} is in their end step.")
+        if not self.phase_entered:
+            log.emit("end_step", "{player} is in their end step.", player=active_player.name)
+            self.phase_entered = True
+            self.events.fire("on_end_step", active_player)
 
-        while True:
-            print("\nEnd Step: Choose an action:")
-            print("1. Cast an instant or flash spell")
-            print("2. Pass to next turn")
-            choice = input("Enter your choice: ")
-
-            if choice == "1":
-                self.cast_spell_phase(active_player, allowed_types=["Instant", "Flash"])
-            elif choice == "2":
-                for creature in active_player.creatures:
-                    creature.reset_toughness()
-                break
-            else:
-                print("Invalid choice. Try again.")
+        if self.priority(active_player, "End Step", [
+            ("cast", "Cast an instant or flash spell"),
+            ("pass", "Pass to next turn"),
+        ], ["Instant", "Flash"]) is False:
+            return False
+
+        self.effects.cleanup(active_player)
+        return True
 
     def cast_spell_phase(self, active_player, allowed_types):
         """Allows the player to cast only valid spells for the current phase."""
-        valid_cards = [card for card in active_player.hand if card.type in allowed_types]
+        valid_cards = active_player.moves.playable(allowed_types)
 
         if not valid_cards:
-            print(f"You have no {', '.join(allowed_types)} spells to cast.")
+            log.emit("nothing_to_cast", "You have no {types} spells you can pay for.", player=active_player.name, types=", ".join(allowed_types))
             return
 
-        print("\nYour Hand:")
-        for i, card in enumerate(valid_cards):
-            print(f"{i}: {card.name} - Type: {card.type}, Cost: {card.material_cost}")
-
-        choice = input("Enter the number of the card to cast, or press Enter to cancel: ")
+        card = self.decide(active_player, "choose_card", valid_cards)
+        if card is not None and active_player.play_card(card, self.stack) and self.stack.stack:
+            self.resolve_stack()
 
-        if choice.isdigit():
-            index = int(choice)
-            if 0 <= index < len(valid_cards):
-                card = valid_cards[index]
-                active_player.play_card(card, self.stack)
-            else:
-                print("Invalid selection.")
-        else:
-            print("Cancelled spell casting.")
+    def choose_defender(self, active_player):
+        """Asks the active player which opponent to attack."""
+        opponents = [player for player in self.players if player is not active_player and player.health > 0]
+        return self.decide(active_player, "choose_defender", opponents)
 
-        # Allow the player to play spells or abilities
+    def reset_combat(self):
+        """Clears the declared attackers and blockers."""
+        self.combat_step = None  # None, "attackers", "defender", "blockers" or "damage"
+        self.attackers = []
+        self.blockers = {}
+        self.blocking = set()  # A creature can only block one attacker
+        self.block_queue = []  # (defender, attacker) pairs still waiting for blocks
+        self.defending_player = None
 
     def combat_phase(self):
+        """Runs one step of combat: priority, attacker and defender choice, each block, then damage."""
         active_player = self.players[self.turn]
-        print(f"{active_player.name} enters the combat phase.")
-
-        while True:
-            print("\nCombat Phase: Choose an action:")
-            print("1. Cast an instant or flash spell")
-            print("2. Declare attackers")
-            print("3. Pass to Main Phase 2")
-            choice = input("Enter your choice: ")
-
-            if choice == "1":
-                self.cast_spell_phase(active_player, allowed_types=["Instant"])
-            elif choice == "2":
-                if not active_player.creatures:
-                    print(f"{active_player.name} has no creatures to attack with.")
-                    return
-
-                attackers = []
-                print("Choose attackers (enter indices separated by space, or press enter to skip):")
-                for i, creature in enumerate(active_player.creatures):
-                    print(f"{i}: {creature.name} ({creature.power}/{creature.toughness})")
-
-                selected_attackers = input().split()#change later for UI integration
-                if selected_attackers:
-                    target_player = self.choose_defender(active_player)
-                    for index in selected_attackers:
-                        if index.isdigit():
-                            index = int(index)
-                            if 0 <= index < len(active_player.creatures):
-                                creature = active_player.creatures[index]
-                                creature.attack(target_player)
-                                attackers.append(creature)
-
-                # Step 2: Declare Blockers
-                if not attackers:
-                    print(f"{active_player.name} chose not to attack.")
-                    return
-
-                blockers = {}
-                for defender in self.players:
-                    if defender == active_player:
-                        continue
-
-                    print(f"{defender.name}, choose blockers for each attacker.")
-                    for attacker in attackers:
-                        print(f"{attacker.name} is attacking.")
-                        available_blockers = [creature for creature in defender.creatures if not creature.tapped]
-                        if not available_blockers:
-                            print(f"{defender.name} has no creatures to block with.")
-                            continue
-
-                        print("Choose blockers (enter indices separated by space, or press enter to skip):")
-                        for i, creature in enumerate(available_blockers):
-                            print(f"{i}: {creature.name} ({creature.power}/{creature.toughness})")
-
-                        selected_blockers = input().split()
-                        if selected_blockers:
-                            blockers[attacker] = []
-                            for index in selected_blockers:
-                                if index.isdigit():
-                                    index = int(index)
-                                    if 0 <= index < len(available_blockers):
-                                        blocker = available_blockers[index]
-                                        blocker.block(attacker)
-                                        blockers[attacker].append(blocker)
-
-                # Step 3: Assign Combat Damage
-                for attacker in attackers:
-                    if attacker in blockers.keys():
-                        for blocker in blockers[attacker]:
-                            damage_to_blocker = attacker.assign_combat_damage([blocker])
-                            if damage_to_blocker > 0:
-                                blocker.take_damage(damage_to_blocker)
-                    else:
-                        print(f"{attacker.name} deals {attacker.power} damage to {target_player.name}!")
-                        target_player.take_damage(attacker.power)
-            else:
-                break
-
-
-   
-        """Handles the end step and cleanup phase."""
-        active_player = self.players[self.turn]
-        active_player.trigger_ability("on_end_step")
-        print(f"{active_player.name} is in their end step.")
+        if not self.phase_entered:
+            log.emit("combat_phase", "{player} enters the combat phase.", player=active_player.name)
+            self.phase_entered = True
+
+        if self.combat_step is None:
+            choice = self.priority(active_player, "Combat Phase", [
+                ("cast", "Cast an instant or flash spell"),
+                ("attack", "Declare attackers"),
+                ("pass", "Pass to Main Phase 2"),
+            ], ["Instant"])
+            if choice != "attack":
+                return choice is not False
+            if not active_player.creatures:
+                log.emit("no_attackers", "{player} has no creatures to attack with.", player=active_player.name)
+                return True
+            self.combat_step = "attackers"
+            return False
+
+        if self.combat_step == "attackers":
+            self.attackers = self.decide(active_player, "choose_attackers", list(active_player.creatures))
+            if not self.attackers:
+                log.emit("no_attack", "{player} chose not to attack.", player=active_player.name)
+                self.reset_combat()
+                return True
+            self.combat_step = "defender"
+            return False
+
+        if self.combat_step == "defender":
+            target_player = self.choose_defender(active_player)
+            self.defending_player = target_player
+            self.attackers = [creature for creature in self.attackers if creature.attack(target_player)]
+
+            # Step 2: Declare Blockers
+            if not self.attackers:
+                log.emit("no_attack", "{player} chose not to attack.", player=active_player.name)
+                self.reset_combat()
+                return True
+
+            for defender in self.players:
+                if defender == active_player:
+                    continue
+                log.emit("declare_blockers", "{player}, choose blockers for each attacker.", player=defender.name)
+                self.block_queue.extend((defender, attacker) for attacker in self.attackers)
+            self.combat_step = "blockers"
+            return False
+
+        if self.combat_step == "blockers":
+            if self.block_queue:
+                defender, attacker = self.block_queue[0]
+                available_blockers = [creature for creature in defender.creatures if not creature.tapped and creature not in self.blocking]
+                if not available_blockers:
+                    log.emit("no_blockers", "{player} has no creatures to block with.", player=defender.name)
+                else:
+                    selected_blockers = self.decide(defender, "choose_blockers", attacker, available_blockers)
+                    for blocker in selected_blockers:
+                        if blocker.block(attacker):
+                            self.blockers.setdefault(attacker, []).append(blocker)
+                            self.blocking.add(blocker)
+                self.block_queue.pop(0)
+            if not self.block_queue:
+                remove_illegal_blocks(self.blockers)
+                self.combat_step = "damage"
+            return False
+
+        # Step 3: Assign Combat Damage
+        resolve_combat(self.attackers, self.blockers, self.defending_player)
+        self.reset_combat()
+        return True  # Combat happens once per turn
 
     def next_turn(self):
         """Proceed to the next player's turn."""
         self.turn = (self.turn + 1) % len(self.players)
+        if self.max_turns is not None and self.turn_number >= self.max_turns:
+            log.emit("turn_limit", "Turn limit of {turns} reached, the game is a draw.", turns=self.max_turns)
+            self.over = True
+            return
         self.start_turn()
 
     def resolve_stack(self):
         """Resolve everything on the stack."""
-        print("Resolving the stack...")
+        log.emit("resolve_stack", "Resolving the stack...")
         self.stack.resolve_all()
 
     def check_winner(self):
         """Check if a player has won the game."""
         alive_players = [p for p in self.players if p.health > 0]
         if len(alive_players) == 1:
-            print(f"{alive_players[0].name} wins the game!")
+            log.emit("game_won", "{player} wins the game!", player=alive_players[0].name)
+            self.winner = alive_players[0]
+            self.over = True
+            return True
+        if not alive_players:
+            log.emit("game_drawn", "All players have lost, the game is a draw.")
+            self.over = True
             return True
         return False
     
 
+def create_player(player_info, decisions=None):
+    """Builds a Player and their deck from a join request."""
+    player = Player(player_info["name"], [], decisions)
+    player.deck = deck_from_json(player_info["deck"], player)
+    stops = player_info.get("stops")
+    if isinstance(stops, list):
+        player.stops = {phase for phase in stops if phase in Game.PHASES}
+    return player
+
+
 class GameListener:
-    def __init__(self, host="0.0.0.0", port=5001):
+    def __init__(self, host="0.0.0.0", port=5001, max_games=4, match_interval=1.0, store=None):
         self.host = host
         self.port = port
-        self.waiting_players = []
+        self.store = store  # Optional persistence.GameStore that logs every game's answers
+        self.matchmaker = MatchmakingQueue()
+        self.games = GamePool(max_workers=max_games)  # Games run here, never on the accepting thread
+        self.match_interval = match_interval  # Seconds between sweeps that pair long waiting players
         self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server.bind((self.host, self.port))
         self.server.listen(5)  # Allow multiple connections
@@ -327,31 +635,41 @@ class GameListener:
 
     def handle_client(self, conn, addr):
         try:
-            data = conn.recv(1024).decode("utf-8")
-            player_info = json.loads(data)
+            with conn.makefile("rb") as stream:
+                player_info = read_message(stream)  # Reads a whole line, however it was split
+            if player_info is None:
+                return
             print(f"Received player request: {player_info}")
-            self.waiting_players.append(player_info)
-
-            if len(self.waiting_players) >= 2:
-                self.start_game()
+            rating, tier = match_key(player_info)
+            match = self.matchmaker.enqueue(player_info, rating, tier)
+            if match:
+                self.games.submit(self.start_game, *match)
         except Exception as e:
             print(f"Error handling client {addr}: {e}")
         finally:
             conn.close()
 
-    def start_game(self):
-        if len(self.waiting_players) < 2:
-            return
-        
-        player1 = self.waiting_players.pop(0)
-        player2 = self.waiting_players.pop(0)
-        
+    def start_game(self, player1, player2):
         print(f"Starting game between {player1['name']} and {player2['name']}")
-        new_game  = Game([Player(player1['name'], player1['deck']), Player(player2['name'], player2['deck'])])
-        new_game.start_game()
+        try:
+            new_game  = Game([create_player(player1), create_player(player2)])
+            game_id = self.store.open_game(new_game) if self.store else None
+            new_game.start_game()
+            if self.store:
+                self.store.finish(game_id)
+        except Exception as e:
+            print(f"Game between {player1['name']} and {player2['name']} failed: {e}")
         # Notify system (e.g., send to game server, store in DB, etc.)
 
+    def match_waiting_players(self):
+        """Periodically pairs players whose rating window widened while they waited."""
+        while True:
+            time.sleep(self.match_interval)
+            for match in self.matchmaker.pop_matches():
+                self.games.submit(self.start_game, *match)
+
     def start_listener(self):
+        threading.Thread(target=self.match_waiting_players, daemon=True).start()
         while True:
             conn, addr = self.server.accept()
             print(f"Player connected from {addr}")
@@ -360,7 +678,3 @@ class GameListener:
 if __name__ == "__main__":
     listener = GameListener()
     listener.start_listener()
-
-
-
-
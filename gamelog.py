@@ -0,0 +1,85 @@
+import json
+import sys
+from collections import deque, namedtuple
+
+# Structured game log. Engine code reports typed records instead of printing:
+#
+#     log.emit("tapped", "{card} is now tapped.", card=self.name)
+#
+# The message template is only formatted by human readable sinks, and with the
+# NullSink attached log.emit is a do-nothing function.
+
+LogRecord = namedtuple("LogRecord", "event card player values template")
+
+
+def _discard(event, template, card=None, player=None, **values):
+    pass
+
+
+def format_record(record):
+    """Renders a record with its message template."""
+    return record.template.format(card=record.card, player=record.player, **record.values)
+
+
+class NullSink:
+    """Drops everything, for simulations and replays."""
+    emit = staticmethod(_discard)
+
+
+class ConsoleSink:
+    """Prints readable messages, the engine's original behaviour."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def emit(self, event, template, card=None, player=None, **values):
+        print(template.format(card=card, player=player, **values), file=self.stream or sys.stdout)
+
+
+class RingBufferSink:
+    """Keeps the most recent records in memory without formatting them."""
+
+    def __init__(self, capacity=10000):
+        self.buffer = deque(maxlen=capacity)
+
+    def emit(self, event, template, card=None, player=None, **values):
+        self.buffer.append(LogRecord(event, card, player, values, template))
+
+    def records(self):
+        return list(self.buffer)
+
+    def lines(self):
+        return [format_record(record) for record in self.buffer]
+
+
+class JsonLinesSink:
+    """Appends one JSON object per record to a file, buffered by the file object."""
+
+    def __init__(self, path_or_file):
+        self.owns_file = isinstance(path_or_file, str)
+        self.file = open(path_or_file, "a", encoding="utf-8") if self.owns_file else path_or_file
+
+    def emit(self, event, template, card=None, player=None, **values):
+        record = {"event": event, "card": card, "player": player}
+        record.update(values)
+        self.file.write(json.dumps(record, default=str) + "\n")
+
+    def close(self):
+        self.file.flush()
+        if self.owns_file:
+            self.file.close()
+
+
+class GameLog:
+    def __init__(self, sink=None):
+        self.set_sink(sink if sink else ConsoleSink())
+
+    def set_sink(self, sink):
+        """Routes every following record to the sink and returns the previous one."""
+        previous = getattr(self, "sink", None)
+        self.sink = sink
+        self.emit = sink.emit  # Bound once so emitting costs a single call
+        return previous
+
+
+log = GameLog()
@@ -0,0 +1,237 @@
+import argparse
+import json
+import math
+import random
+import time
+
+import numpy as np
+
+from gameLogic import Player
+from protocol import deck_from_json
+from simulate import build_random_deck
+
+# Goldfish deck statistics: how a deck draws and makes materials with no
+# opponent. A decklist is encoded as arrays (which cards are priests, what each
+# priest produces, each spell's coloured and generic cost), then batches of
+# shuffles are drawn at once with one row per sample, and everything below is
+# computed with array operations over the rows:
+#   mulligans   opening hands with fewer than keep[0] or more than keep[1] priests
+#   screw       turns with fewer priests in play than min(turn, top of the curve)
+#   sources     turns with at least one priest producing each material
+#   on curve    a spell in hand on the turn equal to its total cost, with the
+#               priests in play producing that cost
+# Cards are drawn as in Game: seven in the opening hand, then one every turn
+# including the first. Priests cost nothing and, as in the engine, any number can
+# be played a turn; priest_drops limits that to model one drop a turn. Tapping a
+# priest makes its primary and its secondary material, so production is a sum.
+#
+# Where a number only depends on how many priests of a kind were drawn, it is
+# also given exactly from the hypergeometric distribution: the opening hand
+# always, screw and sources when there is no drop limit.
+#
+#     python goldfish.py deck.json --samples 1000000
+
+HAND_SIZE = 7
+BATCH = 65536  # Samples shuffled per batch of arrays
+
+
+def hypergeometric(population, successes, draws, k):
+    """Chance of exactly k successes in draws cards from population holding successes."""
+    if k < 0 or k > successes or draws - k > population - successes:
+        return 0.0
+    return math.comb(successes, k) * math.comb(population - successes, draws - k) / math.comb(population, draws)
+
+
+class DeckArrays:
+    """A decklist as arrays. Spells are grouped by definition, so copies share a row
+    of the cost arrays."""
+
+    def __init__(self, cards):
+        definitions = [card.definition for card in cards]
+        priests = [definition.card_class.type == "Priest" for definition in definitions]
+        self.size = len(definitions)
+        self.spells = list(dict.fromkeys(d for d, priest in zip(definitions, priests) if not priest))
+        self.materials = sorted({material for definition in definitions
+                                 for material in (definition.primary_material, definition.secondary_material,
+                                                  *definition.material_cost) if material and material != "X"})
+        column = {material: i for i, material in enumerate(self.materials)}
+        spell_index = {definition: i for i, definition in enumerate(self.spells)}
+
+        self.is_priest = np.array(priests, dtype=bool)
+        self.spell = np.array([-1 if priest else spell_index[definition]
+                               for definition, priest in zip(definitions, priests)], dtype=np.int16)
+        self.production = np.zeros((self.size, len(self.materials)), dtype=np.int16)
+        for i, definition in enumerate(definitions):
+            if priests[i]:
+                for material in (definition.primary_material, definition.secondary_material):
+                    if material:
+                        self.production[i, column[material]] += 1
+        self.cost = np.zeros((len(self.spells), len(self.materials)), dtype=np.int16)  # Coloured part
+        self.generic = np.zeros(len(self.spells), dtype=np.int16)
+        for i, definition in enumerate(self.spells):
+            for material, amount in definition.material_cost.items():
+                if material == "X":
+                    self.generic[i] = amount
+                else:
+                    self.cost[i, column[material]] = amount
+        self.curve = np.maximum(self.cost.sum(axis=1) + self.generic, 1)  # Turn each spell is on curve
+        self.copies = np.bincount(self.spell[self.spell >= 0], minlength=len(self.spells))
+        self.sources = (self.production > 0).sum(axis=0)  # Priests producing each material
+
+    @property
+    def priests(self):
+        return int(self.is_priest.sum())
+
+    @property
+    def top_of_curve(self):
+        return int(self.curve.max()) if len(self.spells) else 1
+
+
+def exact_stats(deck, turns, keep):
+    """The hypergeometric numbers: opening hand priests, mulligans, and per turn the
+    chance of screw and of a source of each material with every drawn priest in play."""
+    opening = {k: hypergeometric(deck.size, deck.priests, HAND_SIZE, k) for k in range(HAND_SIZE + 1)}
+    mulligan = sum(chance for k, chance in opening.items() if k < keep[0] or k > keep[1])
+    per_turn = []
+    for turn in range(1, turns + 1):
+        seen = min(HAND_SIZE + turn, deck.size)
+        needed = min(turn, deck.top_of_curve)
+        screw = sum(hypergeometric(deck.size, deck.priests, seen, k) for k in range(needed))
+        sources = {material: 1.0 - hypergeometric(deck.size, int(count), seen, 0)
+                   for material, count in zip(deck.materials, deck.sources)}
+        per_turn.append({"screw": screw, "sources": sources})
+    return {"opening_priests": opening, "mulligan": mulligan, "turns": per_turn}
+
+
+def draw_samples(deck, samples, turns, priest_drops=None, keep=(2, 5), seed=None):
+    """Shuffles and draws `samples` games in batches. Returns counts over all samples."""
+    rng = np.random.default_rng(seed)
+    seen_max = min(HAND_SIZE + turns, deck.size)
+    materials = len(deck.materials)
+    mulligans = 0
+    priests_in_play = np.zeros(turns)
+    screwed = np.zeros(turns)
+    sources = np.zeros((turns, materials))
+    castable = np.zeros(len(deck.spells))
+    on_curve = np.zeros(len(deck.spells))
+    base = np.tile(np.arange(deck.size, dtype=np.int16), (min(samples, BATCH), 1))
+
+    done = 0
+    while done < samples:
+        n = min(BATCH, samples - done)
+        rows = np.arange(n)
+        order = rng.permuted(base[:n], axis=1)[:, :seen_max]  # Each row is one shuffled deck, top card first
+        spell = deck.spell[order]
+        priest_count = np.zeros((n, seen_max + 1), dtype=np.int16)  # Priests among the first j cards
+        np.cumsum(deck.is_priest[order], axis=1, out=priest_count[:, 1:])
+        production = np.zeros((n, seen_max + 1, materials), dtype=np.int16)  # Their combined production
+        np.cumsum(deck.production[order], axis=1, out=production[:, 1:])
+
+        opening = priest_count[:, min(HAND_SIZE, seen_max)]
+        mulligans += int(np.count_nonzero((opening < keep[0]) | (opening > keep[1])))
+
+        played = np.zeros(n, dtype=np.int16)
+        for turn in range(1, turns + 1):
+            seen = min(HAND_SIZE + turn, seen_max)
+            drawn = priest_count[:, seen]
+            played = drawn if priest_drops is None else np.minimum(played + priest_drops, drawn)
+            # Priests are played in the order drawn, so the ones in play are those in
+            # the longest prefix of the deck holding `played` priests
+            prefix = np.count_nonzero(priest_count <= played[:, None], axis=1) - 1
+            pool = production[rows, prefix]
+            priests_in_play[turn - 1] += played.sum()
+            screwed[turn - 1] += np.count_nonzero(played < min(turn, deck.top_of_curve))
+            sources[turn - 1] += np.count_nonzero(pool > 0, axis=0)
+
+            total = pool.sum(axis=1)
+            for i in np.flatnonzero(deck.curve == turn):
+                payable = (pool >= deck.cost[i]).all(axis=1) & (total >= deck.cost[i].sum() + deck.generic[i])
+                castable[i] += np.count_nonzero(payable)
+                on_curve[i] += np.count_nonzero(payable & (spell[:, :seen] == i).any(axis=1))
+        done += n
+
+    return {"samples": samples, "mulligans": mulligans, "priests_in_play": priests_in_play, "screwed": screwed,
+            "sources": sources, "castable": castable, "on_curve": on_curve}
+
+
+def analyze(cards, samples=1000000, turns=None, priest_drops=None, keep=(2, 5), seed=None):
+    """Goldfish statistics for a deck of cards, simulated and, where they apply, exact."""
+    started = time.perf_counter()
+    deck = DeckArrays(cards)
+    turns = turns or deck.top_of_curve
+    counts = draw_samples(deck, samples, turns, priest_drops, keep, seed)
+    exact = exact_stats(deck, turns, keep)
+    exact_turns = priest_drops is None  # With a drop limit the priests in play are no longer hypergeometric
+
+    per_turn = []
+    for turn in range(1, turns + 1):
+        entry = {"turn": turn,
+                 "priests_in_play": counts["priests_in_play"][turn - 1] / samples,
+                 "screw": counts["screwed"][turn - 1] / samples,
+                 "sources": {material: counts["sources"][turn - 1, i] / samples
+                             for i, material in enumerate(deck.materials)}}
+        if exact_turns:
+            entry["exact_screw"] = exact["turns"][turn - 1]["screw"]
+            entry["exact_sources"] = exact["turns"][turn - 1]["sources"]
+        per_turn.append(entry)
+
+    spells = [{"name": definition.name, "copies": int(deck.copies[i]), "curve_turn": int(deck.curve[i]),
+               "castable": counts["castable"][i] / samples if deck.curve[i] <= turns else None,
+               "on_curve": counts["on_curve"][i] / samples if deck.curve[i] <= turns else None}
+              for i, definition in enumerate(deck.spells)]
+    return {
+        "cards": deck.size,
+        "priests": deck.priests,
+        "samples": samples,
+        "priest_drops": priest_drops,
+        "mulligan_rate": counts["mulligans"] / samples,
+        "exact_mulligan_rate": exact["mulligan"],
+        "opening_priests": exact["opening_priests"],
+        "turns": per_turn,
+        "spells": spells,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def print_report(report):
+    print(f"{report['cards']} cards, {report['priests']} priests, {report['samples']} samples "
+          f"in {report['seconds']:.2f}s")
+    print(f"Mulligan rate: {report['mulligan_rate']:.4f} (exact {report['exact_mulligan_rate']:.4f})")
+    print("Opening hand priests: " + "  ".join(f"{k}: {chance:.3f}" for k, chance in report["opening_priests"].items()))
+    print("Turn  Priests  Screw             Sources")
+    for entry in report["turns"]:
+        exact_screw = f" ({entry['exact_screw']:.4f})" if "exact_screw" in entry else ""
+        sources = "  ".join(f"{material} {chance:.3f}" for material, chance in entry["sources"].items())
+        print(f"{entry['turn']:4d}  {entry['priests_in_play']:7.2f}  {entry['screw']:.4f}{exact_screw:9s}  {sources}")
+    print("Spell                     Copies  Turn  Castable  On curve")
+    for spell in report["spells"]:
+        if spell["castable"] is None:
+            print(f"{spell['name']:24s}  {spell['copies']:6d}  {spell['curve_turn']:4d}  (past the last turn)")
+        else:
+            print(f"{spell['name']:24s}  {spell['copies']:6d}  {spell['curve_turn']:4d}  "
+                  f"{spell['castable']:8.4f}  {spell['on_curve']:8.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Opening hand, material and curve statistics for a deck.")
+    parser.add_argument("deck", nargs="?", help="JSON deck, as sent in a join request; a random deck if left out")
+    parser.add_argument("--samples", type=int, default=1000000)
+    parser.add_argument("--turns", type=int, help="Turns to follow, the top of the deck's curve by default")
+    parser.add_argument("--priest-drops", type=int, help="Priests that can be played a turn, unlimited by default")
+    parser.add_argument("--keep", type=int, nargs=2, default=(2, 5), metavar=("MIN", "MAX"),
+                        help="Opening hands with priests outside this range are mulliganed")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    owner = Player("Goldfish", [])
+    if args.deck:
+        with open(args.deck, encoding="utf-8") as f:
+            cards = deck_from_json(json.load(f), owner)
+    else:
+        cards = build_random_deck(owner, random.Random(args.seed))
+    report = analyze(cards, args.samples, args.turns, args.priest_drops, tuple(args.keep), args.seed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
@@ -1,9 +1,13 @@
 from nonpermanentsbase import NonPermanent
+from gamelog import log
 
 
 class Instant(NonPermanent):
+    __slots__ = ()
+    type = "Instant"
+
     def resolve(self):
-        print(f"{self.name} (Instant) resolves immediately.")
+        log.emit("resolves", "{card} (Instant) resolves immediately.", card=self.name)
         self.trigger_ability("on_resolve")
 
     def play(self, game_stack):
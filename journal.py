@@ -0,0 +1,59 @@
+from corebase import slot_names
+
+# Undo support for search: capture_state() records every piece of mutable game
+# state in flat tuples (card slots, zone lists, combat, RNG and provider state)
+# and restore_state() writes it back, which is far cheaper than deepcopy.
+
+GAME_FIELDS = ("turn", "turn_number", "phase", "phase_entered", "over", "winner", "suspended",
+               "combat_step", "defending_player")
+
+
+def capture_state(game):
+    cards = []
+    for card in set(game.all_cards()):
+        cards.append((card, tuple(getattr(card, slot, None) for slot in slot_names(type(card)))))
+    players = []
+    for player in game.players:
+        zones = tuple(list(getattr(player, zone)) for zone in player.ZONES)
+        players.append((player, player.health, dict(player.material_pool), zones, player.decisions.save_state()))
+    return (
+        tuple(getattr(game, field) for field in GAME_FIELDS),
+        list(game.pending_cast) if game.pending_cast is not None else None,
+        list(game.attackers),
+        {attacker: list(blockers) for attacker, blockers in game.blockers.items()},
+        set(game.blocking),
+        list(game.block_queue),
+        list(game.stack.stack),
+        game.rng.getstate(),
+        players,
+        cards,
+    )
+
+
+def restore_state(game, state):
+    (fields, pending_cast, attackers, blockers, blocking, block_queue, stack, rng_state, players, cards) = state
+    for field, value in zip(GAME_FIELDS, fields):
+        setattr(game, field, value)
+    game.pending_cast = pending_cast
+    game.attackers = attackers
+    game.blockers = blockers
+    game.blocking = blocking
+    game.block_queue = block_queue
+    game.stack.stack = stack
+    game.rng.setstate(rng_state)
+    for card, values in cards:
+        for slot, value in zip(slot_names(type(card)), values):
+            setattr(card, slot, value)
+    for player, health, pool, zones, decisions_state in players:
+        player.health = health
+        player.material_pool = pool
+        for zone, cards_in_zone in zip(player.ZONES, zones):
+            setattr(player, zone, cards_in_zone)  # After the card slots, so untapped views see the restored taps
+        player.decisions.load_state(decisions_state)
+
+    # Subscriptions follow the battlefield, so rebuild them for the restored board
+    game.events.subscribers.clear()
+    for player in game.players:
+        for permanent in player.permanents():
+            game.events.subscribe(permanent)
+    game.effects.rebuild(game.all_cards())
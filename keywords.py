@@ -0,0 +1,79 @@
+import enum
+
+# Keyword abilities are stored on permanents as a bitmask. Card authors keep
+# using names ("Flying", "Double Strike"); the engine tests bits.
+
+
+class Keyword(enum.IntFlag):
+    NONE = 0
+    FLYING = enum.auto()
+    REACH = enum.auto()
+    MENACE = enum.auto()
+    DEATHTOUCH = enum.auto()
+    TRAMPLE = enum.auto()
+    FIRST_STRIKE = enum.auto()
+    DOUBLE_STRIKE = enum.auto()
+    HASTE = enum.auto()
+    VIGILANCE = enum.auto()
+    DEFENDER = enum.auto()
+    INDESTRUCTIBLE = enum.auto()
+    LIFELINK = enum.auto()
+    HEXPROOF = enum.auto()
+    WARD = enum.auto()
+
+
+KEYWORD_NAMES = {
+    "Flying": Keyword.FLYING,
+    "Reach": Keyword.REACH,
+    "Menace": Keyword.MENACE,
+    "Deathtouch": Keyword.DEATHTOUCH,
+    "Trample": Keyword.TRAMPLE,
+    "First Strike": Keyword.FIRST_STRIKE,
+    "Double Strike": Keyword.DOUBLE_STRIKE,
+    "Haste": Keyword.HASTE,
+    "Vigilance": Keyword.VIGILANCE,
+    "Defender": Keyword.DEFENDER,
+    "Indestructible": Keyword.INDESTRUCTIBLE,
+    "Lifelink": Keyword.LIFELINK,
+    "Hexproof": Keyword.HEXPROOF,
+    "Ward": Keyword.WARD,
+}
+
+# Plain int masks for the hot checks, IntFlag arithmetic builds new enum members
+FLYING = int(Keyword.FLYING)
+MENACE = int(Keyword.MENACE)
+DEATHTOUCH = int(Keyword.DEATHTOUCH)
+TRAMPLE = int(Keyword.TRAMPLE)
+FIRST_STRIKE = int(Keyword.FIRST_STRIKE)
+DOUBLE_STRIKE = int(Keyword.DOUBLE_STRIKE)
+HASTE = int(Keyword.HASTE)
+VIGILANCE = int(Keyword.VIGILANCE)
+DEFENDER = int(Keyword.DEFENDER)
+INDESTRUCTIBLE = int(Keyword.INDESTRUCTIBLE)
+LIFELINK = int(Keyword.LIFELINK)
+HEXPROOF = int(Keyword.HEXPROOF)
+BLOCKS_FLYING = int(Keyword.FLYING | Keyword.REACH)  # Either lets a creature block a flyer
+STRIKES_FIRST = int(Keyword.FIRST_STRIKE | Keyword.DOUBLE_STRIKE)  # Deals damage in the first strike step
+
+
+def to_flags(keywords):
+    """Converts keyword names (or an existing mask) to a bitmask."""
+    if not keywords:
+        return 0
+    if isinstance(keywords, int):
+        return int(keywords)
+    flags = 0
+    for name in keywords:
+        try:
+            flags |= KEYWORD_NAMES[name]
+        except KeyError:
+            raise ValueError(f"Unknown keyword {name!r}, expected one of {', '.join(KEYWORD_NAMES)}")
+    return int(flags)
+
+
+_NAME_BITS = [(name, int(flag)) for name, flag in KEYWORD_NAMES.items()]
+
+
+def to_names(flags):
+    """Converts a bitmask back to the set of keyword names."""
+    return {name for name, bit in _NAME_BITS if flags & bit}
@@ -0,0 +1,157 @@
+# Legal move generator. Each player's hand is indexed by card type and cost,
+# and the answer to "which cards can I cast right now" is cached until the
+# hand, the material pool or the untapped priests change. The hand and the
+# pool report their own changes, so a priority pass with nothing new costs a
+# dictionary lookup instead of a scan over the hand and every cost.
+
+from payment import affordable, as_key, can_pay
+
+
+class Hand(list):
+    """A player's hand. Adding and removing cards keeps the player's LegalMoves index current."""
+
+    def __init__(self, cards=(), moves=None):
+        super().__init__(cards)
+        self.moves = moves
+
+    def __reduce__(self):
+        # Cards are passed to the constructor so unpickling does not call append()
+        return (Hand, (list(self),), {"moves": self.moves})
+
+    def append(self, card):
+        super().append(card)
+        self.moves.card_added(card)
+
+    def insert(self, index, card):
+        super().insert(index, card)
+        self.moves.card_added(card)
+
+    def extend(self, cards):
+        cards = list(cards)
+        super().extend(cards)
+        for card in cards:
+            self.moves.card_added(card)
+
+    def remove(self, card):
+        super().remove(card)
+        self.moves.card_removed(card)
+
+    def pop(self, index=-1):
+        card = super().pop(index)
+        self.moves.card_removed(card)
+        return card
+
+    # Bulk edits are rare, the index is rebuilt for them
+    def _rebuild(self):
+        self.moves.reset(self)
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._rebuild()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._rebuild()
+
+    def __iadd__(self, cards):
+        self.extend(cards)
+        return self
+
+    def clear(self):
+        super().clear()
+        self._rebuild()
+
+
+class MaterialPool(dict):
+    """A player's material pool. Every change invalidates the cached affordability."""
+
+    def __init__(self, materials=(), moves=None):
+        super().__init__(materials)
+        self.moves = moves
+
+    def __reduce__(self):
+        return (MaterialPool, (dict(self),), {"moves": self.moves})
+
+    def __setitem__(self, material, amount):
+        super().__setitem__(material, amount)
+        self.moves.materials_changed()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.moves.materials_changed()
+
+
+class LegalMoves:
+    def __init__(self, player):
+        self.player = player
+        self.buckets = {}  # card type -> {cost key: [cards in hand]}
+        self.cards = set()  # Every card in hand, for membership tests
+        self.available = None  # Pool plus untapped priest output as a solver key, None when stale
+        self.playable_cache = {}  # allowed types -> playable cards, cleared on change
+
+    def reset(self, cards):
+        """Rebuilds the index for a whole new hand."""
+        self.buckets.clear()
+        self.cards.clear()
+        for card in cards:
+            self.card_added(card)
+        self.materials_changed()
+
+    def card_added(self, card):
+        self.buckets.setdefault(card.type, {}).setdefault(card.definition.cost_key, []).append(card)
+        self.cards.add(card)
+        self.playable_cache.clear()
+
+    def card_removed(self, card):
+        if card not in self.cards:
+            return
+        self.cards.discard(card)
+        cards = self.buckets[card.type][card.definition.cost_key]
+        cards.remove(card)
+        self.playable_cache.clear()
+
+    def materials_changed(self):
+        """Called when the pool or the untapped priests change."""
+        self.available = None
+        self.playable_cache.clear()
+
+    def available_materials(self):
+        """The pool plus everything the untapped priests would add if tapped."""
+        if self.available is None:
+            available = dict(self.player.material_pool)
+            for priest in self.player.priests.untapped:
+                for material in (priest.primary_material, priest.secondary_material):
+                    if material:
+                        available[material] = available.get(material, 0) + 1
+            self.available = as_key(available)
+        return self.available
+
+    def can_play(self, card):
+        """Whether the card is in hand and its cost can be paid, tapping priests if needed."""
+        return card in self.cards and can_pay(self.available_materials(), card.definition.cost_key)
+
+    def demand(self, exclude=None):
+        """The most of each material any card in hand other than exclude needs, as a solver key."""
+        needed = {}
+        for costs in self.buckets.values():
+            for key, cards in costs.items():
+                if not cards or (len(cards) == 1 and cards[0] is exclude):
+                    continue
+                for material, amount in key:
+                    if material != "X" and amount > needed.get(material, 0):
+                        needed[material] = amount
+        return as_key(needed)
+
+    def playable(self, allowed_types):
+        """Cards in hand of the allowed types whose cost can be paid right now, in
+        hand order. Answers are indices into this list, so it must not depend on
+        how the index was built (a clone or undo() rebuilds it from the hand)."""
+        types = tuple(allowed_types)
+        cards = self.playable_cache.get(types)
+        if cards is None:
+            keys = {key for card_type in types for key, bucket in self.buckets.get(card_type, {}).items() if bucket}
+            payable = affordable(self.available_materials(), tuple(sorted(keys)))
+            cards = [card for card in self.player.hand
+                     if card.type in types and card.definition.cost_key in payable] if payable else []
+            self.playable_cache[types] = cards
+        return list(cards)
@@ -1,16 +1,24 @@
 from permanentsbase import Permanent
+from cardregistry import registry
+from gamelog import log
 
 # Locations (alternative to Planeswalkers)
 class Location(Permanent):
+    __slots__ = ("loyalty",)
+    type = "Location"
+
     def __init__(self, name, material_cost, loyalty, owner):
-        super().__init__(name, material_cost)
-        self.loyalty = loyalty
+        self.setup(registry.intern(type(self), name, material_cost, loyalty=loyalty), owner)
+
+    def setup(self, definition, owner):
+        super().setup(definition, owner)
+        self.loyalty = definition.loyalty
 
     def activate_ability(self, ability):
-        print(f"{self.name} activates ability: {ability}")
+        log.emit("ability_activated", "{card} activates ability: {ability}", card=self.name, ability=ability)
         self.trigger_ability("on_activate_ability", ability)
 
     def resolve(self):
         """Locations resolve and enter the battlefield."""
-        print(f"{self.name} enters with {self.loyalty} loyalty.")
+        log.emit("enters_battlefield", "{card} enters with {loyalty} loyalty.", card=self.name, loyalty=self.loyalty)
 
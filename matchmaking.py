@@ -0,0 +1,129 @@
+import bisect
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Matchmaking: waiting players are kept sorted by rating inside one bucket per
+# deck tier, so the best opponent for a newcomer is one of its two neighbours.
+# Buckets are plain sorted lists: bisect finds a rating's place in O(log n),
+# but inserting or deleting there shifts the entries after it, so joining,
+# matching and leaving cost O(n) in the size of the tier's bucket. That shift
+# is a single memmove of pointers, cheap for the queue sizes one server holds.
+
+DEFAULT_RATING = 1500
+
+
+def match_key(player_info):
+    """Rating and deck tier of a join request, falling back to defaults."""
+    rating = player_info.get("rating", DEFAULT_RATING)
+    if not isinstance(rating, (int, float)):
+        rating = DEFAULT_RATING
+    return rating, player_info.get("tier")
+
+
+class MatchmakingQueue:
+    def __init__(self, base_window=100, widen_rate=10, max_window=1000, clock=time.monotonic):
+        self.base_window = base_window  # Rating difference accepted straight away
+        self.widen_rate = widen_rate  # Extra rating difference accepted per second waited
+        self.max_window = max_window
+        self.clock = clock
+        self.buckets = {}  # tier -> sorted list of (rating, ticket)
+        self.entries = {}  # ticket -> (item, rating, tier, enqueued_at)
+        self.tickets = {}  # id(item) -> ticket
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def window(self, ticket, now):
+        """Rating difference this entry accepts after waiting until now."""
+        waited = now - self.entries[ticket][3]
+        return min(self.base_window + self.widen_rate * waited, self.max_window)
+
+    def compatible(self, first, second, now):
+        """Two entries match when either of them is willing to accept the gap."""
+        gap = abs(first[0] - second[0])
+        return gap <= max(self.window(first[1], now), self.window(second[1], now))
+
+    def enqueue(self, item, rating=DEFAULT_RATING, tier=None):
+        """Adds a waiting player. Returns a matched (waiting, item) pair right away
+        when a compatible opponent is already queued, otherwise None."""
+        with self.lock:
+            now = self.clock()
+            ticket = next(self.counter)
+            self.entries[ticket] = (item, rating, tier, now)
+            bucket = self.buckets.setdefault(tier, [])
+            key = (rating, ticket)
+            index = bisect.bisect_left(bucket, key)
+
+            # Only the nearest rating on either side can be the best opponent
+            candidates = [bucket[i] for i in (index - 1, index) if 0 <= i < len(bucket)]
+            candidates = [c for c in candidates if self.compatible(c, key, now)]
+            if candidates:
+                best = min(candidates, key=lambda c: abs(c[0] - rating))
+                del bucket[bisect.bisect_left(bucket, best)]
+                del self.entries[ticket]
+                return self._take(best[1]), item
+
+            bucket.insert(index, key)
+            self.tickets[id(item)] = ticket
+            return None
+
+    def _take(self, ticket):
+        item = self.entries.pop(ticket)[0]
+        del self.tickets[id(item)]
+        return item
+
+    def remove(self, item):
+        """Drops a player who left before being matched."""
+        with self.lock:
+            ticket = self.tickets.get(id(item))
+            if ticket is None:
+                return False
+            _, rating, tier, _ = self.entries[ticket]
+            bucket = self.buckets[tier]
+            del bucket[bisect.bisect_left(bucket, (rating, ticket))]
+            self._take(ticket)
+            return True
+
+    def pop_matches(self):
+        """Pairs neighbours whose windows have widened enough since they were queued."""
+        matches = []
+        with self.lock:
+            now = self.clock()
+            for tier, bucket in self.buckets.items():
+                remaining = []
+                i = 0
+                while i < len(bucket):
+                    if i + 1 < len(bucket) and self.compatible(bucket[i], bucket[i + 1], now):
+                        matches.append((self._take(bucket[i][1]), self._take(bucket[i + 1][1])))
+                        i += 2
+                    else:
+                        remaining.append(bucket[i])
+                        i += 1
+                self.buckets[tier] = remaining
+        return matches
+
+
+class GamePool:
+    """Bounded pool of worker threads running matched games. Submitting blocks
+    the caller once max_workers games are running and max_pending are queued."""
+
+    def __init__(self, max_workers=4, max_pending=64):
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="game")
+        self.slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def submit(self, fn, *args):
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,228 @@
+import argparse
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from decisions import (DecisionProvider, DeferredDecisionProvider, RandomDecisionProvider, ScriptedDecisionProvider,
+                       candidate_answers)
+from gamelog import log, NullSink
+
+# Computer opponent. Every decision is searched with determinized Monte Carlo
+# playouts: each playout copies the game, reshuffles the cards the bot cannot
+# see, answers the decision with one candidate and plays the rest out with
+# random moves. Candidates are picked with UCB1 so promising ones get most of
+# the playouts. Playouts can run in a process pool and stop at a playout or
+# time budget, whichever comes first.
+
+
+def determinize(game, player_index, rng):
+    """Reshuffles hidden information: the bot's own deck, and each opponent's
+    hand and deck together so their hand is a guess of the same size."""
+    for index, player in enumerate(game.players):
+        if index == player_index:
+            rng.shuffle(player.deck)
+            continue
+        unseen = player.hand + player.deck
+        rng.shuffle(unseen)
+        player.hand = unseen[:len(player.hand)]
+        player.deck = unseen[len(player.hand):]
+
+
+def score(game, player_index):
+    """1 for a win, 0 for a loss. Unfinished games are scored on the life difference."""
+    me = game.players[player_index]
+    if game.winner is not None:
+        return 1.0 if game.winner is me else 0.0
+    best_opponent = max(player.health for player in game.players if player is not me)
+    return min(max(0.5 + (me.health - best_opponent) / 40, 0.0), 1.0)
+
+
+def playout(root, player_index, answer, rng, horizon):
+    """Plays one random game out from root after answering its pending question with answer."""
+    game = root.clone()
+    determinize(game, player_index, rng)
+    for index, player in enumerate(game.players):
+        fallback = RandomDecisionProvider(rng.randrange(2**32))
+        player.decisions = ScriptedDecisionProvider([answer], fallback) if index == player_index else fallback
+    limit = game.turn_number + horizon
+    game.max_turns = min(game.max_turns, limit) if game.max_turns is not None else limit
+    game.run()
+    return score(game, player_index)
+
+
+def option_positions(root, player_index, options, memo):
+    """Where each of the original options sits in the list root offers when its
+    step re-runs and asks again. memo maps the original game to root."""
+    probe_memo = {}
+    probe = root.clone(probe_memo)
+    probe.players[player_index].decisions = DeferredDecisionProvider()
+    probe.run()
+    pending = probe.players[player_index].decisions.pending
+    if pending is None:
+        raise RuntimeError("A copy of the game did not ask the question being searched.")
+    asked = {id(option): position for position, option in enumerate(pending[1])}
+    return [asked[id(probe_memo[id(memo[id(option)])])] for option in options]
+
+
+def in_root_order(answer, positions):
+    """Re-indexes a scripted answer to the original options for root's list."""
+    if answer is None:
+        return None
+    if isinstance(answer, list):
+        return [positions[i] for i in answer]
+    return positions[answer]
+
+
+def run_playouts(root, player_index, answers, seed, horizon):
+    """Runs one playout per entry of answers and returns their scores in order."""
+    rng = random.Random(seed)
+    previous_sink = log.set_sink(NullSink())
+    try:
+        return [playout(root, player_index, answer, rng, horizon) for answer in answers]
+    finally:
+        log.set_sink(previous_sink)
+
+
+def _quiet_worker():
+    log.set_sink(NullSink())
+
+
+class MonteCarloDecisionProvider(DecisionProvider):
+    """Searches each decision with up to `playouts` playouts or `time_limit`
+    seconds. With workers > 1 playouts run in a process pool, `batch` at a time
+    per worker. Rollouts stop `horizon` turns ahead and are scored on life."""
+
+    def __init__(self, playouts=200, time_limit=None, workers=1, batch=8, horizon=20, exploration=1.4, seed=None):
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.workers = workers
+        self.batch = batch
+        self.horizon = horizon
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.executor = None
+        self.total_playouts = 0
+        self.total_seconds = 0.0
+        self.last_search = None  # Stats of the most recent search
+
+    def playouts_per_second(self):
+        return self.total_playouts / self.total_seconds if self.total_seconds else 0.0
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
+
+    def search(self, game, player, kind, options):
+        """Returns the best candidate answer to the question, in the scripted encoding."""
+        candidates = candidate_answers(kind, options)
+        if len(candidates) == 1:
+            return candidates[0]
+
+        # The game is mid-step but nothing has changed yet, so a copy re-runs the
+        # same step and asks the same question again. Candidates index the
+        # original options, so the playouts get them re-indexed for the copy's list
+        memo = {}
+        root = game.clone(memo)
+        for other in root.players:
+            other.decisions = RandomDecisionProvider()
+        player_index = game.players.index(player)
+        if kind == "choose_action":
+            playout_answers = candidates  # Option keys, not indices
+        else:
+            positions = option_positions(root, player_index, options, memo)
+            playout_answers = [in_root_order(answer, positions) for answer in candidates]
+
+        visits = [0] * len(candidates)
+        totals = [0.0] * len(candidates)
+        started = time.perf_counter()
+        deadline = started + self.time_limit if self.time_limit else None
+        budget = self.playouts if self.playouts else math.inf
+        done = 0
+        while done < budget and (deadline is None or time.perf_counter() < deadline):
+            size = int(min(self.batch * max(self.workers, 1), budget - done))
+            chosen = self.allocate(visits, totals, size)
+            for index, result in zip(chosen, self.evaluate(root, player_index, [playout_answers[i] for i in chosen])):
+                visits[index] += 1
+                totals[index] += result
+            done += size
+
+        elapsed = time.perf_counter() - started
+        self.total_playouts += done
+        self.total_seconds += elapsed
+        best = max(range(len(candidates)), key=lambda i: (visits[i], totals[i]))
+        self.last_search = {"kind": kind, "playouts": done, "seconds": elapsed,
+                            "candidates": list(zip(candidates, visits, totals))}
+        log.emit("mcts_search", "{player} searched {playouts} playouts for {kind} ({rate:.0f}/s).",
+                 player=player.name, kind=kind, playouts=done, rate=done / elapsed if elapsed else 0.0)
+        return candidates[best]
+
+    def allocate(self, visits, totals, size):
+        """Picks the candidates for the next batch with UCB1, counting the
+        playouts already handed out in this batch as visits."""
+        visits = list(visits)
+        chosen = []
+        for _ in range(size):
+            unvisited = [i for i, count in enumerate(visits) if count == 0]
+            if unvisited:
+                index = unvisited[0]
+            else:
+                log_total = math.log(sum(visits))
+                index = max(range(len(visits)), key=lambda i: totals[i] / visits[i]
+                            + self.exploration * math.sqrt(log_total / visits[i]))
+            visits[index] += 1
+            chosen.append(index)
+        return chosen
+
+    def evaluate(self, root, player_index, answers):
+        """Scores of one playout per answer, spread across the pool when there is one."""
+        if self.workers <= 1:
+            return run_playouts(root, player_index, answers, self.rng.randrange(2**32), self.horizon)
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=_quiet_worker)
+        chunk = math.ceil(len(answers) / self.workers)
+        futures = [self.executor.submit(run_playouts, root, player_index, answers[i:i + chunk],
+                                        self.rng.randrange(2**32), self.horizon)
+                   for i in range(0, len(answers), chunk)]
+        return [result for future in futures for result in future.result()]
+
+    def choose_action(self, game, player, phase, options):
+        return self.search(game, player, "choose_action", options)
+
+    def choose_card(self, game, player, cards):
+        answer = self.search(game, player, "choose_card", cards)
+        return cards[answer] if answer is not None else None
+
+    def choose_attackers(self, game, player, creatures):
+        return [creatures[i] for i in self.search(game, player, "choose_attackers", creatures)]
+
+    def choose_blockers(self, game, player, attacker, available):
+        return [available[i] for i in self.search(game, player, "choose_blockers", available)]
+
+    def choose_defender(self, game, player, opponents):
+        return opponents[self.search(game, player, "choose_defender", opponents)]
+
+
+if __name__ == "__main__":
+    import simulate
+
+    parser = argparse.ArgumentParser(description="Play the Monte Carlo bot against random players.")
+    parser.add_argument("--games", type=int, default=4)
+    parser.add_argument("--playouts", type=int, default=30)
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--max-turns", type=int, default=60)
+    args = parser.parse_args()
+
+    log.set_sink(NullSink())
+    bot = MonteCarloDecisionProvider(args.playouts, args.time_limit, args.workers, seed=0)
+    wins = 0
+    try:
+        for seed in range(args.games):
+            game = simulate.play_game(seed, args.max_turns, [bot, RandomDecisionProvider(seed)])
+            wins += game.winner is game.players[0]
+    finally:
+        bot.close()
+    print(f"Bot won {wins}/{args.games} games against a random player")
+    print(f"{bot.total_playouts} playouts in {bot.total_seconds:.1f}s ({bot.playouts_per_second():.0f} playouts/s)")
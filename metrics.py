@@ -0,0 +1,145 @@
+import bisect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# In-process runtime metrics. Engine code guards every hook with
+# `if metrics.enabled:` so a disabled registry costs one attribute check:
+#
+#     metrics.enable()
+#     metrics.inc("triggers", "on_tap")
+#     metrics.observe("phase_seconds", elapsed, "combat")
+#
+# Values are keyed by (name, label). Collected data can be dumped as JSON or
+# scraped over HTTP in the Prometheus text format with serve().
+
+# Histogram bucket upper bounds, in seconds
+TIME_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class Histogram:
+    __slots__ = ("bounds", "buckets", "count", "total", "maximum")
+
+    def __init__(self, bounds=TIME_BUCKETS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)  # The last bucket holds everything above the top bound
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def to_dict(self):
+        return {"count": self.count, "sum": self.total, "max": self.maximum,
+                "buckets": dict(zip([str(bound) for bound in self.bounds] + ["+Inf"], self.buckets))}
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()  # Only taken by snapshot() and reset(), hooks stay lock free
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}  # (name, label) -> count
+            self.histograms = {}  # (name, label) -> Histogram
+            self.high_waters = {}  # (name, label) -> largest value seen
+
+    def inc(self, name, label=None, amount=1):
+        key = (name, label)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, label=None):
+        histogram = self.histograms.get((name, label))
+        if histogram is None:
+            histogram = self.histograms[(name, label)] = Histogram()
+        histogram.observe(value)
+
+    def high_water(self, name, value, label=None):
+        key = (name, label)
+        if value > self.high_waters.get(key, 0):
+            self.high_waters[key] = value
+
+    def snapshot(self):
+        """Every metric as nested plain dicts: {kind: {name: {label: value}}}."""
+        with self.lock:
+            counters, histograms, high_waters = dict(self.counters), dict(self.histograms), dict(self.high_waters)
+        snapshot = {"counters": {}, "histograms": {}, "high_waters": {}}
+        for kind, values in (("counters", counters), ("high_waters", high_waters)):
+            for (name, label), value in values.items():
+                snapshot[kind].setdefault(name, {})[label or ""] = value
+        for (name, label), histogram in histograms.items():
+            snapshot["histograms"].setdefault(name, {})[label or ""] = histogram.to_dict()
+        return snapshot
+
+    def dump(self, stream):
+        json.dump(self.snapshot(), stream, indent=2, sort_keys=True)
+
+    def prometheus_text(self):
+        """The snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def labels(label, extra=""):
+            parts = [f'label="{label}"'] if label else []
+            if extra:
+                parts.append(extra)
+            return "{" + ",".join(parts) + "}" if parts else ""
+
+        for kind, suffix in (("counters", "_total"), ("high_waters", "_max")):
+            for name, values in sorted(snapshot[kind].items()):
+                lines.append(f"# TYPE {name}{suffix} {'counter' if kind == 'counters' else 'gauge'}")
+                lines.extend(f"{name}{suffix}{labels(label)} {value}" for label, value in sorted(values.items()))
+        for name, values in sorted(snapshot["histograms"].items()):
+            lines.append(f"# TYPE {name} histogram")
+            for label, histogram in sorted(values.items()):
+                cumulative = 0
+                for bound, count in histogram["buckets"].items():
+                    cumulative += count
+                    upper = 'le="' + bound + '"'
+                    lines.append(f"{name}_bucket{labels(label, upper)} {cumulative}")
+                lines.append(f"{name}_sum{labels(label)} {histogram['sum']}")
+                lines.append(f"{name}_count{labels(label)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9108, host="127.0.0.1"):
+        """Serves /metrics (Prometheus text) and /metrics.json from a daemon thread.
+        Returns the server; call shutdown() on it to stop."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = registry.prometheus_text().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(registry.snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are not worth a line each
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+metrics = Metrics()
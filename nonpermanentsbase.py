@@ -1,23 +1,31 @@
 from abc import abstractmethod
 from corebase import Card
+from gamelog import log
 
 class NonPermanent(Card):
+    __slots__ = ()
     @abstractmethod
     def resolve(self):
         """Effect of the card when played"""
         pass
 
 class Instant(NonPermanent):
+    __slots__ = ()
+    type = "Instant"
+
     def resolve(self):
-        print(f"{self.name} (Instant) resolves immediately.")
+        log.emit("resolves", "{card} (Instant) resolves immediately.", card=self.name)
         self.trigger_ability("on_resolve")
 
     def play(self, game_stack):
         game_stack.add(self)
 
 class Sorcery(NonPermanent):
+    __slots__ = ()
+    type = "Sorcery"
+
     def resolve(self):
-        print(f"{self.name} (Sorcery) resolves but can only be played on your turn.")
+        log.emit("resolves", "{card} (Sorcery) resolves but can only be played on your turn.", card=self.name)
         self.trigger_ability("on_resolve")
 
     def play(self, game_stack):
@@ -0,0 +1,55 @@
+from functools import lru_cache
+
+# Material payment solver. Pools and costs are passed around as sorted
+# (material, amount) tuples so every answer can be memoized; a game only ever
+# sees a few hundred distinct pools and a handful of distinct costs.
+#
+# Coloured costs have to be paid with their own material. The generic X part
+# is paid one unit at a time from the material with the most to spare over
+# what the rest of the hand needs ("demand"), which keeps as much of that
+# demand covered as any payment can.
+
+
+def as_key(materials):
+    """A pool or cost mapping in the form the solver caches on."""
+    return tuple(sorted(materials.items()))
+
+
+def _pay_coloured(pool, cost):
+    """Residual pool (a dict) after the coloured part of cost, and the generic amount still owed."""
+    residual = dict(pool)
+    generic = 0
+    for material, amount in cost:
+        if material == "X":
+            generic = amount
+        elif residual.get(material, 0) < amount:
+            return None, 0
+        else:
+            residual[material] -= amount
+    return residual, generic
+
+
+@lru_cache(maxsize=65536)
+def can_pay(pool, cost):
+    residual, generic = _pay_coloured(pool, cost)
+    return residual is not None and sum(residual.values()) >= generic
+
+
+@lru_cache(maxsize=16384)
+def affordable(pool, costs):
+    """The subset of costs the pool can pay, for a whole hand at once."""
+    return frozenset(cost for cost in costs if can_pay(pool, cost))
+
+
+@lru_cache(maxsize=65536)
+def pay(pool, cost, demand=()):
+    """Best residual pool after paying cost, or None when it cannot be paid."""
+    residual, generic = _pay_coloured(pool, cost)
+    if residual is None or sum(residual.values()) < generic:
+        return None
+    needed = dict(demand)
+    for _ in range(generic):
+        material = max((material for material, amount in residual.items() if amount > 0),
+                       key=lambda material: (residual[material] - needed.get(material, 0), residual[material], material))
+        residual[material] -= 1
+    return as_key(residual)
@@ -1,28 +1,65 @@
 from corebase import Card
+from cardregistry import registry
+from gamelog import log
+from keywords import HEXPROOF, to_flags, to_names
 
 class Permanent(Card):
+    __slots__ = ("tapped", "keyword_flags", "zone", "_activated_abilities", "_static_effects")
+
     def __init__(self, name, material_cost, owner, keywords=None):
-        super().__init__(name, material_cost, owner)
+        self.setup(registry.intern(type(self), name, material_cost, keywords=keywords), owner)
+
+    def setup(self, definition, owner):
+        super().setup(definition, owner)
         self.tapped = False
-        self.keywords = keywords if keywords else set()
+        self.keyword_flags = definition.keyword_flags  # Copied so a card can gain or lose keywords
         self.zone = "battlefield"  # Track where the card is
-        
+        self._activated_abilities = None
+        self._static_effects = ()  # (power, toughness, applies) granted to creatures while on the battlefield
+
+    @property
+    def keywords(self):
+        """Keyword names, for card authors. The engine reads keyword_flags."""
+        return frozenset(to_names(self.keyword_flags))
+
+    @keywords.setter
+    def keywords(self, keywords):
+        self.keyword_flags = to_flags(keywords)
+
+    def has_keyword(self, name):
+        return bool(self.keyword_flags & to_flags((name,)))
+
+    def add_keyword(self, name):
+        self.keyword_flags |= to_flags((name,))
+
+    def remove_keyword(self, name):
+        self.keyword_flags &= ~to_flags((name,))
+
     def tap(self):
         if not self.tapped:
             self.tapped = True
-            print(f"{self.name} is now tapped.")
+            self.tapped_changed()
+            log.emit("tapped", "{card} is now tapped.", card=self.name)
             self.trigger_ability("on_tap")
         else:
-            print(f"{self.name} is already tapped.")
+            log.emit("already_tapped", "{card} is already tapped.", card=self.name)
 
     def untap(self):
-        self.tapped = False
-        print(f"{self.name} is now untapped.")
+        if self.tapped:
+            self.tapped = False
+            self.tapped_changed()
+        log.emit("untapped", "{card} is now untapped.", card=self.name)
         self.trigger_ability("on_untap")
 
+    def tapped_changed(self):
+        """Keeps the untapped view of the owner's battlefield zone current."""
+        zone = getattr(self.owner, self.battlefield_zone, None) if self.battlefield_zone else None
+        if zone is not None:
+            zone.tapped_changed(self)
+
     def resolve(self):
         """When a permanent resolves, it enters the battlefield."""
-        print(f"{self.name} enters the battlefield.")
+        log.emit("enters_battlefield", "{card} enters the battlefield.", card=self.name)
         self.trigger_ability("on_enter")
         self.zone = "battlefield"
 
@@ -32,22 +69,56 @@ class Permanent(Card):
     
     def can_be_targeted(self, spell):
         """Checks if a permanent can be targeted by a spell, considering Hexproof and Ward"""
-        if "Hexproof" in self.keywords and spell.owner.opponent:
-            print(f"{self.name} has Hexproof and cannot be targeted by opponent's spells!")
+        if self.keyword_flags & HEXPROOF and spell.controller is not self.controller:
+            log.emit("hexproof", "{card} has Hexproof and cannot be targeted by opponent's spells!", card=self.name)
             return False
         return True
     
     def move_to_graveyard(self):
         """Moves the permanent to the graveyard."""
-        print(f"{self.name} goes to the graveyard.")
-        self.zone = "graveyard"
+        log.emit("to_graveyard", "{card} goes to the graveyard.", card=self.name)
+        self.owner.move(self, "graveyard")
         self.trigger_ability("on_graveyard")
+        self.leave_battlefield()
 
     def move_to_exile(self):
         """Moves the permanent to exile."""
-        print(f"{self.name} is exiled.")
-        self.zone = "exile"
+        log.emit("exiled", "{card} is exiled.", card=self.name)
+        self.owner.move(self, "exile")
         self.trigger_ability("on_exile")
+        self.leave_battlefield()
+
+    def leave_battlefield(self):
+        """Stops listening for game events once the permanent is gone."""
+        events = getattr(self.controller, "events", None)
+        if events is not None:
+            events.unsubscribe(self)
+        effects = getattr(self.controller, "effects", None)
+        if effects is not None and self._static_effects:
+            effects.remove(self)
+
+    def add_static_effect(self, power=0, toughness=0, applies=None):
+        """Gives creatures +power/+toughness while this permanent is on the battlefield,
+        such as an anthem. applies(source, creature) picks the creatures; by default
+        it is every creature this permanent's controller controls."""
+        self._static_effects += ((power, toughness, applies),)
+        effects = getattr(self.controller, "effects", None)
+        if effects is not None and self.zone == "battlefield" and self in getattr(self.owner, self.battlefield_zone, ()):
+            effects.add(self)
+
+    def clone(self, memo):
+        copied = memo.get(id(self))
+        if copied is None:
+            copied = super().clone(memo)
+            if self._activated_abilities is not None:
+                copied._activated_abilities = dict(self._activated_abilities)
+        return copied
+
+    @property
+    def activated_abilities(self):
+        if self._activated_abilities is None:
+            self._activated_abilities = {}
+        return self._activated_abilities
 
     def add_activated_ability(self, ability_name, ability_function, condition_function=None):
         """Adds an activated ability with an optional condition function."""
@@ -55,14 +126,14 @@ class Permanent(Card):
 
     def activate_ability(self, ability_name, *args):
         """Activates a specified ability of the permanent if conditions are met."""
-        if ability_name in self.activated_abilities:
+        if self._activated_abilities and ability_name in self._activated_abilities:
             ability_function, condition_function = self.activated_abilities[ability_name]
             if condition_function is None or condition_function():
-                print(f"{self.name} activates {ability_name}.")
+                log.emit("ability_activated", "{card} activates {ability}.", card=self.name, ability=ability_name)
                 ability_function(*args)
             else:
-                print(f"{self.name} cannot activate {ability_name} due to unmet conditions.")
+                log.emit("ability_condition_unmet", "{card} cannot activate {ability} due to unmet conditions.", card=self.name, ability=ability_name)
         else:
-            print(f"{self.name} does not have the ability {ability_name}.")
+            log.emit("ability_missing", "{card} does not have the ability {ability}.", card=self.name, ability=ability_name)
 
 
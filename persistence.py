@@ -0,0 +1,216 @@
+import json
+import pickle
+import sqlite3
+import threading
+import zlib
+
+from decisions import DeferredDecisionProvider
+from gameLogic import Game, create_player
+from replay import ActionLog, GameRecording, RecordingDecisionProvider, ReplayDecisionProvider
+
+# Crash-safe game sessions. Games are deterministic given their header (seed,
+# turn limit, names and decks) and the answers players gave, so the only thing
+# written per action is the answer's varint, appended to the game's in-memory
+# ActionLog by the recording providers from replay.py. A background thread
+# group commits everything new to SQLite in WAL mode every `commit_interval`
+# seconds, one transaction and one fsync for all games. Every `snapshot_turns`
+# turns a suspended game is pickled as a compact snapshot, so recovery loads
+# the snapshot and only replays the answers logged after it.
+#
+#     store = GameStore("games.db").start()
+#     game_id = store.open_game(game)   # before game.setup()
+#     ...  game.run(); store.checkpoint(game_id)  whenever it suspends
+#     store.finish(game_id)
+#
+# After a crash, GameStore("games.db").recover() rebuilds every unfinished game,
+# suspended and waiting for its next answer. Answers given in the last
+# commit_interval before the crash are lost, and those games rewind to the
+# question that was pending then.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    header BLOB NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0,
+    winner INTEGER
+);
+CREATE TABLE IF NOT EXISTS actions (
+    game_id INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (game_id, start)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    game_id INTEGER PRIMARY KEY,
+    actions INTEGER NOT NULL,
+    state BLOB NOT NULL
+);
+"""
+
+
+def snapshot(game):
+    """The game pickled without its decision providers. The commit thread compresses it."""
+    providers = [player.decisions for player in game.players]
+    try:
+        for player in game.players:
+            player.decisions = None  # Providers hold sockets and queues; recovery installs new ones
+        return pickle.dumps(game, pickle.HIGHEST_PROTOCOL)
+    finally:
+        for player, provider in zip(game.players, providers):
+            player.decisions = provider
+
+
+class StoredGame:
+    """A game being persisted: its answers and how much of them is committed."""
+
+    def __init__(self, game, actions, committed=0):
+        self.game = game
+        self.actions = actions
+        self.committed = committed  # Bytes of actions.data already in the database
+        self.snapshot_turn = game.turn_number  # Turn of the last snapshot
+
+
+class GameStore:
+    def __init__(self, path, commit_interval=0.1, snapshot_turns=50):
+        self.path = path
+        self.commit_interval = commit_interval  # Seconds between group commits
+        self.snapshot_turns = snapshot_turns  # Turns between snapshots; recovery replays at most this many
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")  # Every commit is durable, commits are batched instead
+        self.db.executescript(SCHEMA)
+        self.games = {}  # game id -> StoredGame
+        self.new_games = []  # (game id, header) not yet written
+        self.snapshots = {}  # game id -> (actions length, state) not yet written
+        self.finished = {}  # game id -> winner index + 1 (0 for a draw) not yet written
+        self.next_id = (self.db.execute("SELECT MAX(id) FROM games").fetchone()[0] or 0) + 1
+        self.lock = threading.Lock()  # Guards the pending queues above
+        self.commit_lock = threading.Lock()  # One flush writes at a time
+        self.stopping = threading.Event()
+        self.thread = None
+        self.commits = 0
+
+    def start(self):
+        """Starts the background group commit thread. Returns the store."""
+        self.thread = threading.Thread(target=self.commit_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def commit_loop(self):
+        while not self.stopping.wait(self.commit_interval):
+            self.flush()
+
+    def close(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join()
+        self.flush()
+        self.db.close()
+
+    def open_game(self, game):
+        """Starts persisting a game that has not been set up yet and returns its id.
+        The players' providers are wrapped so every answer is logged."""
+        recording = GameRecording(game)
+        with self.lock:
+            game_id = self.next_id
+            self.next_id += 1
+            self.games[game_id] = StoredGame(game, recording.actions)
+            self.new_games.append((game_id, recording.header))
+        return game_id
+
+    def checkpoint(self, game_id):
+        """Call while the game is suspended (or between steps). Snapshots it when
+        enough turns have passed since the last snapshot."""
+        stored = self.games[game_id]
+        game = stored.game
+        if game.over or game.turn_number - stored.snapshot_turn < self.snapshot_turns:
+            return
+        state = snapshot(game)
+        stored.snapshot_turn = game.turn_number
+        with self.lock:
+            self.snapshots[game_id] = (len(stored.actions.data), state)
+
+    def finish(self, game_id):
+        """Marks a game as over. Its snapshot is dropped; the answers stay, so the
+        game can still be replayed from the start."""
+        game = self.games[game_id].game
+        with self.lock:
+            self.finished[game_id] = game.players.index(game.winner) + 1 if game.winner else 0
+
+    def flush(self):
+        """Group commit: writes every game's new answers, snapshots and results in
+        one transaction."""
+        with self.commit_lock:
+            with self.lock:
+                new_games, self.new_games = self.new_games, []
+                snapshots, self.snapshots = self.snapshots, {}
+                finished, self.finished = self.finished, {}
+                actions = []
+                for game_id, stored in self.games.items():
+                    length = len(stored.actions.data)
+                    if length > stored.committed:
+                        actions.append((game_id, stored.committed, bytes(stored.actions.data[stored.committed:length])))
+                        stored.committed = length
+                for game_id in finished:
+                    del self.games[game_id]
+            if not (new_games or actions or snapshots or finished):
+                return
+            db = self.db
+            db.execute("BEGIN")
+            db.executemany("INSERT INTO games (id, header) VALUES (?, ?)",
+                           [(game_id, zlib.compress(json.dumps(header, separators=(",", ":")).encode("utf-8"), 1))
+                            for game_id, header in new_games])
+            db.executemany("INSERT INTO actions (game_id, start, data) VALUES (?, ?, ?)", actions)
+            db.executemany("INSERT OR REPLACE INTO snapshots (game_id, actions, state) VALUES (?, ?, ?)",
+                           [(game_id, length, zlib.compress(state, 1)) for game_id, (length, state) in snapshots.items()])
+            db.executemany("UPDATE games SET finished = 1, winner = ? WHERE id = ?",
+                           [(winner, game_id) for game_id, winner in finished.items()])
+            db.executemany("DELETE FROM snapshots WHERE game_id = ?", [(game_id,) for game_id in finished])
+            db.execute("COMMIT")
+            self.commits += 1
+
+    def unfinished(self):
+        return [row[0] for row in self.db.execute("SELECT id FROM games WHERE finished = 0 ORDER BY id")]
+
+    def load(self, game_id, provider=None):
+        """Rebuilds a game from its latest snapshot (or its header) and the answers
+        logged since. The game comes back suspended on its next question, with
+        provider(player) (a DeferredDecisionProvider by default) answering for each
+        player, and is persisted again under the same id."""
+        header = json.loads(zlib.decompress(self.db.execute(
+            "SELECT header FROM games WHERE id = ?", (game_id,)).fetchone()[0]))
+        answers = b"".join(row[0] for row in self.db.execute(
+            "SELECT data FROM actions WHERE game_id = ? ORDER BY start", (game_id,)))
+        row = self.db.execute("SELECT actions, state FROM snapshots WHERE game_id = ?", (game_id,)).fetchone()
+
+        if row:
+            offset, state = row
+            game = pickle.loads(zlib.decompress(state))
+            game.resume()
+        else:
+            offset = 0
+            players = [create_player(info) for info in header["players"]]
+            game = Game(players, seed=header["seed"], max_turns=header["max_turns"])
+            game.setup()
+        replayed = ActionLog(answers[offset:])
+        for player in game.players:
+            player.decisions = ReplayDecisionProvider(replayed)
+        game.run()  # Suspends once the logged answers run out
+
+        actions = ActionLog(answers)
+        for player in game.players:
+            inner = provider(player) if provider else DeferredDecisionProvider()
+            player.decisions = RecordingDecisionProvider(inner, actions)
+        stored = StoredGame(game, actions, committed=len(answers))
+        stored.snapshot_turn = game.turn_number if row else 0
+        with self.lock:
+            self.games[game_id] = stored
+        game.resume()
+        game.run()  # Asks the new providers the question the game stopped on
+        if game.over:
+            self.finish(game_id)
+        return game
+
+    def recover(self, provider=None):
+        """Every unfinished game, rebuilt by load(). Returns {game id: game}."""
+        return {game_id: self.load(game_id, provider) for game_id in self.unfinished()}
@@ -1,25 +1,52 @@
 from permanentsbase import Permanent
+from cardregistry import registry
+from gamelog import log
 
 class Priest(Permanent):
+    __slots__ = ()
+    type = "Priest"
+    battlefield_zone = "priests"
+    triggers = {"on_tap": "add_materials"}
+
     def __init__(self, name, owner, primary_material, secondary_material=None):
-        super().__init__(name, material_cost=0)
-        self.primary_material = primary_material
-        self.secondary_material = secondary_material
-        
-        self.abilities["on_tap"] = self.produce_material
+        self.setup(registry.intern(type(self), name, {}, primary_material=primary_material,
+                                   secondary_material=secondary_material), owner)
+
+    @property
+    def primary_material(self):
+        return self.definition.primary_material
+
+    @property
+    def secondary_material(self):
+        return self.definition.secondary_material
     
     def produce_material(self):
+        """Taps the priest for its materials."""
         if not self.tapped:
-            self.tapped = True
-            self.owner.gain_material(self.primary_material, 1)
-            print(f"{self.name} taps to produce 1 {self.primary_material}.")
-            
-            if self.secondary_material:
-                self.owner.gain_material(self.secondary_material, 1)
-                print(f"{self.name} also produces 1 {self.secondary_material}.")
+            self.tap()  # Tapping triggers add_materials
         else:
-            print(f"{self.name} is already tapped.")
+            log.emit("already_tapped", "{card} is already tapped.", card=self.name)
+
+    def tap(self):
+        super().tap()
+        self.owner.moves.materials_changed()
+
+    def untap(self):
+        super().untap()
+        self.owner.moves.materials_changed()
+
+    def leave_battlefield(self):
+        super().leave_battlefield()
+        self.owner.moves.materials_changed()
+
+    def add_materials(self):
+        self.owner.gain_material(self.primary_material, 1)
+        log.emit("material_produced", "{card} taps to produce 1 {material}.", card=self.name, material=self.primary_material)
+
+        if self.secondary_material:
+            self.owner.gain_material(self.secondary_material, 1)
+            log.emit("material_produced", "{card} also produces 1 {material}.", card=self.name, material=self.secondary_material)
     
     def resolve(self):
-        print(f"{self.name} enters the battlefield.")
+        log.emit("enters_battlefield", "{card} enters the battlefield.", card=self.name)
 
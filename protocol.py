@@ -0,0 +1,97 @@
+import json
+
+from carddb import database
+from creature import Creature
+from keywords import to_names
+from preists import Priest
+
+# Wire format shared by the listeners: one JSON object per line, UTF-8 encoded.
+
+MAX_MESSAGE_SIZE = 64 * 1024  # Longest line accepted from a client, decks included
+
+
+class ProtocolError(Exception):
+    """Raised when a client sends something that is not a valid message."""
+
+
+def encode_message(message):
+    """Frames a message as a single newline terminated JSON line."""
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def decode_message(line):
+    """Parses one framed line back into a message dict."""
+    if len(line) > MAX_MESSAGE_SIZE:
+        raise ProtocolError("Message too large.")
+    try:
+        message = json.loads(line)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ProtocolError(f"Malformed message: {e}")
+    if not isinstance(message, dict):
+        raise ProtocolError("Messages must be JSON objects.")
+    return message
+
+
+def read_message(stream):
+    """Reads one framed message from a blocking binary file object, None at end of stream."""
+    line = stream.readline(MAX_MESSAGE_SIZE + 1)
+    if not line:
+        return None
+    if not line.endswith(b"\n"):
+        raise ProtocolError("Message too large or truncated.")
+    return decode_message(line)
+
+
+def deck_from_json(cards, owner):
+    """Builds card objects from a client's deck description: either a list of card
+    ids from the card database (see carddb.py) or a list of card objects.
+
+    Creatures: {"type": "Creature", "name", "cost", "power", "toughness", "keywords"}
+    Priests: {"type": "Priest", "name", "material", "secondary_material"}
+    """
+    if cards and not isinstance(cards[0], dict):
+        try:
+            return database.instantiate(cards, owner)
+        except (OSError, ValueError) as e:
+            raise ProtocolError(f"Invalid deck: {e}")
+    deck = []
+    for card in cards:
+        if not isinstance(card, dict):
+            raise ProtocolError("Deck entries must be objects.")
+        try:
+            if card.get("type") == "Creature":
+                deck.append(Creature(card["name"], dict(card.get("cost", {})), int(card["power"]),
+                                     int(card["toughness"]), owner, set(card.get("keywords", []))))
+            elif card.get("type") == "Priest":
+                deck.append(Priest(card["name"], owner, card["material"], card.get("secondary_material")))
+            else:
+                raise ProtocolError(f"Unsupported card type {card.get('type')!r}.")
+        except (KeyError, TypeError, ValueError) as e:
+            raise ProtocolError(f"Invalid card {card!r}: {e}")
+    return deck
+
+
+_descriptions = {}  # CardDefinition -> its deck entry, definitions never change
+
+
+def describe_card(card):
+    definition = card.definition
+    entry = _descriptions.get(definition)
+    if entry is None:
+        if isinstance(card, Creature):
+            entry = {"type": "Creature", "name": definition.name, "cost": dict(definition.material_cost),
+                     "power": definition.power, "toughness": definition.toughness,
+                     "keywords": sorted(to_names(definition.keyword_flags))}
+        elif isinstance(card, Priest):
+            entry = {"type": "Priest", "name": definition.name, "material": definition.primary_material,
+                     "secondary_material": definition.secondary_material}
+        else:
+            raise ProtocolError(f"Cannot describe {card.type} cards.")
+        entry = _descriptions[definition] = entry
+    return entry
+
+
+def deck_to_json(cards):
+    """Describes a deck in the form deck_from_json reads back. Entries are shared
+    between decks, so treat them as read only."""
+    return [describe_card(card) for card in cards]
@@ -0,0 +1,250 @@
+import argparse
+import json
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from decisions import DecisionPending, DecisionProvider
+from gameLogic import Game, create_player
+from gamelog import log, NullSink
+from protocol import deck_to_json
+
+# Binary action logs. Games are deterministic given their seed, decks and the
+# answers players gave, so a log only needs those. Answers are written as
+# varints in the order the game asked for them:
+#   choose_action    index of the chosen option
+#   choose_card      index + 1 of the card, 0 for none
+#   choose_attackers / choose_blockers   count, then each index
+#   choose_defender  index
+# A log file holds one record per game:
+#   varint(record length) varint(header length) zlib compressed header JSON
+#   varint(winner index + 1, 0 for a draw) varint(turns) answers...
+# The header (seed, turn limit, names and decks) dominates the size, and decks
+# compress well, so a typical game takes well under a kilobyte.
+
+
+def write_varint(buffer, value):
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, position):
+    """Returns (value, next position)."""
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+class ActionLog:
+    """The varint answers of one game, appended as the game runs."""
+
+    def __init__(self, data=b""):
+        self.data = bytearray(data)
+        self.position = 0  # Read position while replaying
+
+    def write(self, value):
+        if value < 0x80:
+            self.data.append(value)  # Most answers fit in one byte
+            return
+        answer = bytearray()
+        write_varint(answer, value)
+        self.data += answer  # One append, so a reader on another thread never sees half an answer
+
+    def read(self):
+        if self.position >= len(self.data):
+            raise DecisionPending("replay")
+        value, self.position = read_varint(self.data, self.position)
+        return value
+
+    def write_indices(self, indices):
+        answer = bytearray()
+        write_varint(answer, len(indices))
+        for index in indices:
+            write_varint(answer, index)
+        self.data += answer
+
+    def read_indices(self):
+        return [self.read() for _ in range(self.read())]
+
+
+class RecordingDecisionProvider(DecisionProvider):
+    """Wraps a player's provider and logs every answer it gives."""
+
+    def __init__(self, inner, actions):
+        self.inner = inner
+        self.actions = actions
+
+    @property
+    def pending(self):
+        return getattr(self.inner, "pending", None)
+
+    def answer(self, choice):
+        self.inner.answer(choice)
+
+    def clone(self):
+        # Hypothetical moves made on a copy of the game are not part of the log
+        return self.inner.clone()
+
+    def save_state(self):
+        return (self.inner.save_state(), len(self.actions.data))
+
+    def load_state(self, state):
+        inner_state, length = state
+        self.inner.load_state(inner_state)
+        del self.actions.data[length:]
+
+    def choose_action(self, game, player, phase, options):
+        key = self.inner.choose_action(game, player, phase, options)
+        for index, option in enumerate(options):
+            if option[0] == key:
+                self.actions.write(index)
+                return key
+
+    def choose_card(self, game, player, cards):
+        card = self.inner.choose_card(game, player, cards)
+        self.actions.write(0 if card is None else cards.index(card) + 1)
+        return card
+
+    def choose_attackers(self, game, player, creatures):
+        attackers = self.inner.choose_attackers(game, player, creatures)
+        self.actions.write_indices([creatures.index(creature) for creature in attackers])
+        return attackers
+
+    def choose_blockers(self, game, player, attacker, available):
+        blockers = self.inner.choose_blockers(game, player, attacker, available)
+        self.actions.write_indices([available.index(creature) for creature in blockers])
+        return blockers
+
+    def choose_defender(self, game, player, opponents):
+        defender = self.inner.choose_defender(game, player, opponents)
+        self.actions.write(opponents.index(defender))
+        return defender
+
+
+class ReplayDecisionProvider(DecisionProvider):
+    """Gives the logged answers back. The game suspends when the log runs out."""
+
+    def __init__(self, actions):
+        self.actions = actions
+
+    def choose_action(self, game, player, phase, options):
+        return options[self.actions.read()][0]
+
+    def choose_card(self, game, player, cards):
+        index = self.actions.read()
+        return cards[index - 1] if index else None
+
+    def choose_attackers(self, game, player, creatures):
+        return [creatures[i] for i in self.actions.read_indices()]
+
+    def choose_blockers(self, game, player, attacker, available):
+        return [available[i] for i in self.actions.read_indices()]
+
+    def choose_defender(self, game, player, opponents):
+        return opponents[self.actions.read()]
+
+
+class GameRecording:
+    """Records a game from before setup() so the header has the unshuffled decks."""
+
+    def __init__(self, game):
+        self.game = game
+        self.actions = ActionLog()
+        self.header = {
+            "seed": game.seed,
+            "max_turns": game.max_turns,
+            "players": [{"name": player.name, "deck": deck_to_json(player.deck)} for player in game.players],
+        }
+        for player in game.players:
+            player.decisions = RecordingDecisionProvider(player.decisions, self.actions)
+
+    def to_bytes(self):
+        """The finished game as one log record."""
+        game = self.game
+        header = zlib.compress(json.dumps(self.header, separators=(",", ":")).encode("utf-8"))
+        body = bytearray()
+        write_varint(body, len(header))
+        body += header
+        write_varint(body, game.players.index(game.winner) + 1 if game.winner else 0)
+        write_varint(body, game.turn_number)
+        body += self.actions.data
+        record = bytearray()
+        write_varint(record, len(body))
+        return bytes(record + body)
+
+    def write(self, stream):
+        stream.write(self.to_bytes())
+
+
+def read_records(data):
+    """Yields (header, winner, turns, answers) for every record in a log's bytes."""
+    position = 0
+    while position < len(data):
+        length, position = read_varint(data, position)
+        end = position + length
+        header_length, position = read_varint(data, position)
+        header = json.loads(zlib.decompress(data[position:position + header_length]))
+        position += header_length
+        winner, position = read_varint(data, position)
+        turns, position = read_varint(data, position)
+        yield header, winner, turns, bytes(data[position:end])
+        position = end
+
+
+def replay_record(record):
+    """Re-runs one logged game headless. Returns (matched, winner, turns); a game
+    whose log ends early (a forfeit or disconnect) only has its turns compared."""
+    header, winner, turns, answers = record
+    actions = ActionLog(answers)
+    players = [create_player(info, ReplayDecisionProvider(actions)) for info in header["players"]]
+    game = Game(players, seed=header["seed"], max_turns=header["max_turns"])
+    game.start_game()
+    replayed_winner = game.players.index(game.winner) + 1 if game.winner else 0
+    if game.suspended:
+        return game.turn_number == turns, winner, game.turn_number
+    return (replayed_winner, game.turn_number) == (winner, turns), replayed_winner, game.turn_number
+
+
+def _replay_chunk(records):
+    previous_sink = log.set_sink(NullSink())
+    try:
+        return [replay_record(record) for record in records]
+    finally:
+        log.set_sink(previous_sink)
+
+
+def replay_file(path, workers=None, chunk=200):
+    """Replays every game in a log file across a process pool and reports games that
+    no longer end the same way."""
+    with open(path, "rb") as f:
+        records = list(read_records(f.read()))
+    started = time.perf_counter()
+    chunks = [records[i:i + chunk] for i in range(0, len(records), chunk)]
+    if workers == 1:
+        results = [result for records_chunk in chunks for result in _replay_chunk(records_chunk)]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = [result for chunk_results in executor.map(_replay_chunk, chunks) for result in chunk_results]
+    elapsed = time.perf_counter() - started
+    mismatches = [index for index, (matched, _, _) in enumerate(results) if not matched]
+    return {"games": len(results), "mismatches": mismatches, "seconds": elapsed,
+            "games_per_second": len(results) / elapsed if elapsed else 0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a binary action log and check every game ends the same way.")
+    parser.add_argument("path")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    report = replay_file(args.path, args.workers)
+    print(f"Replayed {report['games']} games in {report['seconds']:.2f}s ({report['games_per_second']:.0f} games/s)")
+    print(f"{len(report['mismatches'])} games ended differently" +
+          (f": {report['mismatches'][:20]}" if report["mismatches"] else ""))
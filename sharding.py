@@ -0,0 +1,193 @@
+import argparse
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import wait
+
+from decisions import DeferredDecisionProvider, describe_request, sanitize_answer
+from gameLogic import Game, create_player
+from gamelog import log, NullSink
+from protocol import ProtocolError
+import simulate
+from sync import GameSync, SPECTATOR
+
+# Sharded execution: each worker process owns the games routed to it by game id,
+# so game state never leaves its process. The front process talks to workers
+# over pipes with small tuples:
+#   to a worker:   ("start", game_id, player_infos, max_turns)
+#                  ("answer", game_id, player_index, choice)
+#                  ("forfeit", game_id, player_index)
+#                  ("watch", game_id, seat)
+#                  ("simulate", game_id, seed, max_turns)
+#                  ("stop",)
+#   from a worker: ("prompt", game_id, player_index, request)
+#                  ("state", game_id, seat, frame)
+#                  ("over", game_id, winner_name, turns)
+#                  ("error", game_id, message)
+# Each game's GameSync lives with it in the worker, which sends every seat a
+# snapshot at the start and its sync.py deltas as they are published, before
+# the prompt or result that follows them. The front follows them with a
+# SyncMirror and answers resyncs from it. "watch" adds a seat to the relay,
+# starting with a snapshot; the front sends it for the SPECTATOR seat when a
+# game gets its first spectator.
+
+
+def advance(conn, game_id, game, sync):
+    """Runs a game until it needs a player or ends, and reports which after
+    relaying the state frames of what happened."""
+    game.run()
+    for seat, frame in sync.publish().items():
+        conn.send(("state", game_id, seat, frame))
+    if game.over:
+        conn.send(("over", game_id, game.winner.name if game.winner else None, game.turn_number))
+        return False
+    for index, player in enumerate(game.players):
+        if player.decisions.pending:
+            kind, options = player.decisions.pending
+            conn.send(("prompt", game_id, index, describe_request(kind, options)))
+    return True
+
+
+def shard_main(conn, quiet=True):
+    """Worker process loop, serving every game pinned to this shard."""
+    if quiet:
+        log.set_sink(NullSink())
+    games = {}
+    syncs = {}  # game_id -> GameSync of the game
+    while True:
+        message = conn.recv()
+        kind, game_id = message[0], message[1] if len(message) > 1 else None
+        try:
+            if kind == "stop":
+                return
+            elif kind == "start":
+                _, _, player_infos, max_turns = message
+                players = [create_player(info, DeferredDecisionProvider()) for info in player_infos]
+                game = Game(players, max_turns=max_turns)
+                game.setup()
+                games[game_id] = game
+                sync = syncs[game_id] = GameSync(game)
+                for seat in range(len(players)):
+                    conn.send(("state", game_id, seat, sync.snapshot(seat)))
+            elif kind == "answer":
+                _, _, index, choice = message
+                game = games[game_id]
+                decisions = game.players[index].decisions
+                if not decisions.pending:
+                    continue
+                pending_kind, options = decisions.pending
+                decisions.answer(sanitize_answer(pending_kind, options, choice))
+                game.resume()
+            elif kind == "forfeit":
+                game = games[game_id]
+                game.players[message[2]].health = 0
+                game.check_winner()
+            elif kind == "watch":
+                sync = syncs.get(game_id)  # None once the game ended
+                if sync and message[2] not in sync.sent:
+                    conn.send(("state", game_id, message[2], sync.snapshot(message[2])))
+                continue
+            elif kind == "simulate":
+                _, _, seed, max_turns = message
+                game = simulate.play_game(seed, max_turns)
+                conn.send(("over", game_id, game.winner.name if game.winner else None, game.turn_number))
+                continue
+
+            if not advance(conn, game_id, games[game_id], syncs[game_id]):
+                del games[game_id], syncs[game_id]
+        except (KeyError, ProtocolError) as e:
+            games.pop(game_id, None)
+            syncs.pop(game_id, None)
+            conn.send(("error", game_id, str(e)))
+        except Exception as e:  # A bug in one game must not take down the others on this shard
+            games.pop(game_id, None)
+            syncs.pop(game_id, None)
+            conn.send(("error", game_id, f"Game failed: {e!r}"))
+
+
+class ShardedGameRunner:
+    def __init__(self, shards=None, quiet=True):
+        self.shards = shards or os.cpu_count() or 1
+        self.connections = []
+        self.processes = []
+        for _ in range(self.shards):
+            front, back = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=shard_main, args=(back, quiet), daemon=True)
+            process.start()
+            back.close()
+            self.connections.append(front)
+            self.processes.append(process)
+
+    def shard_for(self, game_id):
+        """Every message for a game goes to the same worker."""
+        return self.connections[game_id % self.shards]
+
+    def start_game(self, game_id, player_infos, max_turns=None):
+        self.shard_for(game_id).send(("start", game_id, player_infos, max_turns))
+
+    def answer(self, game_id, player_index, choice):
+        self.shard_for(game_id).send(("answer", game_id, player_index, choice))
+
+    def forfeit(self, game_id, player_index):
+        self.shard_for(game_id).send(("forfeit", game_id, player_index))
+
+    def watch(self, game_id, seat=SPECTATOR):
+        self.shard_for(game_id).send(("watch", game_id, seat))
+
+    def simulate(self, game_id, seed, max_turns=100):
+        self.shard_for(game_id).send(("simulate", game_id, seed, max_turns))
+
+    def poll(self, timeout=None):
+        """Returns every message the workers have ready, waiting up to timeout for one."""
+        messages = []
+        for conn in wait(self.connections, timeout):
+            while conn.poll():
+                messages.append(conn.recv())
+        return messages
+
+    def stop(self):
+        for conn in self.connections:
+            try:
+                conn.send(("stop",))
+            except OSError:
+                pass  # The worker already died
+        for process in self.processes:
+            process.join()
+
+    def run_simulations(self, games, seed=0, max_turns=100):
+        """Plays headless games across all shards and reports simulated turns per second."""
+        started = time.perf_counter()
+        in_flight = 0
+        next_game = 0
+        finished = 0
+        turns = 0
+        window = self.shards * 4  # Games queued per round so no worker sits idle
+        while finished < games:
+            while next_game < games and in_flight < window:
+                self.simulate(next_game, seed + next_game, max_turns)
+                next_game += 1
+                in_flight += 1
+            for message in self.poll():
+                if message[0] == "over":
+                    turns += message[3]
+                finished += 1
+                in_flight -= 1
+        elapsed = time.perf_counter() - started
+        return {"shards": self.shards, "games": games, "turns": turns, "seconds": elapsed,
+                "turns_per_second": turns / elapsed if elapsed else 0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure simulated turns/sec across shard counts.")
+    parser.add_argument("--games", type=int, default=400)
+    parser.add_argument("--shards", type=int, nargs="*", default=None)
+    args = parser.parse_args()
+
+    baseline = None
+    for shards in args.shards or sorted({1, os.cpu_count() or 1}):
+        runner = ShardedGameRunner(shards)
+        report = runner.run_simulations(args.games)
+        runner.stop()
+        baseline = baseline or report["turns_per_second"]
+        print(f"{shards} shard(s): {report['turns_per_second']:.0f} turns/s "
+              f"({report['turns_per_second'] / baseline:.2f}x)")
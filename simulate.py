@@ -0,0 +1,126 @@
+import argparse
+import random
+import time
+
+from creature import Creature
+from preists import Priest
+from cardregistry import registry
+from decisions import RandomDecisionProvider
+from gameLogic import Player, Game
+from gamelog import log, NullSink
+from metrics import metrics
+from replay import GameRecording
+
+# Headless batch runner: plays many seeded games between decision providers
+# and reports win rates, game length and throughput.
+
+MATERIALS = ["W", "F", "B", "G"]
+
+# (name, cost, power, toughness, keywords) for the creatures random decks are built from
+CREATURE_POOL = [
+    ("Ember Whelp", {"F": 1}, 1, 1, {"Haste"}),
+    ("Grove Sentinel", {"W": 1, "X": 1}, 1, 4, {"Defender"}),
+    ("Blood Courier", {"B": 1, "X": 1}, 2, 2, None),
+    ("Gilded Hawk", {"G": 1, "X": 1}, 2, 1, {"Flying"}),
+    ("Thornback Boar", {"W": 1, "X": 2}, 3, 3, {"Trample"}),
+    ("Ash Reaver", {"F": 2, "X": 1}, 4, 2, None),
+    ("Vault Warden", {"G": 1, "X": 3}, 3, 5, {"Vigilance"}),
+    ("Crimson Tyrant", {"B": 2, "X": 3}, 6, 5, None),
+]
+
+for _name, _cost, _power, _toughness, _keywords in CREATURE_POOL:
+    registry.define(Creature, _name, _cost, power=_power, toughness=_toughness, keywords=_keywords)
+for _material in MATERIALS:
+    registry.define(Priest, f"{_material} Priest", primary_material=_material)
+
+
+def build_random_deck(owner, rng, size=40, priest_count=17):
+    """Builds a two-colour deck of priests and creatures for the given player."""
+    colors = rng.sample(MATERIALS, 2)
+    deck = [registry.create(f"{colors[i % 2]} Priest", owner) for i in range(priest_count)]
+    creatures = [entry[0] for entry in CREATURE_POOL if any(mat in colors for mat in entry[1] if mat != "X")]
+    for _ in range(size - priest_count):
+        deck.append(registry.create(rng.choice(creatures), owner))
+    return deck
+
+
+def play_game(seed, max_turns=100, providers=None, record=None):
+    """Plays one headless game and returns it once it is over. With record (a binary
+    file) the game's action log is appended to it."""
+    rng = random.Random(seed)
+    players = []
+    for i in range(2):
+        decisions = providers[i] if providers else RandomDecisionProvider(rng.randrange(2**32))
+        player = Player(f"Player {i + 1}", [], decisions)
+        player.deck = build_random_deck(player, rng)
+        players.append(player)
+    game = Game(players, seed=rng.randrange(2**32), max_turns=max_turns)
+    recording = GameRecording(game) if record else None
+    game.start_game()
+    if recording:
+        recording.write(record)
+    return game
+
+
+def run_batch(games, seed=0, max_turns=100, quiet=True, record=None):
+    """Plays a batch of games and returns summary statistics."""
+    wins = {}
+    draws = 0
+    total_turns = 0
+    prompts = 0
+    prompts_saved = 0
+    started = time.perf_counter()
+    previous_sink = log.set_sink(NullSink()) if quiet else None
+    try:
+        for i in range(games):
+            game = play_game(seed + i, max_turns, record=record)
+            total_turns += game.turn_number
+            prompts += game.prompts
+            prompts_saved += game.prompts_saved
+            if game.winner:
+                wins[game.winner.name] = wins.get(game.winner.name, 0) + 1
+            else:
+                draws += 1
+    finally:
+        if quiet:
+            log.set_sink(previous_sink)
+    elapsed = time.perf_counter() - started
+    return {
+        "games": games,
+        "wins": wins,
+        "draws": draws,
+        "average_turns": total_turns / games if games else 0,
+        "prompts_per_game": prompts / games if games else 0,
+        "prompts_saved_per_game": prompts_saved / games if games else 0,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else 0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play headless games between random players.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-turns", type=int, default=100)
+    parser.add_argument("--record", help="Append every game's binary action log to this file")
+    parser.add_argument("--metrics", help="Write per-phase timings and trigger counts as JSON to this file")
+    args = parser.parse_args()
+
+    if args.metrics:
+        metrics.enable()
+
+    record = open(args.record, "ab") if args.record else None
+    try:
+        report = run_batch(args.games, args.seed, args.max_turns, record=record)
+    finally:
+        if record:
+            record.close()
+    print(f"Played {report['games']} games in {report['seconds']:.2f}s ({report['games_per_second']:.0f} games/s)")
+    for name, count in sorted(report["wins"].items()):
+        print(f"{name} won {count} games ({count / report['games']:.1%})")
+    print(f"Draws: {report['draws']}, average turns: {report['average_turns']:.1f}")
+    print(f"Priority prompts per game: {report['prompts_per_game']:.1f} "
+          f"({report['prompts_saved_per_game']:.1f} skipped by auto-pass)")
+    if args.metrics:
+        with open(args.metrics, "w") as f:
+            metrics.dump(f)
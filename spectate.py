@@ -0,0 +1,139 @@
+import struct
+import time
+
+from metrics import metrics
+from replay import read_varint
+from sync import SPECTATOR
+
+# Spectator fan-out. Every spectator of a game watches the same public view, the
+# SPECTATOR seat of its GameSync, so each update is encoded once into an
+# immutable length prefixed message and the same memoryview of it is handed to
+# every spectator's transport. Transports send straight from that buffer and
+# only copy whatever the socket did not accept.
+#
+# Spectators never get to slow the game down. One whose transport has more than
+# `high_water` bytes unsent skips frames; once it has caught up it gets a FULL
+# frame of the current view (shared by everyone catching up at that version)
+# and continues with deltas. One with more than `max_buffer` unsent is dropped.
+#
+# Spectator connections carry raw messages: a 4 byte big endian length, then a
+# sync.py frame. read_frame() reads one on the client side. A game nobody
+# watches costs nothing: the SPECTATOR seat is only synced once someone joins.
+# For a game in a shard worker the sync is a SyncMirror, whose view of the seat
+# only arrives with the worker's next message; spectators who joined before it
+# get it as their first frame.
+
+LENGTH = struct.Struct(">I")
+
+
+def frame_message(frame):
+    return memoryview(LENGTH.pack(len(frame)) + frame)
+
+
+async def read_frame(reader):
+    """Reads one spectator message from an asyncio StreamReader; returns the frame."""
+    (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    return await reader.readexactly(length)
+
+
+class Spectator:
+    __slots__ = ("transport", "version", "frames", "skipped")
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.version = None  # Version of the last frame written, None while none was
+        self.frames = 0
+        self.skipped = 0
+
+
+class Broadcast:
+    """Streams one game's public view to any number of spectator transports."""
+
+    def __init__(self, sync, high_water=64 * 1024, max_buffer=1024 * 1024):
+        self.sync = sync
+        self.high_water = high_water  # Unsent bytes above which a spectator skips frames
+        self.max_buffer = max_buffer  # Unsent bytes above which a spectator is dropped
+        self.spectators = []
+        self.full = None  # (version, message) of the FULL frame for joins and catch ups
+        self.frames = 0  # Deltas published
+        self.writes = 0  # Messages handed to transports
+        self.bytes_sent = 0
+        self.skipped = 0  # Frames withheld from lagging spectators
+        self.dropped = 0
+        self.fanout_seconds = 0.0
+        self.fanout_max = 0.0
+
+    def add(self, transport):
+        """Subscribes a transport; it is sent the current view right away."""
+        spectator = Spectator(transport)
+        self.spectators.append(spectator)
+        full = self.full_message()
+        if full:
+            self.write(spectator, *full)
+        return spectator
+
+    def remove(self, spectator):
+        if spectator in self.spectators:
+            self.spectators.remove(spectator)
+
+    def full_message(self):
+        """(version, message) of a FULL frame of the current view, None while a
+        relayed view is on its way."""
+        sent = self.sync.sent.get(SPECTATOR)
+        if sent is None:  # First spectator; the seat only gets deltas from now on
+            frame = self.sync.snapshot(SPECTATOR)
+            if frame is None:
+                return None
+            self.full = (self.sync.sent[SPECTATOR][0], frame_message(frame))
+        elif self.full is None or self.full[0] != sent[0]:
+            self.full = (sent[0], frame_message(self.sync.full_frame(SPECTATOR)))
+        return self.full
+
+    def write(self, spectator, version, message):
+        spectator.transport.write(message)
+        spectator.version = version
+        spectator.frames += 1
+        self.writes += 1
+        self.bytes_sent += len(message)
+
+    def publish(self, frame):
+        """Sends a SPECTATOR delta from GameSync.publish() to every spectator."""
+        start = time.perf_counter()
+        base_version, position = read_varint(frame, 1)
+        version, _ = read_varint(frame, position)
+        message = frame_message(frame)
+        sent_before = self.bytes_sent
+        for spectator in list(self.spectators):
+            transport = spectator.transport
+            if transport.is_closing():
+                self.remove(spectator)
+                continue
+            buffered = transport.get_write_buffer_size()
+            if buffered > self.max_buffer:
+                transport.abort()  # Discards what it never read
+                self.remove(spectator)
+                self.dropped += 1
+                if metrics.enabled:
+                    metrics.inc("spectators_dropped")
+            elif buffered > self.high_water:
+                spectator.skipped += 1
+                self.skipped += 1
+            elif spectator.version == base_version:
+                self.write(spectator, version, message)
+            else:
+                self.write(spectator, *self.full_message())  # Skipped frames, catch up in one go
+        elapsed = time.perf_counter() - start
+        self.frames += 1
+        self.fanout_seconds += elapsed
+        self.fanout_max = max(self.fanout_max, elapsed)
+        if metrics.enabled:
+            metrics.observe("spectator_fanout_seconds", elapsed)
+            metrics.inc("spectator_frames")  # spectator_bytes / spectator_frames is the bytes sent per frame
+            metrics.inc("spectator_bytes", amount=self.bytes_sent - sent_before)
+            metrics.high_water("spectator_message_bytes", len(message))
+
+    def stats(self):
+        return {"spectators": len(self.spectators), "frames": self.frames, "writes": self.writes,
+                "bytes_sent": self.bytes_sent, "bytes_per_frame": self.bytes_sent / self.frames if self.frames else 0,
+                "fanout_seconds_avg": self.fanout_seconds / self.frames if self.frames else 0,
+                "fanout_seconds_max": self.fanout_max, "skipped": self.skipped, "dropped": self.dropped}
@@ -0,0 +1,266 @@
+import zlib
+
+from gameLogic import Game
+from replay import read_varint, write_varint
+
+# Client state sync. Each seat sees a flat "view" of the game: a dict from keys
+# such as ("life", player) or ("card", card id) to small tuples of ints and
+# strings. Hidden information never enters a view: other players' hands and
+# every deck are only counts, and card ids are numbered separately for every
+# seat, so the id of a card revealed later says nothing about when it was drawn.
+#
+# GameSync.publish() is called after each resolved action. It diffs every
+# seat's current view with the last one sent and returns binary frames:
+#   flags byte (FULL, COMPRESSED)  varint base version  varint version  ops...
+# An op is the key kind (with REMOVED set when the key went away), the key's
+# fields and, unless removed, the value's fields. Ints are zigzag varints,
+# strings are length prefixed UTF-8. A client applies a delta only on top of
+# the base version it holds and otherwise asks for a resync, which is answered
+# with a FULL frame of the whole view.
+#
+# SPECTATOR is an extra seat that sees only public information: hands are
+# counts for every player. All spectators of a game share it, so its frames are
+# built once per action however many are watching (see spectate.py).
+#
+# A game running in a shard worker keeps its GameSync there and relays the
+# frames; the front process follows them with a SyncMirror, which answers
+# resyncs from its copy of each seat's view and asks the worker to start
+# relaying a seat (the SPECTATOR seat) the first time one is needed.
+
+FULL = 0x01
+COMPRESSED = 0x02
+REMOVED = 0x80
+COMPRESS_MIN = 256  # Bodies shorter than this are sent uncompressed
+
+# Key kinds: (name, key field types, value field types). "i" is an int, "s" a string.
+KINDS = [
+    ("game", "", "iiiii"),  # turn number, active player, phase, over, winner index + 1 (0 for none)
+    ("life", "i", "i"),  # player -> health
+    ("pool", "is", "i"),  # player, material -> amount
+    ("count", "i", "ii"),  # player -> cards in hand, cards in deck
+    ("card", "i", "iiii"),  # card id -> owner, zone, tapped, toughness
+    ("name", "i", "ssi"),  # card id -> name, type, power + 1 (0 for none); sent again when power changes
+]
+KIND_CODES = {name: code for code, (name, _, _) in enumerate(KINDS)}
+SPECTATOR = -1  # Seat of the public view
+ZONES = ("hand", "creatures", "priests", "enchantments", "artifacts", "graveyard", "exile", "stack")  # Zone codes
+
+
+class StaleState(ValueError):
+    """Raised by SyncClient for a delta that does not start at its version; resync."""
+
+
+def _write_int(buffer, value):
+    write_varint(buffer, (value << 1) ^ (value >> 63))
+
+
+def _read_int(data, position):
+    value, position = read_varint(data, position)
+    return (value >> 1) ^ -(value & 1), position
+
+
+def _write_str(buffer, text):
+    encoded = text.encode("utf-8")
+    write_varint(buffer, len(encoded))
+    buffer += encoded
+
+
+def _read_str(data, position):
+    length, position = read_varint(data, position)
+    return bytes(data[position:position + length]).decode("utf-8"), position + length
+
+
+def _write_fields(buffer, types, values):
+    for kind, value in zip(types, values):
+        if kind == "i":
+            _write_int(buffer, value)
+        else:
+            _write_str(buffer, value)
+
+
+def _read_fields(data, position, types):
+    values = []
+    for kind in types:
+        value, position = (_read_int if kind == "i" else _read_str)(data, position)
+        values.append(value)
+    return tuple(values), position
+
+
+def encode_frame(base_version, version, changes, removed=(), full=False, compress=True):
+    """changes: {key: value}; removed: keys. A key is (kind name, *fields)."""
+    body = bytearray()
+    for key, value in changes.items():
+        code = KIND_CODES[key[0]]
+        _, key_types, value_types = KINDS[code]
+        body.append(code)
+        _write_fields(body, key_types, key[1:])
+        _write_fields(body, value_types, value)
+    for key in removed:
+        code = KIND_CODES[key[0]]
+        body.append(code | REMOVED)
+        _write_fields(body, KINDS[code][1], key[1:])
+    flags = FULL if full else 0
+    if compress and len(body) >= COMPRESS_MIN:
+        body = zlib.compress(body, 1)
+        flags |= COMPRESSED
+    frame = bytearray((flags,))
+    write_varint(frame, base_version)
+    write_varint(frame, version)
+    return bytes(frame + body)
+
+
+def decode_frame(frame):
+    """Returns (full, base version, version, changes, removed)."""
+    flags = frame[0]
+    base_version, position = read_varint(frame, 1)
+    version, position = read_varint(frame, position)
+    body = zlib.decompress(frame[position:]) if flags & COMPRESSED else frame[position:]
+    changes, removed, position = {}, [], 0
+    while position < len(body):
+        op = body[position]
+        name, key_types, value_types = KINDS[op & ~REMOVED]
+        fields, position = _read_fields(body, position + 1, key_types)
+        if op & REMOVED:
+            removed.append((name,) + fields)
+        else:
+            changes[(name,) + fields], position = _read_fields(body, position, value_types)
+    return bool(flags & FULL), base_version, version, changes, removed
+
+
+class GameSync:
+    """Versioned views of one game, with a delta stream for every seat."""
+
+    def __init__(self, game, compress=True):
+        self.game = game
+        self.compress = compress
+        self.version = 0
+        self.card_ids = {}  # seat -> {card: id}
+        self.sent = {}  # seat -> (version, view) last sent; only seats that took a snapshot get deltas
+        self.bytes_sent = 0
+
+    def card_id(self, seat, card):
+        ids = self.card_ids.setdefault(seat, {})
+        card_id = ids.get(card)
+        if card_id is None:
+            card_id = ids[card] = len(ids)
+        return card_id
+
+    def view(self, seat):
+        """Everything the player in this seat is allowed to see."""
+        game = self.game
+        view = {("game",): (game.turn_number, game.turn, Game.PHASES.index(game.phase) if game.phase else -1,
+                            int(game.over), game.players.index(game.winner) + 1 if game.winner else 0)}
+
+        def show(card, owner, zone):
+            card_id = self.card_id(seat, card)
+            view[("card", card_id)] = (owner, zone, int(getattr(card, "tapped", False)),
+                                       getattr(card, "toughness", None) or 0)
+            power = getattr(card, "power", None)
+            view[("name", card_id)] = (card.name, card.type or "", 0 if power is None else power + 1)
+
+        for index, player in enumerate(game.players):
+            view[("life", index)] = (player.health,)
+            view[("count", index)] = (len(player.hand), len(player.deck))
+            for material, amount in player.material_pool.items():
+                view[("pool", index, material)] = (amount,)
+            if index == seat:
+                for card in player.hand:
+                    show(card, index, 0)
+            for zone in range(1, 7):
+                for card in getattr(player, ZONES[zone]):
+                    show(card, index, zone)
+        for card in game.stack.stack:
+            show(card, game.players.index(card.owner) if card.owner in game.players else -1, 7)
+        return view
+
+    def snapshot(self, seat):
+        """A FULL frame of the seat's view, for joins and resyncs."""
+        view = self.view(seat)
+        self.sent[seat] = (self.version, view)
+        return self._count(encode_frame(0, self.version, view, full=True, compress=self.compress))
+
+    def full_frame(self, seat):
+        """A FULL frame of the view last sent to this seat, at the version its deltas
+        continue from. Unlike snapshot() it leaves the delta stream alone, so it
+        can be handed to one more viewer of a shared seat."""
+        version, view = self.sent[seat]
+        return self._count(encode_frame(0, version, view, full=True, compress=self.compress))
+
+    def publish(self):
+        """Call after each resolved action. Returns {seat: delta frame} for the seats
+        whose view changed; the game's version goes up when any did."""
+        deltas = {}
+        for seat, (_, previous) in self.sent.items():
+            view = self.view(seat)
+            changes = {key: value for key, value in view.items() if previous.get(key) != value}
+            removed = [key for key in previous if key not in view]
+            if changes or removed:
+                deltas[seat] = (changes, removed, view)
+        if not deltas:
+            return {}
+        self.version += 1
+        frames = {}
+        for seat, (changes, removed, view) in deltas.items():
+            base_version = self.sent[seat][0]
+            self.sent[seat] = (self.version, view)
+            frames[seat] = self._count(encode_frame(base_version, self.version, changes, removed,
+                                                    compress=self.compress))
+        return frames
+
+    def _count(self, frame):
+        self.bytes_sent += len(frame)
+        return frame
+
+
+class SyncClient:
+    """Client side mirror of one seat's view, kept current by applying frames."""
+
+    def __init__(self):
+        self.version = None
+        self.view = {}
+
+    def apply(self, frame):
+        full, base_version, version, changes, removed = decode_frame(frame)
+        if full:
+            self.view = {}
+        elif base_version != self.version:
+            raise StaleState(f"Delta from version {base_version}, client is at {self.version}.")
+        for key in removed:
+            self.view.pop(key, None)
+        self.view.update(changes)
+        self.version = version
+
+
+class SyncMirror:
+    """The views of a GameSync in another process, rebuilt from the frames it
+    relays. Has the sent, full_frame() and snapshot() a resync needs, so it
+    stands in for the GameSync without a round trip to its process."""
+
+    def __init__(self, request=None, compress=True):
+        self.request = request  # request(seat) asks the GameSync's process to start sending a seat
+        self.compress = compress
+        self.clients = {}  # seat -> SyncClient
+        self.sent = {}  # seat -> (version, view) as in GameSync, for the seats frames arrived for
+        self.requested = set()
+
+    def apply(self, seat, frame):
+        client = self.clients.get(seat)
+        if client is None:
+            client = self.clients[seat] = SyncClient()
+        client.apply(frame)
+        self.sent[seat] = (client.version, client.view)
+
+    def full_frame(self, seat):
+        version, view = self.sent[seat]
+        return encode_frame(0, version, view, full=True, compress=self.compress)
+
+    def snapshot(self, seat):
+        """A FULL frame of the seat's current view. The relayed delta stream
+        continues from it, as it would after GameSync.snapshot(). None for a
+        seat no frame arrived for yet; it is requested and its first frame is FULL."""
+        if seat not in self.sent:
+            if seat not in self.requested and self.request:
+                self.requested.add(seat)
+                self.request(seat)
+            return None
+        return self.full_frame(seat)
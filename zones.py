@@ -0,0 +1,94 @@
+# Zone containers. A zone keeps its cards as the keys of an insertion ordered
+# dict, so adding, removing, moving and membership tests are O(1) while
+# iteration still sees the cards in the order they arrived. Battlefield zones
+# also keep an `untapped` view that Permanent.tap()/untap() update through
+# tapped_changed(), so "untapped creatures" and "untapped priests" are never
+# rebuilt by scanning the board.
+
+
+class Zone:
+    __slots__ = ("cards",)
+
+    def __init__(self, cards=()):
+        self.cards = dict.fromkeys(cards)
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __bool__(self):
+        return bool(self.cards)
+
+    def __contains__(self, card):
+        return card in self.cards
+
+    def __getitem__(self, index):
+        return list(self.cards)[index]  # Positional access is O(n), only kept for callers that index
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self.cards)!r})"
+
+    def add(self, card):
+        self.cards[card] = None
+
+    append = add  # Zones used to be lists
+
+    def extend(self, cards):
+        for card in cards:
+            self.add(card)
+
+    def remove(self, card):
+        if card not in self.cards:
+            raise ValueError(f"{card!r} is not in this zone.")
+        self.discard(card)
+
+    def discard(self, card):
+        self.cards.pop(card, None)
+
+
+class BattlefieldZone(Zone):
+    __slots__ = ("untapped",)
+
+    def __init__(self, cards=()):
+        self.untapped = Zone()  # The zone's untapped cards, in the order they last untapped
+        super().__init__(())
+        self.extend(cards)
+
+    def add(self, card):
+        self.cards[card] = None
+        if not card.tapped:
+            self.untapped.add(card)
+
+    append = add
+
+    def discard(self, card):
+        self.cards.pop(card, None)
+        self.untapped.discard(card)
+
+    def tapped_changed(self, card):
+        """Called by a permanent when it taps or untaps."""
+        if card.tapped:
+            self.untapped.discard(card)
+        elif card in self.cards:
+            self.untapped.add(card)
+
+
+class ZoneAttribute:
+    """A Player attribute holding a zone. Assigning any iterable of cards (a list
+    from an older caller, a restored snapshot) replaces it with a fresh zone."""
+
+    def __init__(self, zone_class=Zone):
+        self.zone_class = zone_class
+
+    def __set_name__(self, owner, name):
+        self.key = "_" + name
+
+    def __get__(self, player, owner=None):
+        if player is None:
+            return self
+        return player.__dict__[self.key]
+
+    def __set__(self, player, cards):
+        player.__dict__[self.key] = self.zone_class(cards)